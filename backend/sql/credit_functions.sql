@@ -0,0 +1,56 @@
+-- Credit functions called by the AI service through PostgREST RPC (POST /rest/v1/rpc/<name>).
+-- Apply in the Supabase SQL editor; the service falls back to plain REST calls until they exist.
+
+-- Atomically deduct p_amount credits if the balance covers it, in a single statement.
+-- Returns one row: applied = true with the balances before/after the deduction, or
+-- applied = false with the unchanged balance when it is too low. No row means the user
+-- has no credit account yet. A negative p_amount refunds credits through the same path.
+create or replace function public.deduct_credits(p_user_id uuid, p_amount integer)
+returns table (applied boolean, credits_before integer, credits_after integer)
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  return query
+    update user_credits
+       set credits = user_credits.credits - p_amount,
+           updated_at = now()
+     where user_credits.user_id = p_user_id
+       and user_credits.credits >= p_amount
+ returning true, user_credits.credits + p_amount, user_credits.credits;
+
+  if not found then
+    return query
+      select false, c.credits, c.credits
+        from user_credits c
+       where c.user_id = p_user_id;
+  end if;
+end;
+$$;
+
+revoke all on function public.deduct_credits(uuid, integer) from public, anon, authenticated;
+grant execute on function public.deduct_credits(uuid, integer) to service_role;
+
+-- Credits spent per action type per day since p_since, for the credit history summary.
+create or replace function public.credit_usage_summary(p_user_id uuid, p_since timestamptz)
+returns table (day date, action_type text, credits_used bigint, transactions bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select t.created_at::date, t.action_type, sum(t.credits_used), count(*)
+    from credit_transactions t
+   where t.user_id = p_user_id
+     and t.created_at >= p_since
+   group by 1, 2
+   order by 1 desc, 2;
+$$;
+
+revoke all on function public.credit_usage_summary(uuid, timestamptz) from public, anon, authenticated;
+grant execute on function public.credit_usage_summary(uuid, timestamptz) to service_role;
+
+-- Serves the paged history query (user_id filter, created_at/id keyset order).
+create index if not exists credit_transactions_user_created_idx
+  on credit_transactions (user_id, created_at desc, id desc);
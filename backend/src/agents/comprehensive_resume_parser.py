@@ -4,85 +4,23 @@ Comprehensive Resume Parser - Parse once, store in Supabase, reuse everywhere
 import os
 import json
 import base64
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 from groq import Groq
+from agents.skill_matcher import skill_matcher
 import asyncio
-import PyPDF2
-from io import BytesIO
-import pdfplumber
+import hashlib
+from utils.cache import TTLCache
+from utils.parse_cache import parse_cache
+from utils.resume_draft import build_resume_draft
+from utils.resume_preprocessing import PREPROCESSOR_VERSION, preprocess_resume_text, merge_contact_fields
+from utils.resume_sections import ResumeSection, segment_resume, attribute_fragments, merge_fragments
+from utils.pdf_extraction import PDFSource, extract_text_from_pdf_bytes, pdf_extraction_pool
+from utils.streaming_json import stream_json_completion, TruncatedJSONError
+from utils.storage import StorageError, TRANSIENT_STATUS_CODES
+from utils.write_behind import WriteRejectedError
+from utils.data_store import storage
 
-class ComprehensiveResumeParser:
-    """Single comprehensive parser that extracts all resume data at once"""
-    
-    def __init__(self):
-        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-    
-    def extract_text_from_pdf_base64(self, base64_data: str) -> str:
-        """Extract text from base64 encoded PDF with multiple fallback methods"""
-        try:
-            # Decode base64 to bytes
-            pdf_bytes = base64.b64decode(base64_data)
-            
-            # Check if this is actually a PDF file or just text
-            # PDF files start with %PDF
-            if pdf_bytes.startswith(b'%PDF'):
-                print("📄 Detected actual PDF file, extracting text...")
-                
-                # Method 1: Try pdfplumber first (better text extraction)
-                try:
-                    pdf_file = BytesIO(pdf_bytes)
-                    with pdfplumber.open(pdf_file) as pdf:
-                        text = ""
-                        for page in pdf.pages:
-                            page_text = page.extract_text()
-                            if page_text:
-                                text += page_text + "\n"
-                        
-                        if text.strip():
-                            print(f"✅ Extracted {len(text)} characters from PDF using pdfplumber")
-                            return text.strip()
-                except Exception as e:
-                    print(f"⚠️ pdfplumber failed: {str(e)}, trying PyPDF2...")
-                
-                # Method 2: Fallback to PyPDF2
-                try:
-                    pdf_file = BytesIO(pdf_bytes)
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    text = ""
-                    
-                    for page in pdf_reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    
-                    if text.strip():
-                        print(f"✅ Extracted {len(text)} characters from PDF using PyPDF2")
-                        return text.strip()
-                except Exception as e:
-                    print(f"⚠️ PyPDF2 also failed: {str(e)}")
-                
-                print("❌ All PDF extraction methods failed")
-                return ""
-            else:
-                # This might be plain text encoded as base64 (for testing)
-                try:
-                    text = pdf_bytes.decode('utf-8')
-                    print(f"✅ Detected plain text data: {len(text)} characters")
-                    return text.strip()
-                except:
-                    print("❌ Not a valid PDF or text data")
-                    return ""
-            
-        except Exception as e:
-            print(f"❌ PDF text extraction failed: {str(e)}")
-            return ""
-    
-    async def parse_complete_resume(self, raw_text: str) -> Dict[str, Any]:
-        """Parse complete resume data in one comprehensive call"""
-        try:
-            print("🚀 Starting comprehensive resume parsing...")
-            
-            prompt = f"""
+RESUME_PARSE_PROMPT = """
             You are an expert resume parser. Extract ALL information from this resume in one comprehensive analysis.
             
             Resume text:
@@ -135,71 +73,362 @@ class ComprehensiveResumeParser:
             6. Return ONLY the JSON object, no additional text
             7. If any section is not found, use empty array []
             """
+
+SECTION_PARSE_PROMPT = """
+            You are an expert resume parser. Extract the information from this {kind} section of a resume.
             
-            # Use Groq for comprehensive parsing
-            response = await asyncio.to_thread(
-                self.groq_client.chat.completions.create,
-                model="llama-3.1-8b-instant",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=2000
-            )
+            Section text:
+            {section_text}
             
-            response_text = response.choices[0].message.content.strip()
+            Return ONLY a JSON object with this EXACT structure:
+            {{
+                {schema}
+            }}
             
-            # Clean up response - handle various markdown formats
-            response_text = response_text.strip()
+            CRITICAL REQUIREMENTS:
+            1. "skills" lists ALL technical skills mentioned in this section as simple strings
+            2. Only use information present in this section
+            3. Return ONLY the JSON object, no additional text
+            4. If nothing is found for a field, use empty array []
+            """
+
+SKILLS_SCHEMA = '"skills": ["Python", "JavaScript", "AWS", "React"]'
+SECTION_SCHEMAS = {
+    "personal": '"personal": {"name": "Full Name", "email": "email@example.com", "phone": "phone number", '
+                '"location": "City, State"}, ' + SKILLS_SCHEMA,
+    "experience": '"experience": [{"job_title": "Job Title", "company": "Company Name", "duration": "Jan 2024 - Present", '
+                  '"responsibilities": ["responsibility 1"], "achievements": ["achievement 1"], '
+                  '"technologies": ["tech1", "tech2"]}], ' + SKILLS_SCHEMA,
+    "projects": '"projects": [{"name": "Project Name", "description": "Project description", '
+                '"technologies": ["tech1", "tech2"], "achievements": ["achievement 1"]}], ' + SKILLS_SCHEMA,
+    "education": '"education": [{"degree": "Degree Name", "institution": "Institution Name", "graduation_year": 2024, '
+                 '"relevant_coursework": ["course1", "course2"]}], ' + SKILLS_SCHEMA,
+}
+
+# "monolithic" sends the whole resume in one prompt; "sections" parses every section concurrently
+PARSE_MODE_MONOLITHIC = "monolithic"
+PARSE_MODE_SECTIONS = "sections"
+PARSE_MODES = (PARSE_MODE_MONOLITHIC, PARSE_MODE_SECTIONS)
+RESUME_PARSE_MODE = os.getenv("RESUME_PARSE_MODE", PARSE_MODE_MONOLITHIC)
+SECTION_PARSE_CONCURRENCY = int(os.getenv("SECTION_PARSE_CONCURRENCY", "6"))
+
+PARSE_MODEL = "llama-3.1-8b-instant"
+PARSE_MAX_TOKENS = 2000
+SECTION_PARSE_MAX_TOKENS = 800
+
+# Part of every parse cache key - changing the prompt or model invalidates cached parses
+PARSER_VERSION = "1-" + hashlib.sha256(
+    f"{PREPROCESSOR_VERSION}|{PARSE_MODEL}|{PARSE_MAX_TOKENS}|{RESUME_PARSE_PROMPT}|{SECTION_PARSE_MAX_TOKENS}|{SECTION_PARSE_PROMPT}|{SECTION_SCHEMAS}".encode()
+).hexdigest()[:12]
+
+PARSE_STAGE_DRAFT = "draft"
+PARSE_STAGE_REFINED = "refined"
+# parse_version only ever increases, so clients can poll until it reaches the refined version
+PARSE_STAGE_VERSIONS = {PARSE_STAGE_DRAFT: 1, PARSE_STAGE_REFINED: 2}
+
+# Latest parsed resume per user; writes from this process invalidate it, the TTL
+# bounds staleness from writes made elsewhere (other workers, the dashboard)
+PARSED_RESUME_CACHE_SIZE = int(os.getenv("PARSED_RESUME_CACHE_SIZE", "1024"))
+PARSED_RESUME_CACHE_TTL_SECONDS = float(os.getenv("PARSED_RESUME_CACHE_TTL_SECONDS", "300"))
+
+
+def with_parse_stage(parsed_data: Dict[str, Any], stage: str) -> Dict[str, Any]:
+    """Tag parsed data as a heuristic draft or the refined LLM parse"""
+    parsed_data["parse_stage"] = stage
+    parsed_data["parse_version"] = PARSE_STAGE_VERSIONS[stage]
+    return parsed_data
+
+class ComprehensiveResumeParser:
+    """Single comprehensive parser that extracts all resume data at once"""
+    
+    def __init__(self):
+        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self.section_semaphore = asyncio.Semaphore(SECTION_PARSE_CONCURRENCY)
+        self.skill_extractor = skill_matcher.skill_extractor
+        self.parsed_resume_cache = TTLCache(maxsize=PARSED_RESUME_CACHE_SIZE, ttl=PARSED_RESUME_CACHE_TTL_SECONDS)
+        # Bumped on every invalidation so a read that raced a write doesn't cache what it fetched
+        self._resume_invalidations = 0
+    
+    def extract_text_from_pdf_base64(self, base64_data: str) -> str:
+        """Extract text from base64 encoded PDF with multiple fallback methods"""
+        try:
+            # Decode base64 to bytes
+            pdf_bytes = base64.b64decode(base64_data)
             
-            # Remove markdown code blocks
-            if '```json' in response_text:
-                # Extract content between ```json and ```
-                start = response_text.find('```json') + 7
-                end = response_text.find('```', start)
-                if end != -1:
-                    response_text = response_text[start:end].strip()
-            elif '```' in response_text:
-                # Extract content between ``` and ```
-                start = response_text.find('```') + 3
-                end = response_text.find('```', start)
-                if end != -1:
-                    response_text = response_text[start:end].strip()
+            # Check if this is actually a PDF file or just text
+            # PDF files start with %PDF
+            if pdf_bytes.startswith(b'%PDF'):
+                print("📄 Detected actual PDF file, extracting text...")
+                return extract_text_from_pdf_bytes(pdf_bytes)
+            return self._decode_plain_text(pdf_bytes)
             
-            # Remove any leading text before the JSON
-            if response_text.startswith('Here is') or response_text.startswith('Here\'s'):
-                # Find the first { character
-                json_start = response_text.find('{')
-                if json_start != -1:
-                    response_text = response_text[json_start:]
+        except Exception as e:
+            print(f"❌ PDF text extraction failed: {str(e)}")
+            return ""
+    
+    async def extract_text_from_pdf_file_async(self, source: PDFSource) -> str:
+        """Extract text from PDF bytes or a spooled upload file in the PDF process pool"""
+        try:
+            return await pdf_extraction_pool.extract_text(source)
+        except asyncio.TimeoutError:
+            print("❌ PDF text extraction timed out")
+            return ""
+        except Exception as e:
+            print(f"❌ PDF text extraction failed: {str(e)}")
+            return ""
+    
+    def _decode_plain_text(self, data: bytes) -> str:
+        """Handle plain text sent as base64 (used for testing)"""
+        try:
+            text = data.decode('utf-8')
+            print(f"✅ Detected plain text data: {len(text)} characters")
+            return text.strip()
+        except UnicodeDecodeError:
+            print("❌ Not a valid PDF or text data")
+            return ""
+    
+    async def parse_pdf_base64(self, base64_data: str, mode: Optional[str] = None,
+                               progress: Optional[Callable[..., None]] = None) -> Optional[Dict[str, Any]]:
+        """Parse a base64 PDF buffer (or base64 plain text); None if no text could be extracted.
+        
+        progress("extracted", ...) is called once text extraction is done, then
+        progress("field", field=..., value=...) for each top-level field as the LLM emits it.
+        """
+        try:
+            pdf_bytes = base64.b64decode(base64_data)
+        except Exception as e:
+            print(f"❌ PDF buffer decoding failed: {str(e)}")
+            return None
+        
+        if pdf_bytes.startswith(b'%PDF'):
+            return await self.parse_pdf(pdf_bytes, mode, progress)
+        
+        text = self._decode_plain_text(pdf_bytes)
+        if not text:
+            return None
+        if progress:
+            progress("extracted", characters=len(text))
+        return await self.parse_complete_resume(text, mode, progress)
+    
+    async def parse_pdf(self, source: PDFSource, mode: Optional[str] = None,
+                        progress: Optional[Callable[..., None]] = None) -> Optional[Dict[str, Any]]:
+        """Extract and parse a PDF, skipping both steps when identical bytes were parsed before"""
+        pdf_key = await parse_cache.pdf_key_async(source, PARSER_VERSION)
+        cached = parse_cache.get(pdf_key)
+        if cached is not None:
+            print("⚡ Parse cache hit on PDF bytes - skipping extraction and LLM")
+            if progress:
+                progress("extracted", cached=True)
+            return with_parse_stage(cached, PARSE_STAGE_REFINED)
+        
+        extracted_text = await self.extract_text_from_pdf_file_async(source)
+        if not extracted_text:
+            return None
+        print(f"✅ Extracted {len(extracted_text)} characters from PDF")
+        if progress:
+            progress("extracted", characters=len(extracted_text))
+        
+        parsed_data = await self.parse_complete_resume(extracted_text, mode, progress)
+        if self._is_cacheable(parsed_data):
+            parse_cache.put(pdf_key, parsed_data)
+        return parsed_data
+    
+    async def parse_complete_resume(self, raw_text: str, mode: Optional[str] = None,
+                                    progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """Parse complete resume data, reusing the cached parse of identical (normalized) text.
+        
+        mode is "monolithic" (one prompt) or "sections" (one prompt per section, run concurrently);
+        it defaults to RESUME_PARSE_MODE. Both produce the same parsed_data structure.
+        On a monolithic LLM parse, progress("field", field=..., value=...) reports each top-level
+        field as soon as it is streamed (before contact details and skills are reconciled).
+        """
+        mode = mode or RESUME_PARSE_MODE
+        if mode not in PARSE_MODES:
+            raise ValueError(f"Unknown parse mode '{mode}', expected one of {', '.join(PARSE_MODES)}")
+        
+        cache_key = parse_cache.text_key(raw_text, PARSER_VERSION)
+        cached = parse_cache.get(cache_key)
+        if cached is not None:
+            print("⚡ Parse cache hit - skipping LLM")
+            return with_parse_stage(cached, PARSE_STAGE_REFINED)
+        
+        # Contact details, whitespace and page headers/footers are handled locally; the LLM sees the rest
+        preprocessed = preprocess_resume_text(raw_text)
+        print(f"✂️ Preprocessed resume text: {len(raw_text)} -> {len(preprocessed.text)} characters")
+        
+        parsed_data = await self._parse_by_sections(preprocessed.text, reuse_only=mode == PARSE_MODE_MONOLITHIC)
+        if parsed_data is None:
+            parsed_data = await self._parse_with_llm(preprocessed.text, progress)
+            if self._is_cacheable(parsed_data):
+                self._remember_sections(preprocessed.text, parsed_data)
+        if self._is_cacheable(parsed_data):
+            parsed_data = self._cross_check_skills(parsed_data, preprocessed.text)
+        parsed_data = with_parse_stage(merge_contact_fields(parsed_data, preprocessed), PARSE_STAGE_REFINED)
+        if self._is_cacheable(parsed_data):
+            parse_cache.put(cache_key, parsed_data)
+        return parsed_data
+    
+    async def parse_draft(self, raw_text: str, is_pdf_buffer: bool = False, mode: Optional[str] = None
+                          ) -> Optional[Tuple[Dict[str, Any], Optional[Callable[[], Awaitable[Dict[str, Any]]]]]]:
+        """Two-tier parse: returns (result, refine), or None if no text could be extracted.
+        
+        When a full parse is already cached, result is that parse and refine is None. Otherwise result
+        is an instant heuristic draft and awaiting refine() runs the LLM parse. refine() never returns
+        worse data than the draft: if the LLM parse fails the draft is kept, marked refined with an error.
+        """
+        pdf_bytes = pdf_key = None
+        if is_pdf_buffer:
+            try:
+                decoded = base64.b64decode(raw_text)
+            except Exception as e:
+                print(f"❌ PDF buffer decoding failed: {str(e)}")
+                return None
+            if decoded.startswith(b'%PDF'):
+                pdf_bytes = decoded
+                pdf_key = await parse_cache.pdf_key_async(pdf_bytes, PARSER_VERSION)
+                cached = parse_cache.get(pdf_key)
+                if cached is not None:
+                    print("⚡ Parse cache hit on PDF bytes - skipping draft")
+                    return with_parse_stage(cached, PARSE_STAGE_REFINED), None
+                raw_text = await self.extract_text_from_pdf_file_async(pdf_bytes)
+            else:
+                raw_text = self._decode_plain_text(decoded)
+            if not raw_text:
+                return None
+        
+        cached = parse_cache.get(parse_cache.text_key(raw_text, PARSER_VERSION))
+        if cached is not None:
+            print("⚡ Parse cache hit - skipping draft")
+            return with_parse_stage(cached, PARSE_STAGE_REFINED), None
+        
+        draft = with_parse_stage(build_resume_draft(raw_text, self.skill_extractor), PARSE_STAGE_DRAFT)
+        print(f"📝 Heuristic draft: {len(draft['skills'])} skills, {len(draft['experience'])} experiences, {len(draft['projects'])} projects")
+        
+        async def refine() -> Dict[str, Any]:
+            parsed_data = await self.parse_complete_resume(raw_text, mode)
+            if not self._is_cacheable(parsed_data):
+                return with_parse_stage({**draft, "error": parsed_data.get("error", "Parsing failed")}, PARSE_STAGE_REFINED)
+            if pdf_key is not None:
+                parse_cache.put(pdf_key, parsed_data)
+            return parsed_data
+        
+        return draft, refine
+    
+    async def _parse_by_sections(self, raw_text: str, reuse_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Parse section by section: cached sections (from an earlier version of this resume) are reused
+        and the rest are parsed concurrently with section-specific prompts.
+        
+        With reuse_only, nothing is parsed unless at least one section is cached. Returns None when the
+        text doesn't segment into sections, or a section parse fails, so the caller does a full parse.
+        """
+        sections = segment_resume(raw_text)
+        if sum(1 for section in sections if section.kind != "personal") < 2:
+            return None
+        
+        keys = [parse_cache.section_key(section.hash, PARSER_VERSION) for section in sections]
+        fragments = [parse_cache.get(key) for key in keys]
+        missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+        if reuse_only and len(missing) == len(sections):
+            return None
+        
+        if len(missing) < len(sections):
+            print(f"♻️ Reusing {len(sections) - len(missing)}/{len(sections)} unchanged sections, re-parsing {len(missing)}")
+        else:
+            print(f"🚀 Parsing {len(sections)} resume sections concurrently...")
+        results = await asyncio.gather(*(self._parse_section(sections[i]) for i in missing))
+        if any(result is None for result in results):
+            return None
+        for i, fragment in zip(missing, results):
+            parse_cache.put(keys[i], fragment)
+            fragments[i] = fragment
+        
+        parsed_data = merge_fragments(fragments)
+        print(f"📊 Extracted: {len(parsed_data['skills'])} skills, {len(parsed_data['experience'])} experiences, {len(parsed_data['projects'])} projects")
+        return parsed_data
+    
+    def _remember_sections(self, raw_text: str, parsed_data: Dict[str, Any]):
+        """Store a full parse per section so the next edit of this resume parses incrementally"""
+        for section_hash, fragment in attribute_fragments(segment_resume(raw_text), parsed_data).items():
+            parse_cache.put(parse_cache.section_key(section_hash, PARSER_VERSION), fragment)
+    
+    def _cross_check_skills(self, parsed_data: Dict[str, Any], text: str) -> Dict[str, Any]:
+        """Add known skills the LLM missed that the text names unambiguously. Listed skills the
+        automaton can't find are kept (it misses forms like "Java8") and only reported."""
+        skills = parsed_data.get("skills")
+        if not isinstance(skills, list):
+            return parsed_data
+        check = self.skill_extractor.cross_check(skills, text)
+        if check["unsupported"] or check["missed"]:
+            print(f"🔎 Skill cross-check: unverified {check['unsupported']}, added {check['missed']}")
+        parsed_data["skills"] = skills + check["missed"]
+        return parsed_data
+    
+    async def _parse_section(self, section: ResumeSection) -> Optional[Dict[str, Any]]:
+        """Parse a single resume section with a prompt limited to the fields it can contain"""
+        # A skills list made only of known skills is extracted locally, no LLM call needed
+        if section.kind == "skills":
+            skills = self.skill_extractor.covers(section.text)
+            if skills is not None:
+                return {"skills": skills}
+        try:
+            prompt = SECTION_PARSE_PROMPT.format(
+                kind=section.title or section.kind,
+                section_text=section.text,
+                schema=SECTION_SCHEMAS.get(section.kind, SKILLS_SCHEMA)
+            )
+            async with self.section_semaphore:
+                fragment = await stream_json_completion(
+                    self.groq_client,
+                    model=PARSE_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1,
+                    max_tokens=SECTION_PARSE_MAX_TOKENS
+                )
+            return fragment if isinstance(fragment, dict) else None
+        except Exception as e:
+            print(f"❌ Section parsing failed ({section.kind}): {str(e)}")
+            return None
+    
+    def _is_cacheable(self, parsed_data: Dict[str, Any]) -> bool:
+        """Fallback and truncated results are never cached so the next upload retries the LLM"""
+        return "error" not in parsed_data and not parsed_data.get("truncated")
+    
+    async def _parse_with_llm(self, raw_text: str, progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """Parse complete resume data in one comprehensive call, decoding the JSON as it streams"""
+        try:
+            print("🚀 Starting comprehensive resume parsing...")
+            
+            prompt = RESUME_PARSE_PROMPT.format(raw_text=raw_text)
             
-            # Parse JSON
-            parsed_data = json.loads(response_text)
+            def on_field(field: str, value: Any):
+                if progress:
+                    progress("field", field=field, value=value)
+            
+            # Use Groq for comprehensive parsing
+            parsed_data = await stream_json_completion(
+                self.groq_client,
+                on_field=on_field,
+                model=PARSE_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.1,
+                max_tokens=PARSE_MAX_TOKENS
+            )
+            if not isinstance(parsed_data, dict):
+                raise ValueError("LLM response is not a JSON object")
             
             print(f"✅ Comprehensive parsing completed!")
             print(f"📊 Extracted: {len(parsed_data.get('skills', []))} skills, {len(parsed_data.get('experience', []))} experiences, {len(parsed_data.get('projects', []))} projects")
             
             return parsed_data
             
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parsing failed: {e}")
-            print(f"Raw response: {response_text[:500]}...")
-            
-            # Try one more aggressive cleanup
-            try:
-                # Find the JSON object boundaries
-                start_brace = response_text.find('{')
-                end_brace = response_text.rfind('}')
-                
-                if start_brace != -1 and end_brace != -1 and end_brace > start_brace:
-                    json_content = response_text[start_brace:end_brace + 1]
-                    parsed_data = json.loads(json_content)
-                    print("✅ Successfully parsed JSON after aggressive cleanup!")
-                    print(f"📊 Extracted: {len(parsed_data.get('skills', []))} skills, {len(parsed_data.get('experience', []))} experiences, {len(parsed_data.get('projects', []))} projects")
-                    return parsed_data
-                else:
-                    print("❌ Could not find valid JSON boundaries")
-            except Exception as cleanup_error:
-                print(f"❌ Aggressive cleanup also failed: {cleanup_error}")
+        except TruncatedJSONError as e:
+            if not isinstance(e.value, dict):
+                return self._get_fallback_data(raw_text)
+            # Keep what was complete, but flag it so it is neither cached nor stored
+            print("⚠️ Resume parse was truncated - returning the complete sections without storing them")
+            return {**e.value, "truncated": True, "error": "Resume parsing was cut off; some sections may be missing"}
             
+        except json.JSONDecodeError:
             return self._get_fallback_data(raw_text)
             
         except Exception as e:
@@ -223,75 +452,46 @@ class ComprehensiveResumeParser:
             "error": "Parsing failed, manual review needed"
         }
     
-    async def update_resume_in_supabase(self, resume_id: str, parsed_data: Dict[str, Any]):
-        """Update resume record in Supabase with parsed data"""
+    async def update_resume_in_supabase(self, resume_id: str, parsed_data: Dict[str, Any]) -> bool:
+        """Update resume record in Supabase with parsed data; returns whether the write succeeded.
+        Raises WriteRejectedError when retrying can't help: the store rejected the data or the resume doesn't exist"""
         try:
             print(f"💾 Storing parsed data in Supabase for resume {resume_id}...")
-            
-            # Import Supabase client
-            import httpx
-            
-            supabase_url = os.getenv("SUPABASE_URL")
-            service_key = os.getenv("SUPABASE_SERVICE_KEY")
-            
-            # Update resume record
-            update_data = {
-                "parsed_data": parsed_data
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {service_key}",
-                "apikey": service_key,
-                "Content-Type": "application/json"
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.patch(
-                    f"{supabase_url}/rest/v1/resumes?id=eq.{resume_id}",
-                    json=update_data,
-                    headers=headers
-                )
-                
-                if response.status_code == 204:
-                    print("✅ Resume data stored in Supabase successfully!")
-                else:
-                    print(f"❌ Failed to store in Supabase: {response.status_code} - {response.text}")
-                    
-        except Exception as e:
+            user_id = await storage.update_resume(resume_id, {"parsed_data": parsed_data})
+        except StorageError as e:
             print(f"❌ Supabase update failed: {str(e)}")
+            if e.status_code is not None and 400 <= e.status_code < 500 and e.status_code not in TRANSIENT_STATUS_CODES:
+                raise WriteRejectedError(str(e))
+            return False
+        if not user_id:
+            raise WriteRejectedError(f"No resume with id {resume_id}")
+        self.invalidate_parsed_resume(user_id)
+        print("✅ Resume data stored in Supabase successfully!")
+        return True
     
+    def invalidate_parsed_resume(self, user_id: str):
+        self.parsed_resume_cache.pop(user_id)
+        self._resume_invalidations += 1
+
     async def get_parsed_resume_from_supabase(self, user_id: str) -> Dict[str, Any]:
-        """Get parsed resume data from Supabase"""
+        """Get parsed resume data, read through the per-user cache"""
+        cached = self.parsed_resume_cache.get(user_id)
+        if cached is not None:
+            print(f"⚡ Parsed resume cache hit for user {user_id}")
+            return cached
         try:
             print(f"📖 Getting parsed resume data from Supabase for user {user_id}...")
+            invalidations = self._resume_invalidations
+            parsed_data = await storage.get_latest_parsed_resume(user_id)
+            if parsed_data:
+                print("✅ Found parsed resume data in Supabase")
+                if invalidations == self._resume_invalidations:
+                    self.parsed_resume_cache.set(user_id, parsed_data)
+                return parsed_data
             
-            import httpx
-            
-            supabase_url = os.getenv("SUPABASE_URL")
-            service_key = os.getenv("SUPABASE_SERVICE_KEY")
-            
-            headers = {
-                "Authorization": f"Bearer {service_key}",
-                "apikey": service_key
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{supabase_url}/rest/v1/resumes?user_id=eq.{user_id}&parsed_data=not.is.null&order=created_at.desc&limit=1",
-                    headers=headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data and len(data) > 0:
-                        parsed_data = data[0].get("parsed_data")
-                        if parsed_data:
-                            print("✅ Found parsed resume data in Supabase")
-                            return parsed_data
-                
-                print("❌ No parsed resume data found in Supabase")
-                return None
+            print("❌ No parsed resume data found in Supabase")
+            return None
                 
-        except Exception as e:
+        except StorageError as e:
             print(f"❌ Failed to get parsed resume from Supabase: {str(e)}")
             return None
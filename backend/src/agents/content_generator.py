@@ -2,12 +2,28 @@
 LangGraph-powered content generation agents for job applications
 """
 import os
+import asyncio
 from typing import Dict, Any, List
-from groq import Groq
+from groq import Groq, APIConnectionError, APIStatusError
 import json
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 from typing_extensions import TypedDict
+from agents.template_content_generator import template_content_generator
+from utils.circuit_breaker import CircuitBreaker
+
+# Total time budget for all LLM calls of one generation request
+CONTENT_LLM_DEADLINE_SECONDS = float(os.getenv("CONTENT_LLM_DEADLINE_SECONDS", "8"))
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM deadline is exceeded or its circuit is open"""
+
+def _is_outage(error: Exception) -> bool:
+    """Errors that say Groq is down or overloaded (timeouts, connection errors, 5xx, 429);
+    a rejected request (bad input, auth) says nothing about its health"""
+    if isinstance(error, APIConnectionError):  # includes APITimeoutError
+        return True
+    return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
 
 class ContentGenerationState(TypedDict):
     """State for content generation workflow"""
@@ -17,13 +33,17 @@ class ContentGenerationState(TypedDict):
     content_type: str  # "cold_email", "cover_letter", "linkedin_dm"
     generated_content: str
     personalization_notes: List[str]
+    generation_method: str  # "llm" or "template"
+    deadline: float  # event loop time by which LLM calls must finish
     error: str
 
 class ContentGeneratorAgent:
     """LangGraph agent for generating personalized job application content"""
     
     def __init__(self):
-        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        # No client retries: they would outlive the request deadline, and the circuit handles outages
+        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+        self.llm_circuit = CircuitBreaker("groq_content", failure_threshold=3, reset_timeout=30.0)
         self.workflow = self._build_workflow()
     
     def _build_workflow(self) -> StateGraph:
@@ -45,6 +65,39 @@ class ContentGeneratorAgent:
         
         return workflow.compile()
     
+    async def _call_llm(self, state: ContentGenerationState, prompt: str, temperature: float) -> str:
+        """Call Groq within the request deadline, tripping the circuit on timeouts and outages"""
+        if not self.llm_circuit.allow_request():
+            raise LLMUnavailableError("LLM circuit is open")
+        
+        remaining = state["deadline"] - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise LLMUnavailableError("LLM deadline exceeded")
+        
+        try:
+            response = await asyncio.wait_for(
+                asyncio.to_thread(
+                    self.groq_client.chat.completions.create,
+                    model="llama-3.1-8b-instant",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    max_tokens=1500,
+                    # The client gives up too, so a timed-out call doesn't keep its worker thread
+                    timeout=remaining
+                ),
+                timeout=remaining
+            )
+        except asyncio.TimeoutError:
+            self.llm_circuit.record_failure()
+            raise LLMUnavailableError(f"LLM deadline of {CONTENT_LLM_DEADLINE_SECONDS}s exceeded")
+        except Exception as e:
+            if _is_outage(e):
+                self.llm_circuit.record_failure()
+            raise
+        
+        self.llm_circuit.record_success()
+        return response.choices[0].message.content.strip()
+    
     async def _analyze_context(self, state: ContentGenerationState) -> ContentGenerationState:
         """Analyze job and resume context for personalization"""
         try:
@@ -131,16 +184,22 @@ class ContentGeneratorAgent:
                 raise ValueError(f"Unknown content type: {state['content_type']}")
             
             # Generate content using Groq
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=1500
-            )
-            
-            state["generated_content"] = response.choices[0].message.content.strip()
+            state["generated_content"] = await self._call_llm(state, prompt, temperature=0.7)
+            state["generation_method"] = "llm"
             print(f"✅ Generated {len(state['generated_content'])} characters of content")
             
+        except LLMUnavailableError as e:
+            # Only an overrun deadline or an open circuit falls back; other errors are real failures
+            if template_content_generator.supports(state["content_type"]):
+                print(f"⚡ LLM unavailable ({e}), using template fallback")
+                state["generated_content"] = template_content_generator.generate(
+                    state["job_data"], state["resume_data"], state["skill_match_data"], state["content_type"]
+                )
+                state["generation_method"] = "template"
+                return state
+            
+            print(f"❌ Content generation failed: {e}")
+            state["error"] = f"Content generation failed: {e}"
         except Exception as e:
             print(f"❌ Content generation failed: {e}")
             state["error"] = f"Content generation failed: {e}"
@@ -149,6 +208,10 @@ class ContentGeneratorAgent:
     
     async def _personalize_content(self, state: ContentGenerationState) -> ContentGenerationState:
         """Add personalization and skill-specific details"""
+        if state["generation_method"] == "template":
+            # Template drafts already embed matched skills; don't wait on the LLM again
+            return state
+        
         try:
             print("🎯 Personalizing content with skill matches...")
             
@@ -181,16 +244,12 @@ class ContentGeneratorAgent:
             5. Return ONLY the enhanced content
             """
             
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{"role": "user", "content": personalization_prompt}],
-                temperature=0.5,
-                max_tokens=1500
-            )
-            
-            state["generated_content"] = response.choices[0].message.content.strip()
+            state["generated_content"] = await self._call_llm(state, personalization_prompt, temperature=0.5)
             print("✅ Content personalization complete")
             
+        except LLMUnavailableError as e:
+            # The base content is already usable, so return it unpersonalized
+            print(f"⚡ Skipping personalization: {e}")
         except Exception as e:
             print(f"❌ Personalization failed: {e}")
             state["error"] = f"Personalization failed: {e}"
@@ -545,6 +604,8 @@ Sincerely,
                 "content_type": content_type,
                 "generated_content": "",
                 "personalization_notes": [],
+                "generation_method": "",
+                "deadline": asyncio.get_running_loop().time() + CONTENT_LLM_DEADLINE_SECONDS,
                 "error": ""
             }
             
@@ -562,7 +623,8 @@ Sincerely,
                 "success": True,
                 "content": final_state["generated_content"],
                 "personalization_notes": final_state["personalization_notes"],
-                "content_type": content_type
+                "content_type": content_type,
+                "generation_method": final_state["generation_method"]
             }
             
         except Exception as e:
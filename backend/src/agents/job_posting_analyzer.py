@@ -0,0 +1,354 @@
+"""
+Job Posting Analyzer - extracts role, company and skills from a job posting,
+locally first and with the LLM only for what local extraction can't find.
+Results are cached by canonical URL and by content hash so popular postings
+are analyzed once.
+"""
+import os
+import re
+import json
+import html
+import socket
+import asyncio
+import hashlib
+import ipaddress
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import httpx
+from groq import Groq
+from agents.skill_matcher import skill_matcher
+from utils.cache import TTLCache
+from utils.circuit_breaker import CircuitBreaker
+from utils.streaming_json import stream_json_completion
+
+JOB_CACHE_TTL_SECONDS = float(os.getenv("JOB_CACHE_TTL_SECONDS", str(24 * 3600)))
+JOB_CACHE_MAX_ENTRIES = int(os.getenv("JOB_CACHE_MAX_ENTRIES", "2048"))
+JOB_FETCH_TIMEOUT_SECONDS = float(os.getenv("JOB_FETCH_TIMEOUT_SECONDS", "10"))
+JOB_FETCH_MAX_BYTES = int(os.getenv("JOB_FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+JOB_FETCH_MAX_REDIRECTS = 5
+JOB_LLM_DEADLINE_SECONDS = float(os.getenv("JOB_LLM_DEADLINE_SECONDS", "15"))
+# Postings are truncated to this many characters before going into the prompt
+JOB_PROMPT_MAX_CHARS = 12000
+MIN_POSTING_CHARS = 100
+
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Query parameters that never change which posting a URL points to
+TRACKING_PARAMS = re.compile(r"^(?:utm_\w+|gclid|fbclid|msclkid|ref|refid|referer|referrer|source|src|trk|trackingid|lipi|_ga)$", re.IGNORECASE)
+
+SCRIPT_OR_STYLE = re.compile(r"<(script|style|noscript)[^>]*>.*?</\1>", re.IGNORECASE | re.DOTALL)
+JSON_LD_SCRIPT = re.compile(r"<script[^>]*type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>", re.IGNORECASE | re.DOTALL)
+TITLE_TAG = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+BLOCK_TAG = re.compile(r"</?(?:p|div|br|li|ul|ol|h[1-6]|tr|section|article)\b[^>]*>", re.IGNORECASE)
+ANY_TAG = re.compile(r"<[^>]+>")
+
+LABELED_FIELDS = {
+    "role": re.compile(r"^\s*(?:job title|position|role|title)\s*[:\-–]\s*(.{3,100})$", re.IGNORECASE | re.MULTILINE),
+    "company": re.compile(r"^\s*(?:company|employer|organization)\s*[:\-–]\s*(.{2,100})$", re.IGNORECASE | re.MULTILINE),
+    "location": re.compile(r"^\s*(?:location|job location|based in)\s*[:\-–]\s*(.{2,100})$", re.IGNORECASE | re.MULTILINE),
+}
+EXPERIENCE_PATTERN = re.compile(r"\b\d{1,2}\s*(?:\+|-\s*\d{1,2}|to\s*\d{1,2})?\s*(?:\+\s*)?years?(?:\s+of)?(?:\s+\w+){0,3}?\s+experience", re.IGNORECASE)
+SALARY_PATTERN = re.compile(
+    r"[$£€]\s?\d[\d,]*(?:\.\d+)?\s*[kK]?(?:\s*(?:-|–|to)\s*[$£€]?\s?\d[\d,]*(?:\.\d+)?\s*[kK]?)?(?:\s*(?:/|per)\s*(?:year|yr|hour|hr|annum))?"
+)
+REMOTE_PATTERN = re.compile(r"\b(?:fully remote|remote-first|100% remote|remote)\b", re.IGNORECASE)
+
+# Fields the LLM fills when local extraction leaves them empty, with the prompt description of each
+LLM_FIELDS = {
+    "role": "Job title/position name",
+    "company": "Company name",
+    "location": "Job location (city, state, remote, etc.)",
+    "description": "A concise 2-3 sentence summary of what this role involves and its main purpose",
+    "responsibilities": "A brief paragraph summarizing the key responsibilities and daily tasks",
+    "qualifications": "A concise paragraph summarizing the required qualifications and must-have requirements",
+    "preferredQualifications": "A brief paragraph summarizing preferred qualifications and nice-to-have skills",
+    "education": "Education requirements (degree, field of study)",
+    "experience": "Years of experience required",
+    "benefits": "A brief paragraph summarizing benefits, perks, and compensation details if mentioned",
+    "salary": "Salary range or compensation info if mentioned",
+}
+
+JOB_REMAINDER_PROMPT = """
+You are a job posting analyzer. Some fields of this posting were already extracted; fill in only the fields listed below.
+
+Job posting content:
+{content}
+{title_hint}
+Technical skills already identified: {known_skills}
+
+Return ONLY a JSON object with exactly these keys:
+{{
+{fields}
+  "additional_skills": ["Technical skills EXPLICITLY written in the posting that are not in the list above"]
+}}
+
+STRICT RULES:
+- additional_skills contains only programming languages, frameworks, libraries, tools, databases, cloud platforms and similar technologies that are literally written in the posting
+- Exclude soft skills, responsibilities and vague terms like "modern frameworks"
+- Use an empty string for fields the posting doesn't mention
+- Return ONLY the JSON object, no additional text
+"""
+
+
+class JobPostingUnavailableError(Exception):
+    """Raised when a posting URL can't be fetched or yields too little text"""
+
+
+def canonicalize_url(url: str) -> str:
+    """Lower-case scheme/host, drop fragments, tracking parameters and trailing slashes, sort the query"""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def content_hash(text: str) -> str:
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def html_to_text(page: str) -> str:
+    text = SCRIPT_OR_STYLE.sub(" ", page)
+    text = BLOCK_TAG.sub("\n", text)
+    text = html.unescape(ANY_TAG.sub(" ", text))
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _json_ld_job_posting(page: str) -> Optional[Dict[str, Any]]:
+    """The schema.org JobPosting object most job boards embed for search engines"""
+    for block in JSON_LD_SCRIPT.findall(page):
+        try:
+            data = json.loads(block.strip())
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            data = data.get("@graph", [data])
+        for candidate in data if isinstance(data, list) else []:
+            if isinstance(candidate, dict) and candidate.get("@type") == "JobPosting":
+                return candidate
+    return None
+
+
+def _structured_fields(posting: Dict[str, Any]) -> Dict[str, str]:
+    fields = {"role": posting.get("title") or ""}
+    organization = posting.get("hiringOrganization")
+    if isinstance(organization, dict):
+        fields["company"] = organization.get("name") or ""
+    location = posting.get("jobLocation")
+    location = location[0] if isinstance(location, list) and location else location
+    address = location.get("address") if isinstance(location, dict) else None
+    if isinstance(address, dict):
+        fields["location"] = ", ".join(
+            part for part in (address.get("addressLocality"), address.get("addressRegion")) if isinstance(part, str) and part
+        )
+    if posting.get("jobLocationType") == "TELECOMMUTE" and not fields.get("location"):
+        fields["location"] = "Remote"
+    return {key: html.unescape(value).strip() for key, value in fields.items() if isinstance(value, str) and value}
+
+
+async def _public_address(host: str, port: int) -> str:
+    """Resolve host, refusing it if any address is private, loopback, link-local or otherwise non-public"""
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise JobPostingUnavailableError(f"Can't resolve job posting host {host}: {e}")
+    addresses = [ipaddress.ip_address(info[4][0]) for info in infos]
+    if not addresses or any(not address.is_global or address.is_multicast for address in addresses):
+        raise JobPostingUnavailableError(f"Job posting host {host} is not a public address")
+    return str(addresses[0])
+
+
+async def _public_request(client: httpx.AsyncClient, target: httpx.URL) -> httpx.Request:
+    """
+    A GET for target that connects to the address we checked rather than resolving the host
+    again, so DNS can't switch it to an internal address between the check and the connect
+    """
+    if target.scheme not in ("http", "https") or not target.host:
+        raise JobPostingUnavailableError(f"Unsupported job posting URL: {target}")
+    host = target.raw_host.decode("ascii")
+    address = await _public_address(host, target.port or (443 if target.scheme == "https" else 80))
+    return client.build_request(
+        "GET", target.copy_with(host=address),
+        headers={**FETCH_HEADERS, "Host": target.netloc.decode("ascii")},
+        extensions={"sni_hostname": host}
+    )
+
+
+async def _read_capped(response: httpx.Response) -> str:
+    declared = response.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > JOB_FETCH_MAX_BYTES:
+        raise JobPostingUnavailableError(f"Job posting is larger than {JOB_FETCH_MAX_BYTES} bytes")
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body += chunk
+        if len(body) > JOB_FETCH_MAX_BYTES:
+            raise JobPostingUnavailableError(f"Job posting is larger than {JOB_FETCH_MAX_BYTES} bytes")
+    return body.decode(response.encoding or "utf-8", errors="replace")
+
+
+class JobPostingAnalyzer:
+    """Local-first job posting extraction with URL and content-hash caches"""
+
+    def __init__(self):
+        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self.llm_circuit = CircuitBreaker("groq_job_analysis", failure_threshold=3, reset_timeout=30.0)
+        self.skill_extractor = skill_matcher.skill_extractor
+        self.url_cache = TTLCache(maxsize=JOB_CACHE_MAX_ENTRIES, ttl=JOB_CACHE_TTL_SECONDS)
+        self.content_cache = TTLCache(maxsize=JOB_CACHE_MAX_ENTRIES, ttl=JOB_CACHE_TTL_SECONDS)
+        # Concurrent requests for the same posting share one analysis
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def analyze(self, url: Optional[str] = None, text: Optional[str] = None) -> Dict[str, Any]:
+        """Analyze a posting given by URL or pasted text; returns the job data plus cache/method metadata"""
+        structured: Dict[str, str] = {}
+        page_title = None
+        canonical_url = None
+        if url and not text:
+            url = url.strip() if "://" in url else f"https://{url.strip()}"
+            canonical_url = canonicalize_url(url)
+            cached = self.url_cache.get(canonical_url)
+            if cached is not None:
+                print(f"⚡ Job posting cache hit for {canonical_url}")
+                return {**cached, "cached": True}
+            
+            page = await self._fetch(url)
+            text = html_to_text(page)
+            structured = _structured_fields(_json_ld_job_posting(page) or {})
+            # The page title is attacker-controlled and often "Role | Company | Site", so it only
+            # helps the LLM; it never becomes the role on its own
+            title = TITLE_TAG.search(page)
+            if title:
+                page_title = html.unescape(" ".join(title.group(1).split()))[:200]
+
+        if not text or len(text) < MIN_POSTING_CHARS:
+            raise JobPostingUnavailableError("Insufficient content extracted from job posting")
+
+        digest = content_hash(text)
+        job_data = self.content_cache.get(digest)
+        cached = job_data is not None
+        if cached:
+            print("⚡ Job posting cache hit on content hash")
+        else:
+            future = self._in_flight.get(digest)
+            if future is None:
+                future = asyncio.ensure_future(self._analyze_content(text, structured, page_title))
+                self._in_flight[digest] = future
+                future.add_done_callback(lambda _: self._in_flight.pop(digest, None))
+            job_data = await asyncio.shield(future)
+            # Results degraded by an LLM failure are served but not cached
+            if job_data["analysis_method"] == "local_fallback":
+                return {**job_data, "cached": False}
+            self.content_cache.set(digest, job_data)
+
+        if canonical_url:
+            self.url_cache.set(canonical_url, job_data)
+        return {**job_data, "cached": cached}
+
+    async def _fetch(self, url: str) -> str:
+        """GET a posting from a public host only, re-checking every redirect hop and capping the body size"""
+        try:
+            async with httpx.AsyncClient(timeout=JOB_FETCH_TIMEOUT_SECONDS, follow_redirects=False) as client:
+                for _ in range(JOB_FETCH_MAX_REDIRECTS + 1):
+                    target = httpx.URL(url)
+                    response = await client.send(await _public_request(client, target), stream=True)
+                    try:
+                        if response.is_redirect:
+                            url = str(target.join(response.headers["location"]))
+                            continue
+                        if response.status_code != 200:
+                            raise JobPostingUnavailableError(f"HTTP {response.status_code} fetching job posting")
+                        return await _read_capped(response)
+                    finally:
+                        await response.aclose()
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            raise JobPostingUnavailableError(f"Failed to fetch job posting: {e}")
+        raise JobPostingUnavailableError(f"More than {JOB_FETCH_MAX_REDIRECTS} redirects fetching job posting")
+
+    def extract_locally(self, text: str, structured: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Everything that can be found without an LLM: skills, labeled fields, experience, salary"""
+        job_data: Dict[str, Any] = {key: "" for key in LLM_FIELDS}
+        for key, pattern in LABELED_FIELDS.items():
+            match = pattern.search(text)
+            if match:
+                job_data[key] = match.group(1).strip()
+        job_data.update(structured or {})
+        if not job_data["location"] and REMOTE_PATTERN.search(text):
+            job_data["location"] = "Remote"
+        experience = EXPERIENCE_PATTERN.search(text)
+        if experience:
+            job_data["experience"] = experience.group(0)
+        salary = SALARY_PATTERN.search(text)
+        if salary:
+            job_data["salary"] = salary.group(0).strip()
+        job_data["skills"] = self.skill_extractor.extract(text)
+        return job_data
+
+    async def _analyze_content(self, text: str, structured: Dict[str, str], page_title: Optional[str] = None) -> Dict[str, Any]:
+        job_data = self.extract_locally(text, structured)
+        missing = [key for key in LLM_FIELDS if not job_data.get(key)]
+        print(f"🔎 Local job extraction: {len(job_data['skills'])} skills, {len(LLM_FIELDS) - len(missing)}/{len(LLM_FIELDS)} fields")
+
+        if not missing:
+            job_data["analysis_method"] = "local"
+            return job_data
+        try:
+            remainder = await self._complete_with_llm(text, job_data["skills"], missing, page_title)
+        except Exception as e:
+            print(f"⚠️ LLM job analysis unavailable ({e}), returning local extraction")
+            job_data["analysis_method"] = "local_fallback"
+            return job_data
+
+        for key in missing:
+            value = remainder.get(key)
+            if isinstance(value, str) and value.strip():
+                job_data[key] = value.strip()
+        # LLM skills must survive the automaton's cross-check against the posting text
+        additional = [skill for skill in remainder.get("additional_skills", []) if isinstance(skill, str) and skill.strip()]
+        check = self.skill_extractor.cross_check(additional, text)
+        known = {skill.lower() for skill in job_data["skills"]}
+        job_data["skills"] += [skill for skill in check["confirmed"] if skill.lower() not in known]
+        job_data["analysis_method"] = "local+llm"
+        return job_data
+
+    async def _complete_with_llm(self, text: str, known_skills: List[str], missing: List[str],
+                                 page_title: Optional[str] = None) -> Dict[str, Any]:
+        if not self.llm_circuit.allow_request():
+            raise RuntimeError("LLM circuit is open")
+
+        prompt = JOB_REMAINDER_PROMPT.format(
+            content=text[:JOB_PROMPT_MAX_CHARS],
+            title_hint=f"\nPage title (may include the site name; a hint only): {page_title}\n" if page_title else "",
+            known_skills=", ".join(known_skills) or "none",
+            fields="".join(f'  "{key}": "{LLM_FIELDS[key]}",\n' for key in missing),
+        )
+        try:
+            result = await asyncio.wait_for(
+                stream_json_completion(
+                    self.groq_client,
+                    model="llama-3.1-8b-instant",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.2,
+                    max_tokens=1500
+                ),
+                timeout=JOB_LLM_DEADLINE_SECONDS
+            )
+            if not isinstance(result, dict):
+                raise ValueError("No JSON object in LLM response")
+        except Exception:
+            self.llm_circuit.record_failure()
+            raise
+        self.llm_circuit.record_success()
+        return result
+
+
+# Global instance
+job_posting_analyzer = JobPostingAnalyzer()
@@ -1,30 +1,21 @@
 """
 Simple Credit Management System - No external dependencies
-Works with existing FastAPI and httpx
+Works with existing FastAPI and the configured storage backend
 """
 
 import os
 import json
-from datetime import datetime
-from typing import Dict, Optional
-import httpx
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Supabase config
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_SERVICE_KEY")
-
-# Debug logging
-print(f"🔧 SUPABASE_URL: {SUPABASE_URL}")
-print(f"🔧 SUPABASE_ANON_KEY exists: {bool(SUPABASE_ANON_KEY)}")
-print(f"🔧 SUPABASE_SERVICE_KEY exists: {bool(os.getenv('SUPABASE_SERVICE_KEY'))}")
-
-if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-    print("❌ Missing Supabase configuration!")
-    print(f"   SUPABASE_URL: {SUPABASE_URL}")
-    print(f"   SUPABASE_ANON_KEY: {SUPABASE_ANON_KEY}")
+import base64
+import time
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from utils.cache import TTLCache
+from utils.transaction_logger import TransactionLogger, SegmentRejectedError
+from utils.batch_loader import BatchLoader
+from utils.storage import StorageBackend, StorageError, TRANSIENT_STATUS_CODES
+from utils.data_store import storage
 
 # Credit costs
 CREDIT_COSTS = {
@@ -39,88 +30,166 @@ CREDIT_COSTS = {
     "premium_feature": 3
 }
 
+# Balances only change through this service (write-through) or Stripe purchases (invalidated),
+# so a short TTL just bounds staleness from other instances
+CREDIT_BALANCE_TTL_SECONDS = float(os.getenv("CREDIT_BALANCE_TTL_SECONDS", "30"))
+CREDIT_BALANCE_CACHE_SIZE = int(os.getenv("CREDIT_BALANCE_CACHE_SIZE", "10000"))
+
+# Credit history is paged with a (created_at, id) keyset cursor, newest first
+HISTORY_COLUMNS = "id,user_id,action_type,credits_used,credits_before,credits_after,success,metadata,created_at"
+HISTORY_MAX_PAGE_SIZE = 100
+# Usage summaries cover at most this many days back
+HISTORY_MAX_SUMMARY_DAYS = 365
+
+# Retries of the compare-and-swap fallback when concurrent requests keep changing the balance
+DEDUCT_CAS_MAX_ATTEMPTS = 5
+# After the deduct_credits RPC looks undeployed, how long to use compare-and-swap before trying it again
+DEDUCT_RPC_RETRY_SECONDS = float(os.getenv("DEDUCT_RPC_RETRY_SECONDS", "300"))
+
+
+class InvalidHistoryCursorError(ValueError):
+    """Raised for a history cursor this service didn't issue (malformed or tampered with)"""
+
+
+class CreditLedgerError(Exception):
+    """Raised when a credit deduction could not be completed (store unreachable or too much contention)"""
+
+
+@dataclass
+class DeductionResult:
+    applied: bool  # False when the balance didn't cover the amount
+    credits_before: int
+    credits_after: int
+
+
+class StorageCreditLedger:
+    """
+    Atomic deductions against the store: one deduct_credits call (on Supabase the RPC in
+    backend/sql/credit_functions.sql), or compare-and-swap updates where it isn't deployed
+    """
+
+    def __init__(self, store: StorageBackend, rpc_retry_seconds: float = DEDUCT_RPC_RETRY_SECONDS):
+        self.store = store
+        self.rpc_retry_seconds = rpc_retry_seconds
+        # monotonic time until which the RPC is skipped; a 401/403/404 may be a transient
+        # deploy or grant problem, so it is probed again afterwards
+        self._rpc_unavailable_until = 0.0
+
+    @property
+    def rpc_available(self) -> bool:
+        return time.monotonic() >= self._rpc_unavailable_until
+
+    async def deduct(self, user_id: str, amount: int) -> Optional[DeductionResult]:
+        """Deduct amount if the balance covers it (a negative amount refunds); None when the user has no credit account"""
+        try:
+            if self.rpc_available:
+                try:
+                    row = await self.store.deduct_credits(user_id, amount)
+                    if row is None:
+                        return None
+                    return DeductionResult(row["applied"], row["credits_before"], row["credits_after"])
+                except StorageError as e:
+                    if e.status_code not in (401, 403, 404):
+                        raise
+                    print(f"⚠️ deduct_credits RPC unavailable - using compare-and-swap updates for {self.rpc_retry_seconds:.0f}s")
+                    self._rpc_unavailable_until = time.monotonic() + self.rpc_retry_seconds
+            return await self._deduct_with_cas(user_id, amount)
+        except StorageError as e:
+            raise CreditLedgerError(str(e))
+
+    async def _deduct_with_cas(self, user_id: str, amount: int) -> Optional[DeductionResult]:
+        # The PATCH only matches while the balance is still the one we read, so concurrent
+        # requests can't both spend it; the loser re-reads and tries again
+        for _ in range(DEDUCT_CAS_MAX_ATTEMPTS):
+            balances = await self.store.get_credit_balances([user_id])
+            if user_id not in balances:
+                return None
+            credits_before = balances[user_id]
+            if credits_before < amount:
+                return DeductionResult(False, credits_before, credits_before)
+            if await self.store.set_credits_if(user_id, credits_before, credits_before - amount):
+                return DeductionResult(True, credits_before, credits_before - amount)
+        raise CreditLedgerError("Credit balance changed concurrently too many times")
+
+
+class LocalCreditLedger:
+    """In-process stand-in with the deduct_credits contract, for tests and offline runs"""
+
+    def __init__(self, balances: Optional[Dict[str, int]] = None):
+        self.balances = dict(balances or {})
+        self._lock = asyncio.Lock()
+
+    async def deduct(self, user_id: str, amount: int) -> Optional[DeductionResult]:
+        async with self._lock:
+            if user_id not in self.balances:
+                return None
+            credits_before = self.balances[user_id]
+            if credits_before < amount:
+                return DeductionResult(False, credits_before, credits_before)
+            self.balances[user_id] = credits_before - amount
+            return DeductionResult(True, credits_before, credits_before - amount)
+
+
+def _rejected_by_store(error: Exception) -> bool:
+    """The store answered with an error (as opposed to being unreachable)"""
+    cause = error.__cause__
+    return isinstance(cause, StorageError) and cause.status_code is not None
+
+
 class SimpleCreditManager:
-    def __init__(self):
-        # Configure httpx client with proper timeouts
-        self.client = httpx.AsyncClient(
-            timeout=httpx.Timeout(10.0, connect=5.0),  # 10s total, 5s connect
-            limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
-        )
+    def __init__(self, store: StorageBackend = storage):
+        self.store = store
+        self.ledger = StorageCreditLedger(store)
+        self.balance_cache = TTLCache(maxsize=CREDIT_BALANCE_CACHE_SIZE, ttl=CREDIT_BALANCE_TTL_SECONDS)
+        # Started and flushed by the app lifespan; rows are spooled locally until then
+        self.transaction_log = TransactionLogger(self._insert_transactions)
+        # Balance lookups arriving within a few milliseconds share one get_credit_balances query;
+        # a batch the store rejects (e.g. a malformed user_id) is retried one user at a time
+        self.balance_loader = BatchLoader(self._fetch_balances, split_on=_rejected_by_store)
     
-    async def _supabase_request(self, method: str, table: str, data: Optional[Dict] = None, filters: Optional[Dict] = None):
-        """Make HTTP request to Supabase REST API"""
-        url = f"{SUPABASE_URL}/rest/v1/{table}"
-        headers = {
-            "apikey": SUPABASE_ANON_KEY,
-            "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
-        
-        # Add filters
-        if filters:
-            params = []
-            for key, value in filters.items():
-                params.append(f"{key}=eq.{value}")
-            if params:
-                url += "?" + "&".join(params)
-        
-        try:
-            print(f"🔗 Making {method} request to: {url}")
-            
-            if method == "GET":
-                response = await self.client.get(url, headers=headers)
-            elif method == "POST":
-                response = await self.client.post(url, headers=headers, json=data)
-            elif method == "PATCH":
-                response = await self.client.patch(url, headers=headers, json=data)
-            
-            print(f"📡 Response status: {response.status_code}")
-            if response.status_code >= 400:
-                print(f"❌ Response error: {response.text}")
-            
-            return response
-        except httpx.TimeoutException as e:
-            print(f"⏰ Supabase request timeout: {e}")
-            return None
-        except httpx.ConnectError as e:
-            print(f"🔌 Supabase connection error: {e}")
-            return None
-        except Exception as e:
-            print(f"❌ Supabase request failed: {e}")
-            return None
+    def invalidate_user_credits(self, user_id: str):
+        """Drop a cached balance that changed outside this service (e.g. a Stripe purchase)"""
+        self.balance_cache.pop(user_id)
     
     async def get_user_credits(self, user_id: str) -> Dict:
-        """Get current user credit balance"""
+        """Get current user credit balance (served from the balance cache when fresh)"""
         try:
-            print(f"💳 Getting credits for user: {user_id}")
+            credits = self.balance_cache.get(user_id)
+            if credits is not None:
+                return {
+                    "success": True,
+                    "credits": credits,
+                    "user_id": user_id
+                }
             
-            response = await self._supabase_request("GET", "user_credits", filters={"user_id": user_id})
+            print(f"💳 Getting credits for user: {user_id}")
             
-            if response and response.status_code == 200:
-                data = response.json()
-                if data:
-                    credits = data[0]['credits']
-                    print(f"💰 User has {credits} credits")
-                    return {
-                        "success": True,
-                        "credits": credits,
-                        "user_id": user_id
-                    }
-                else:
-                    # Create new user with 100 credits
-                    await self._create_user_credits(user_id, 10)
-                    return {
-                        "success": True,
-                        "credits": 10,
-                        "user_id": user_id
-                    }
-            else:
+            try:
+                credits = await self.balance_loader.load(user_id)
+            except CreditLedgerError:
                 return {
                     "success": False,
                     "error_message": "Failed to get credits",
                     "credits": 0
                 }
+            
+            if credits is not None:
+                print(f"💰 User has {credits} credits")
+                self.balance_cache.set(user_id, credits)
+                return {
+                    "success": True,
+                    "credits": credits,
+                    "user_id": user_id
+                }
+            else:
+                # Create new user with 100 credits
+                await self._create_user_credits(user_id, 10)
+                self.balance_cache.set(user_id, 10)
+                return {
+                    "success": True,
+                    "credits": 10,
+                    "user_id": user_id
+                }
                 
         except Exception as e:
             print(f"❌ Error getting credits: {e}")
@@ -130,19 +199,19 @@ class SimpleCreditManager:
                 "credits": 0
             }
     
+    async def _fetch_balances(self, user_ids: List[str]) -> Dict[str, int]:
+        """One query for the balances of many users; users without an account are left out"""
+        try:
+            return await self.store.get_credit_balances(user_ids)
+        except StorageError as e:
+            raise CreditLedgerError(str(e)) from e
+    
     async def _create_user_credits(self, user_id: str, initial_credits: int = 100):
         """Create initial credit record for new user"""
         try:
-            data = {
-                'user_id': user_id,
-                'credits': initial_credits,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            response = await self._supabase_request("POST", "user_credits", data=data)
+            await self.store.create_credit_account(user_id, initial_credits)
             print(f"🆕 Created new user with {initial_credits} credits")
-            return response
+            return True
             
         except Exception as e:
             print(f"❌ Error creating user credits: {e}")
@@ -153,22 +222,35 @@ class SimpleCreditManager:
         try:
             print(f"💳 Processing credit usage: {user_id}, {action_type}")
             
-            # Step 1: Get current credits
-            credit_info = await self.get_user_credits(user_id)
-            if not credit_info["success"]:
+            credits_required = CREDIT_COSTS.get(action_type, 1)
+            
+            # Check and deduct in one atomic operation, so concurrent requests can't double-spend
+            try:
+                deduction = await self.ledger.deduct(user_id, credits_required)
+                if deduction is None:
+                    # New user: create the account, then deduct from it
+                    await self._create_user_credits(user_id, 10)
+                    deduction = await self.ledger.deduct(user_id, credits_required)
+            except CreditLedgerError as e:
+                print(f"❌ Credit deduction failed: {e}")
+                deduction = None
+            
+            if deduction is None:
+                self.invalidate_user_credits(user_id)
                 return {
                     "success": False,
-                    "error_message": "Failed to get user credits",
+                    "error_message": "Failed to update credits",
                     "credits_before": 0,
                     "credits_after": 0,
                     "credits_used": 0
                 }
             
-            credits_before = credit_info["credits"]
-            credits_required = CREDIT_COSTS.get(action_type, 1)
+            credits_before = deduction.credits_before
+            credits_after = deduction.credits_after
+            # Write-through: the deduction returned the authoritative balance
+            self.balance_cache.set(user_id, credits_after)
             
-            # Step 2: Check if user has enough credits
-            if credits_before < credits_required:
+            if not deduction.applied:
                 return {
                     "success": False,
                     "error_message": f"Insufficient credits. Need {credits_required}, have {credits_before}",
@@ -177,27 +259,8 @@ class SimpleCreditManager:
                     "credits_used": 0
                 }
             
-            # Step 3: Deduct credits
-            credits_after = credits_before - credits_required
-            
-            update_data = {
-                'credits': credits_after,
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            response = await self._supabase_request("PATCH", "user_credits", data=update_data, filters={"user_id": user_id})
-            
-            if not response or response.status_code != 200:
-                return {
-                    "success": False,
-                    "error_message": "Failed to update credits",
-                    "credits_before": credits_before,
-                    "credits_after": credits_before,
-                    "credits_used": 0
-                }
-            
-            # Step 4: Log transaction
-            await self._log_transaction(user_id, action_type, credits_required, credits_before, credits_after, True, metadata)
+            # Log transaction
+            self._log_transaction(user_id, action_type, credits_required, credits_before, credits_after, True, metadata)
             
             print(f"✅ Credits deducted: {credits_required}. New balance: {credits_after}")
             
@@ -219,9 +282,41 @@ class SimpleCreditManager:
                 "credits_used": 0
             }
     
-    async def _log_transaction(self, user_id: str, action_type: str, credits_used: int, 
-                             credits_before: int, credits_after: int, success: bool, metadata: Optional[Dict] = None):
-        """Log credit transaction"""
+    async def refund_credit_usage(self, user_id: str, action_type: str, credits: int, metadata: Optional[Dict] = None) -> Dict:
+        """Give back credits deducted for an action that then failed"""
+        try:
+            # A negative deduction always applies and is just as atomic as a normal one
+            deduction = await self.ledger.deduct(user_id, -credits)
+            if deduction is None:
+                self.invalidate_user_credits(user_id)
+                return {
+                    "success": False,
+                    "error_message": "User not found"
+                }
+            
+            self.balance_cache.set(user_id, deduction.credits_after)
+            self._log_transaction(user_id, "refund", -credits, deduction.credits_before, deduction.credits_after, True,
+                                        {**(metadata or {}), "refunded_action": action_type})
+            print(f"↩️ Refunded {credits} credits for {action_type}. New balance: {deduction.credits_after}")
+            
+            return {
+                "success": True,
+                "credits_refunded": credits,
+                "credits_before": deduction.credits_before,
+                "credits_after": deduction.credits_after
+            }
+            
+        except Exception as e:
+            self.invalidate_user_credits(user_id)
+            print(f"❌ Credit refund failed: {e}")
+            return {
+                "success": False,
+                "error_message": f"Credit refund failed: {str(e)}"
+            }
+    
+    def _log_transaction(self, user_id: str, action_type: str, credits_used: int, 
+                         credits_before: int, credits_after: int, success: bool, metadata: Optional[Dict] = None):
+        """Queue a credit transaction for the next bulk insert (never blocks the request on the store)"""
         try:
             transaction_data = {
                 'user_id': user_id,
@@ -234,73 +329,90 @@ class SimpleCreditManager:
                 'created_at': datetime.now().isoformat()
             }
             
-            await self._supabase_request("POST", "credit_transactions", data=transaction_data)
-            print(f"📝 Transaction logged")
+            self.transaction_log.log(transaction_data)
             
         except Exception as e:
             print(f"❌ Failed to log transaction: {e}")
     
+    async def _insert_transactions(self, rows: List[Dict]) -> bool:
+        """Bulk insert transaction rows in one store call"""
+        try:
+            await self.store.insert_transactions(rows)
+            return True
+        except StorageError as e:
+            # A 4xx rejects the rows themselves; auth, timeout and rate-limit errors pass with time
+            if e.status_code is not None and 400 <= e.status_code < 500 and e.status_code not in TRANSIENT_STATUS_CODES:
+                raise SegmentRejectedError(str(e))
+            return False
+    
     async def add_credits(self, user_id: str, credits_to_add: int, reason: str = "manual_addition") -> Dict:
         """Add credits to user account"""
         try:
-            # Get current credits
-            credit_info = await self.get_user_credits(user_id)
-            if not credit_info["success"]:
+            # Added atomically (a negative deduction), so purchases can't race with spending
+            deduction = await self.ledger.deduct(user_id, -credits_to_add)
+            if deduction is None:
+                await self._create_user_credits(user_id, 10)
+                deduction = await self.ledger.deduct(user_id, -credits_to_add)
+            if deduction is None:
+                self.invalidate_user_credits(user_id)
                 return {
                     "success": False,
                     "error_message": "User not found"
                 }
             
-            current_credits = credit_info["credits"]
-            new_credits = current_credits + credits_to_add
+            current_credits = deduction.credits_before
+            new_credits = deduction.credits_after
+            self.balance_cache.set(user_id, new_credits)
             
+            # Log transaction
+            self._log_transaction(user_id, "credit_purchase", -credits_to_add, current_credits, new_credits, True, {"reason": reason})
             
-            update_data = {
-                'credits': new_credits,
-                'updated_at': datetime.now().isoformat()
+            return {
+                "success": True,
+                "credits_added": credits_to_add,
+                "credits_before": current_credits,
+                "credits_after": new_credits
             }
-            
-            response = await self._supabase_request("PATCH", "user_credits", data=update_data, filters={"user_id": user_id})
-            
-            if response and response.status_code == 200:
-                # Log transaction
-                await self._log_transaction(user_id, "credit_purchase", -credits_to_add, current_credits, new_credits, True, {"reason": reason})
-                
-                return {
-                    "success": True,
-                    "credits_added": credits_to_add,
-                    "credits_before": current_credits,
-                    "credits_after": new_credits
-                }
-            else:
-                return {
-                    "success": False,
-                    "error_message": "Failed to update credits"
-                }
                 
         except Exception as e:
+            self.invalidate_user_credits(user_id)
             return {
                 "success": False,
                 "error_message": f"Failed to add credits: {str(e)}"
             }
     
-    async def get_credit_history(self, user_id: str, limit: int = 50) -> Dict:
-        """Get user's credit transaction history"""
+    async def get_credit_history(self, user_id: str, limit: int = 50, cursor: Optional[str] = None,
+                                 include_summary: bool = False, summary_days: int = 30) -> Dict:
+        """
+        Get one page of the user's credit transactions, newest first; pass next_cursor back for the next page.
+        Raises InvalidHistoryCursorError for a cursor we didn't issue.
+        """
+        before = self._decode_history_cursor(cursor) if cursor else None
         try:
-            # Note: This is a simplified version - Supabase REST API ordering is limited
-            response = await self._supabase_request("GET", "credit_transactions", filters={"user_id": user_id})
+            limit = max(1, min(int(limit), HISTORY_MAX_PAGE_SIZE))
+            summary_days = max(1, min(int(summary_days), HISTORY_MAX_SUMMARY_DAYS))
+            
+            # Ordering, paging and column selection happen in the database; one extra row tells us if there's more
+            try:
+                transactions = await self.store.list_transactions(user_id, HISTORY_COLUMNS, limit + 1, before)
+            except StorageError:
+                transactions = None
             
-            if response and response.status_code == 200:
-                transactions = response.json()
-                # Sort by created_at (client-side since we can't do complex queries easily)
-                transactions.sort(key=lambda x: x['created_at'], reverse=True)
+            if transactions is not None:
+                has_more = len(transactions) > limit
                 transactions = transactions[:limit]
+                last = transactions[-1] if transactions else None
                 
-                return {
+                result = {
                     "success": True,
                     "transactions": transactions,
-                    "total_count": len(transactions)
+                    "total_count": len(transactions),
+                    "has_more": has_more,
+                    "next_cursor": self._encode_history_cursor(last["created_at"], last["id"]) if has_more else None
                 }
+                if include_summary:
+                    result["summary"] = await self.get_usage_summary(user_id, summary_days)
+                return result
             else:
                 return {
                     "success": False,
@@ -314,6 +426,28 @@ class SimpleCreditManager:
                 "error_message": f"Failed to get credit history: {str(e)}",
                 "transactions": []
             }
+    
+    async def get_usage_summary(self, user_id: str, days: int = 30) -> Optional[List[Dict]]:
+        """Credits spent per action type per day, aggregated in the database (credit_usage_summary RPC)"""
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        try:
+            return await self.store.credit_usage_summary(user_id, since)
+        except StorageError:
+            return None
+    
+    @staticmethod
+    def _encode_history_cursor(created_at: str, row_id: Any) -> str:
+        return base64.urlsafe_b64encode(json.dumps([created_at, row_id]).encode()).decode()
+    
+    @staticmethod
+    def _decode_history_cursor(cursor: Any):
+        try:
+            created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except Exception:
+            raise InvalidHistoryCursorError("Invalid history cursor")
+        if not isinstance(created_at, str) or not isinstance(row_id, (str, int)):
+            raise InvalidHistoryCursorError("Invalid history cursor")
+        return created_at, row_id
 
 # Global instance
 credit_manager = SimpleCreditManager()
\ No newline at end of file
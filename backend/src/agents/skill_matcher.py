@@ -3,11 +3,12 @@ Advanced Skill Matching Agent with Technology Ecosystem Understanding
 """
 
 import json
-import re
 from typing import List, Dict, Any, Tuple
 from groq import Groq
 import os
 from dataclasses import dataclass
+from utils.skill_extractor import SkillExtractor
+from utils.streaming_json import stream_json_completion
 
 @dataclass
 class SkillMatch:
@@ -86,6 +87,9 @@ class AdvancedSkillMatcher:
             "full-stack": ["frontend", "backend", "database", "web development"],
             "microservices": ["distributed systems", "api", "scalability", "architecture"]
         }
+        
+        # Linear-time dictionary extractor over the ecosystem keys plus aliases
+        self.skill_extractor = SkillExtractor.from_ecosystems(self.skill_ecosystems)
     
     def normalize_skill(self, skill: str) -> str:
         """Normalize skill name for better matching"""
@@ -210,44 +214,26 @@ class AdvancedSkillMatcher:
         """
         
         try:
-            chat_completion = self.groq_client.chat.completions.create(
+            # Streamed in a worker thread and decoded as it arrives, so the event loop never blocks
+            parsed_result = await stream_json_completion(
+                self.groq_client,
+                allow_truncated=True,  # a partial analysis is still useful and is never cached
                 messages=[{"role": "user", "content": prompt}],
                 model="llama-3.1-8b-instant",  # Use larger model for better reasoning
                 temperature=0.1,
                 max_tokens=1500
             )
-            
-            response_text = chat_completion.choices[0].message.content
-            
-            if not response_text:
-                print("❌ Groq returned empty response")
+            if not isinstance(parsed_result, dict):
+                print("❌ Groq response is not a JSON object")
                 return None
-                
-            response_text = response_text.strip()
-            print(f"🤖 Raw Groq response: {response_text[:200]}...")
-            
-            # Clean and parse JSON
-            if response_text.startswith('```json'):
-                response_text = response_text.replace('```json', '').replace('```', '').strip()
-            elif response_text.startswith('```'):
-                response_text = response_text.replace('```', '').strip()
-            
-            # Try to extract JSON if it's embedded in text
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(0)
-            
-            parsed_result = json.loads(response_text)
             print(f"✅ Successfully parsed AI response")
             return parsed_result
             
         except json.JSONDecodeError as e:
             print(f"❌ JSON parsing failed: {e}")
-            print(f"Raw response: {response_text[:500] if 'response_text' in locals() else 'No response'}")
             return None
         except Exception as e:
             print(f"❌ AI matching failed: {e}")
-            print(f"Response type: {type(chat_completion.choices[0].message.content) if 'chat_completion' in locals() else 'No completion'}")
             return None
     
     async def analyze_skills_comprehensive(self, job_skills: List[str], resume_skills: List[str]) -> 'SkillAnalysisResult':
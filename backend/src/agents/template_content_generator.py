@@ -0,0 +1,151 @@
+"""
+Template-based content generator - local fallback when the LLM is slow or down
+"""
+from typing import Dict, Any, List
+
+LINKEDIN_CONNECTION_LIMIT = 200
+
+
+class TemplateContentGenerator:
+    """Fills structured outreach templates from job, resume and skill match data"""
+
+    SUPPORTED_TYPES = ("linkedin_connection_note", "linkedin_dm", "cold_email")
+
+    def supports(self, content_type: str) -> bool:
+        return content_type in self.SUPPORTED_TYPES
+
+    def generate(self, job_data: Dict[str, Any], resume_data: Dict[str, Any],
+                 skill_match_data: Dict[str, Any], content_type: str) -> str:
+        """Generate a ready-to-send draft without any network calls"""
+        if not isinstance(resume_data, dict):
+            resume_data = {}
+        job_data = job_data or {}
+
+        context = {
+            "name": self._candidate_name(resume_data),
+            "role": job_data.get("role") or "the open role",
+            "company": job_data.get("company") or "your company",
+            "skills": self._top_skills(job_data, resume_data, skill_match_data or {}),
+            "current_role": self._current_role(resume_data),
+            "project": self._top_project(resume_data),
+        }
+
+        if content_type == "linkedin_connection_note":
+            return self._linkedin_connection_note(context)
+        if content_type == "linkedin_dm":
+            return self._linkedin_dm(context)
+        if content_type == "cold_email":
+            return self._cold_email(context)
+        raise ValueError(f"No template available for content type: {content_type}")
+
+    def _linkedin_connection_note(self, ctx: Dict[str, Any]) -> str:
+        skills = " & ".join(ctx["skills"][:2]) or "software development"
+        candidates = [
+            f"Hi! I'm interested in the {ctx['role']} role at {ctx['company']}. "
+            f"My background in {skills} fits well - would love to connect!",
+            f"Hi! I'm interested in the {ctx['role']} role at {ctx['company']}. Would love to connect!",
+            f"Hi! I'm interested in opportunities at {ctx['company']}. Would love to connect!",
+        ]
+        for note in candidates:
+            if len(note) <= LINKEDIN_CONNECTION_LIMIT:
+                return note
+        return candidates[-1][:LINKEDIN_CONNECTION_LIMIT]
+
+    def _linkedin_dm(self, ctx: Dict[str, Any]) -> str:
+        lines = [
+            "Hi there,",
+            "",
+            f"I came across the {ctx['role']} opening at {ctx['company']} and wanted to reach out directly.",
+        ]
+        if ctx["skills"]:
+            lines.append(f"I work hands-on with {self._join(ctx['skills'][:3])}, which lines up closely with what the team is looking for.")
+        if ctx["project"]:
+            lines.append(f"Most recently I built {ctx['project']}.")
+        lines.append("Would you be open to a quick chat about the role?")
+        lines.extend(["", "Thanks,", ctx["name"]])
+        return "\n".join(lines)
+
+    def _cold_email(self, ctx: Dict[str, Any]) -> str:
+        lines = [
+            f"Subject: Interest in {ctx['role']} Role at {ctx['company']}",
+            "",
+            "Hi,",
+            "",
+            f"I'm reaching out about the {ctx['role']} position at {ctx['company']}.",
+        ]
+        background = f"As a {ctx['current_role']}, I" if ctx["current_role"] else "I"
+        if ctx["skills"]:
+            lines.append(f"{background} have practical experience with {self._join(ctx['skills'][:3])}, "
+                         f"which map directly to the requirements of this role.")
+        if ctx["project"]:
+            lines.append(f"A recent example is {ctx['project']}.")
+        lines.extend([
+            "",
+            f"I'd welcome the chance to discuss how I could contribute to {ctx['company']}. "
+            "Would you have 15 minutes for a short call this week?",
+            "",
+            "Best regards,",
+            ctx["name"],
+        ])
+        return "\n".join(lines)
+
+    def _candidate_name(self, resume_data: Dict[str, Any]) -> str:
+        personal = resume_data.get("personal") if isinstance(resume_data.get("personal"), dict) else {}
+        name = resume_data.get("name") or personal.get("name")
+        return name if name and name != "Unknown" else "Your Name"
+
+    def _top_skills(self, job_data: Dict[str, Any], resume_data: Dict[str, Any],
+                    skill_match_data: Dict[str, Any]) -> List[str]:
+        """Matched job skills first, then job skills present on the resume, then resume skills"""
+        skills: List[str] = []
+        for match in skill_match_data.get("matched_skills", []) or []:
+            if isinstance(match, dict) and match.get("job_skill"):
+                skills.append(match["job_skill"])
+
+        resume_skills = [self._skill_name(s) for s in resume_data.get("skills", []) or []]
+        resume_lookup = {s.lower() for s in resume_skills if s}
+        for job_skill in job_data.get("skills", []) or []:
+            if isinstance(job_skill, str) and job_skill.lower() in resume_lookup:
+                skills.append(job_skill)
+        skills.extend(s for s in resume_skills if s)
+
+        seen = set()
+        unique = []
+        for skill in skills:
+            if skill.lower() not in seen:
+                seen.add(skill.lower())
+                unique.append(skill)
+        return unique[:5]
+
+    def _current_role(self, resume_data: Dict[str, Any]) -> str:
+        experience = resume_data.get("experience") or []
+        if isinstance(experience, list) and experience and isinstance(experience[0], dict):
+            return experience[0].get("job_title") or experience[0].get("title") or ""
+        return ""
+
+    def _top_project(self, resume_data: Dict[str, Any]) -> str:
+        projects = resume_data.get("projects") or []
+        if not (isinstance(projects, list) and projects and isinstance(projects[0], dict)):
+            return ""
+        project = projects[0]
+        name = project.get("name", "")
+        technologies = project.get("technologies") or []
+        if name and technologies:
+            return f"{name} using {self._join([str(t) for t in technologies[:3]])}"
+        return name
+
+    @staticmethod
+    def _skill_name(skill: Any) -> str:
+        if isinstance(skill, dict):
+            return skill.get("name", "")
+        return str(skill)
+
+    @staticmethod
+    def _join(items: List[str]) -> str:
+        if len(items) <= 1:
+            return "".join(items)
+        return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+# Global instance
+template_content_generator = TemplateContentGenerator()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark serial vs page-parallel PDF text extraction on synthetic PDFs
+
+Usage: python bench_pdf_extraction.py [pypdf2|pdfplumber]  (default: probe-selected engine)
+"""
+
+import asyncio
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.pdf_extraction import PDFExtractionPool, extract_text_from_pdf_bytes
+
+PAGE_COUNTS = [1, 2, 5, 10, 20, 50]
+LINES_PER_PAGE = 45
+RUNS = 3
+ENGINE = sys.argv[1] if len(sys.argv) > 1 else None
+
+
+def build_synthetic_pdf(page_count: int) -> bytes:
+    """Build a minimal valid PDF with page_count pages of resume-like text"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page_number in range(page_count):
+        lines = [
+            f"Page {page_number + 1} - Senior Software Engineer, Example Corp {line}: built Python, "
+            f"FastAPI and PostgreSQL services handling {line * 1000} requests per day"
+            for line in range(LINES_PER_PAGE)
+        ]
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream_bytes = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % page_count
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(pdf)
+
+
+async def benchmark():
+    pool = PDFExtractionPool()
+    print(f"🧪 PDF extraction benchmark ({pool.max_workers} workers, engine={ENGINE or 'auto'}, best of {RUNS})")
+    print("=" * 60)
+    print(f"{'pages':>6} {'serial (s)':>12} {'parallel (s)':>14} {'speedup':>9}")
+
+    # Warm the pool so worker start-up isn't counted
+    await pool.extract_text(build_synthetic_pdf(1), ENGINE)
+
+    try:
+        for page_count in PAGE_COUNTS:
+            pdf_bytes = build_synthetic_pdf(page_count)
+
+            serial_times = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                serial_text = extract_text_from_pdf_bytes(pdf_bytes, ENGINE)
+                serial_times.append(time.perf_counter() - start)
+
+            parallel_times = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                parallel_text = await pool.extract_text(pdf_bytes, ENGINE)
+                parallel_times.append(time.perf_counter() - start)
+
+            assert serial_text == parallel_text, f"Output mismatch for {page_count} pages"
+            serial, parallel = min(serial_times), min(parallel_times)
+            print(f"{page_count:>6} {serial:>12.3f} {parallel:>14.3f} {serial / parallel:>8.2f}x")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
@@ -1,16 +1,30 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, BackgroundTasks, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from dotenv import load_dotenv
 import os
+import json
 import asyncio
+import base64
+import hashlib
 import stripe
+from contextlib import asynccontextmanager
 from datetime import datetime
-from agents.comprehensive_resume_parser import ComprehensiveResumeParser
+from agents.comprehensive_resume_parser import ComprehensiveResumeParser, PARSE_MODES
 from agents.content_generator import ContentGeneratorAgent
-from agents.simple_credit_manager import credit_manager
+from agents.simple_credit_manager import credit_manager, InvalidHistoryCursorError
 from agents.skill_matcher import skill_matcher
+from agents.job_posting_analyzer import job_posting_analyzer, JobPostingUnavailableError
 from models.schemas import ResumeParsingRequest, ResumeParsingResponse, ParsedResume
 from utils.credit_decorator import require_credits, check_credits_only
+from utils.credit_reservations import credit_reservations
+from utils.pdf_extraction import pdf_extraction_pool
+from utils.upload_spool import (spool_multipart_upload, spool_to_file, UploadTooLargeError, InvalidUploadError,
+                                RESUME_UPLOAD_MAX_BYTES)
+from utils.job_queue import JobQueue, QueueFullError
+from utils.write_behind import WriteBehindQueue
+from utils.data_store import storage, STORAGE_BACKEND
+from utils.storage import StorageError
 
 # Load environment variables
 import os
@@ -28,10 +42,26 @@ load_dotenv(dotenv_path=env_path)
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 print("✅ Stripe API key configured successfully")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Starting the write-behind queue also resumes writes spooled before the last shutdown
+    resume_write_behind.start()
+    credit_manager.transaction_log.start()
+    parse_job_queue.start()
+    yield
+    # Shutdown: stop background workers, let refunds land, then flush pending resume writes and transaction logs
+    await parse_job_queue.stop()
+    await credit_reservations.drain()
+    await resume_write_behind.stop()
+    await credit_manager.transaction_log.stop()
+    await storage.close()
+    pdf_extraction_pool.shutdown()
+
 app = FastAPI(
     title="AI Resume Analysis Service",
     description="LangGraph-powered resume parsing and job matching service",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow requests from Next.js frontend
@@ -48,6 +78,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH", "HEAD"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Add request logging middleware
@@ -76,75 +107,138 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "parse_resume_comprehensive": "/parse-resume-comprehensive",
+            "parse_resume_upload": "/parse-resume-upload",
+            "parse_resume_jobs": "/parse-resume-jobs",
             "get_parsed_resume": "/get-parsed-resume",
+            "extract_skills": "/skills/extract",
+            "analyze_job_posting": "/analyze-job-posting",
             "health": "/health"
         }
     }
 
 @app.get("/health")
 async def health_check():
-    # Test Supabase connectivity
-    supabase_status = "unknown"
-    try:
-        # Quick test of Supabase connection
-        import httpx
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(
-                f"{os.getenv('SUPABASE_URL')}/rest/v1/",
-                headers={"apikey": os.getenv('SUPABASE_ANON_KEY') or os.getenv('SUPABASE_SERVICE_KEY')}
-            )
-            supabase_status = "connected" if response.status_code < 500 else "error"
-    except Exception as e:
-        supabase_status = f"error: {str(e)}"
+    # Test connectivity of the configured storage backend (its primary store when tiered)
+    storage_status = "connected" if await storage.ping() else "error"
     
     return {
         "status": "healthy",
         "service": "ai-resume-analysis",
         "langgraph": "operational",
-        "supabase": supabase_status,
+        "storage": {"backend": STORAGE_BACKEND, "status": storage_status},
         "timestamp": datetime.now().isoformat()
     }
 
+# Parsed resumes are spooled locally and written to the store in the background, with retries
+resume_write_behind = WriteBehindQueue("resumes", comprehensive_parser.update_resume_in_supabase)
+
+async def _store_parsed_resume(resume_id: str, parsed_data: dict,
+                               message: str = "Resume parsed successfully; saving in the background") -> dict:
+    """
+    Queue parsed resume data for Supabase and build the API response without waiting for the write.
+    persistence is "queued" until the write lands; GET /resume-persistence/{resume_id} reports when
+    it has, and /get-parsed-resume sends the user's due writes first, so a healthy store reads its own writes.
+    """
+    if parsed_data.get("truncated"):
+        # A cut-off parse would replace the stored resume with one missing sections
+        return {
+            "success": True,
+            "message": "Resume parsed partially (output was cut off); not saved, retry to store it",
+            "persistence": "skipped",
+            "data": parsed_data
+        }
+    resume_write_behind.submit(resume_id, parsed_data)
+    
+    return {
+        "success": True,
+        "message": message,
+        "persistence": "queued",
+        "data": parsed_data
+    }
+
+async def _get_parsed_resume(user_id: str):
+    """Read the user's parsed resume after sending the user's own queued writes that are due, so a
+    just-parsed resume is visible (writes backing off after a failure stay queued and don't delay the read,
+    and other users' writes are left to the background writer)"""
+    if resume_write_behind.pending_count():
+        try:
+            await resume_write_behind.flush_keys(await storage.list_resume_ids(user_id))
+        except StorageError as e:
+            print(f"⚠️ Couldn't list resumes for user {user_id}, reading without flushing: {str(e)}")
+    return await comprehensive_parser.get_parsed_resume_from_supabase(user_id)
+
+@app.get("/resume-persistence/{resume_id}")
+async def get_resume_persistence(resume_id: str):
+    """Whether parsed data for a resume is still queued for storage ("queued"), has been written ("stored"),
+    or was rejected by the store and dead-lettered ("rejected")"""
+    return {
+        "resume_id": resume_id,
+        "persistence": _resume_persistence(resume_id)
+    }
+
+def _resume_persistence(resume_id: str) -> str:
+    if resume_write_behind.is_pending(resume_id):
+        return "queued"
+    return "rejected" if resume_write_behind.is_rejected(resume_id) else "stored"
+
+async def _refine_parsed_resume(resume_id: str, refine):
+    """Background half of a two-tier parse: run the LLM parse and replace the stored draft"""
+    try:
+        parsed_data = await refine()
+        resume_write_behind.submit(resume_id, parsed_data)
+        print(f"✅ Refined parse queued for storage for resume {resume_id}")
+    except Exception as e:
+        print(f"❌ Background resume refinement failed for {resume_id}: {str(e)}")
+
 @app.post("/parse-resume-comprehensive")
-async def parse_resume_comprehensive(request: dict):
+async def parse_resume_comprehensive(request: dict, background_tasks: BackgroundTasks):
     """
-    Comprehensive resume parsing - parse once, store in Supabase
+    Comprehensive resume parsing - parse once, store in Supabase.
+    With "draft": true a heuristic draft is stored and returned immediately and the LLM parse
+    replaces it in the background; data.parse_stage/parse_version tell clients which one they have.
     """
     try:
         resume_id = request.get("resume_id")
         raw_text = request.get("raw_text")
         is_pdf_buffer = request.get("is_pdf_buffer", False)
+        parse_mode = request.get("parse_mode")  # "monolithic" or "sections", defaults to RESUME_PARSE_MODE
+        draft = request.get("draft", False)
         
         if not resume_id or not raw_text:
             raise HTTPException(status_code=400, detail="resume_id and raw_text are required")
+        if parse_mode and parse_mode not in PARSE_MODES:
+            raise HTTPException(status_code=400, detail=f"parse_mode must be one of: {', '.join(PARSE_MODES)}")
         
         print(f"🚀 Starting comprehensive resume parsing for resume {resume_id}")
         
+        if draft:
+            result = await comprehensive_parser.parse_draft(raw_text, is_pdf_buffer, parse_mode)
+            if result is None:
+                raise HTTPException(status_code=400, detail="Failed to extract text from PDF buffer")
+            parsed_data, refine = result
+            if refine is None:
+                return await _store_parsed_resume(resume_id, parsed_data)
+            background_tasks.add_task(_refine_parsed_resume, resume_id, refine)
+            return await _store_parsed_resume(
+                resume_id, parsed_data,
+                message="Resume draft parsed; refined parse is running in the background"
+            )
+        
         # Handle different input types
         if is_pdf_buffer:
             print("📄 Received PDF buffer, extracting text...")
-            # Extract text from PDF buffer
-            extracted_text = comprehensive_parser.extract_text_from_pdf_base64(raw_text)
-            if not extracted_text:
+            # Extract text from PDF buffer in the process pool and parse (cached by content hash)
+            parsed_data = await comprehensive_parser.parse_pdf_base64(raw_text, parse_mode)
+            if parsed_data is None:
                 raise HTTPException(status_code=400, detail="Failed to extract text from PDF buffer")
-            print(f"✅ Extracted {len(extracted_text)} characters from PDF")
-            final_text = extracted_text
         else:
             print(f"📄 Received {len(raw_text)} characters of pre-extracted text")
-            final_text = raw_text
-        
-        # Parse complete resume data
-        parsed_data = await comprehensive_parser.parse_complete_resume(final_text)
+            parsed_data = await comprehensive_parser.parse_complete_resume(raw_text, parse_mode)
         
-        # Store in Supabase
-        await comprehensive_parser.update_resume_in_supabase(resume_id, parsed_data)
-        
-        return {
-            "success": True,
-            "message": "Resume parsed and stored successfully",
-            "data": parsed_data
-        }
+        return await _store_parsed_resume(resume_id, parsed_data)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Comprehensive resume parsing failed: {str(e)}")
         raise HTTPException(
@@ -152,33 +246,231 @@ async def parse_resume_comprehensive(request: dict):
             detail=f"Comprehensive resume parsing failed: {str(e)}"
         )
 
+async def _run_parse_job(payload: dict, report) -> dict:
+    """Parse job handler: extract -> parse -> store, reporting each stage.
+    The resume arrives as a spooled file (see submit_parse_job), deleted once the parse is done"""
+    resume_id, path = payload["resume_id"], payload["path"]
+    try:
+        if payload["is_pdf"]:
+            parsed_data = await comprehensive_parser.parse_pdf(path, payload["parse_mode"], progress=report)
+            if parsed_data is None:
+                raise ValueError("Failed to extract text from PDF buffer")
+        else:
+            raw_text = Path(path).read_text(encoding="utf-8")
+            report("extracted", characters=len(raw_text))
+            parsed_data = await comprehensive_parser.parse_complete_resume(raw_text, payload["parse_mode"], progress=report)
+    finally:
+        os.unlink(path)
+    report("parsed", skills=len(parsed_data.get("skills", [])))
+    
+    result = await _store_parsed_resume(resume_id, parsed_data)
+    if result["persistence"] != "queued":
+        return result
+    # The write is spooled, not persisted (the event's status is still "running", unlike the job's own "queued")
+    report("queued", persistence="queued")
+    # "stored" only once the write has landed; a job that gives up waiting finishes as queued
+    if await resume_write_behind.wait_written(resume_id, PARSE_JOB_STORE_WAIT_SECONDS):
+        report("stored", persistence="stored")
+        result = {**result, "message": "Resume parsed and saved successfully", "persistence": "stored"}
+    elif resume_write_behind.is_rejected(resume_id):
+        report("rejected", persistence="rejected")
+        result = {**result, "message": "Resume parsed, but the store rejected it; not saved", "persistence": "rejected"}
+    return result
+
+# How long a parse job waits for its write to land before finishing with persistence "queued"
+PARSE_JOB_STORE_WAIT_SECONDS = 10.0
+parse_job_queue = JobQueue(_run_parse_job)
+
+def _spool_parse_job_input(raw_text: str, is_pdf_buffer: bool) -> dict:
+    """Write a parse job's resume to a temp file so a queued job holds a path, not the document.
+    Base64 buffers are decoded first: PDFs are spooled as-is, anything else must be UTF-8 text"""
+    if not is_pdf_buffer:
+        data, is_pdf = raw_text.encode("utf-8"), False
+    else:
+        try:
+            data = base64.b64decode(raw_text)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="raw_text is not valid base64")
+        is_pdf = data.startswith(b'%PDF')
+        if not is_pdf:
+            try:
+                data = data.decode("utf-8").strip().encode("utf-8")
+            except UnicodeDecodeError:
+                raise HTTPException(status_code=400, detail="Buffer is neither a PDF nor UTF-8 text")
+    if len(data) > RESUME_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Resume exceeds {RESUME_UPLOAD_MAX_BYTES} bytes")
+    return {"path": spool_to_file(data, suffix=".pdf" if is_pdf else ".txt"), "is_pdf": is_pdf}
+
+@app.post("/parse-resume-jobs", status_code=202)
+async def submit_parse_job(request: dict):
+    """
+    Queue a comprehensive resume parse (same body as /parse-resume-comprehensive, plus the user_id
+    that owns resume_id) and return a job ID.
+    Progress (extracted, a "field" event per top-level field as the LLM streams it, parsed, queued,
+    and stored once the write has landed, or rejected if the store refused it) is available by polling or
+    as server-sent events.
+    """
+    user_id = request.get("user_id")
+    resume_id = request.get("resume_id")
+    raw_text = request.get("raw_text")
+    parse_mode = request.get("parse_mode")
+    
+    if not user_id or not resume_id or not raw_text:
+        raise HTTPException(status_code=400, detail="user_id, resume_id and raw_text are required")
+    if parse_mode and parse_mode not in PARSE_MODES:
+        raise HTTPException(status_code=400, detail=f"parse_mode must be one of: {', '.join(PARSE_MODES)}")
+    
+    try:
+        owned = resume_id in await storage.list_resume_ids(user_id)
+    except StorageError as e:
+        raise HTTPException(status_code=503, detail=f"Couldn't verify the resume owner: {str(e)}")
+    if not owned:
+        raise HTTPException(status_code=403, detail="Resume not found for this user")
+    
+    spooled = await asyncio.to_thread(_spool_parse_job_input, raw_text, request.get("is_pdf_buffer", False))
+    try:
+        job = await parse_job_queue.submit({
+            "user_id": user_id,
+            "resume_id": resume_id,
+            "parse_mode": parse_mode,
+            **spooled
+        })
+    except QueueFullError as e:
+        os.unlink(spooled["path"])
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    print(f"📥 Queued parse job {job.id} for resume {resume_id}")
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/parse-resume-jobs/{job.id}",
+        "events_url": f"/parse-resume-jobs/{job.id}/events"
+    }
+
+@app.get("/parse-resume-jobs/{job_id}")
+async def get_parse_job(job_id: str):
+    """Poll a parse job's status, progress events and (once stored) result"""
+    job = parse_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/parse-resume-jobs/{job_id}/events")
+async def stream_parse_job_events(job_id: str):
+    """Server-sent events for a parse job: one event per stage, then the final job state"""
+    if parse_job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        async for event in parse_job_queue.events(job_id):
+            yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+        job = parse_job_queue.get(job_id)
+        if job is not None:
+            yield f"event: job\ndata: {json.dumps(job.to_dict())}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/parse-resume-upload")
+async def parse_resume_upload(request: Request):
+    """
+    Comprehensive resume parsing from a multipart upload (fields: resume_id, file, optional parse_mode).
+    The PDF is streamed to a spooled temp file instead of arriving as base64 JSON.
+    """
+    upload = None
+    try:
+        upload = await spool_multipart_upload(request)
+        resume_id = upload.fields.get("resume_id")
+        parse_mode = upload.fields.get("parse_mode")
+        
+        if not resume_id or not upload.size:
+            raise HTTPException(status_code=400, detail="resume_id and file are required")
+        if parse_mode and parse_mode not in PARSE_MODES:
+            raise HTTPException(status_code=400, detail=f"parse_mode must be one of: {', '.join(PARSE_MODES)}")
+        if upload.head(4) != b'%PDF':
+            raise HTTPException(status_code=400, detail="Uploaded file is not a PDF")
+        
+        print(f"🚀 Starting comprehensive resume parsing for uploaded resume {resume_id} ({upload.size} bytes)")
+        
+        parsed_data = await comprehensive_parser.parse_pdf(upload.source, parse_mode)
+        if parsed_data is None:
+            raise HTTPException(status_code=400, detail="Failed to extract text from uploaded PDF")
+        
+        return await _store_parsed_resume(resume_id, parsed_data)
+        
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Uploaded resume parsing failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Uploaded resume parsing failed: {str(e)}"
+        )
+    finally:
+        if upload:
+            upload.close()
+
+def _parsed_resume_etag(data: dict) -> str:
+    """Strong ETag from a hash of the (projected) parsed data, stable across key order"""
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
 @app.post("/get-parsed-resume")
-async def get_parsed_resume(request: dict):
+async def get_parsed_resume(request: dict, if_none_match: str = Header(None)):
     """
-    Get parsed resume data from Supabase
+    Get parsed resume data from Supabase.
+    Optional "fields" (e.g. ["skills", "personal"]) limits the response to those top-level keys.
+    The response carries an ETag for exactly what was returned; sending it back in
+    If-None-Match gets a 304 with no body while that data is unchanged.
     """
     try:
         user_id = request.get("user_id")
+        fields = request.get("fields")
         
         if not user_id:
             raise HTTPException(status_code=400, detail="user_id is required")
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(",") if field.strip()]
+        if fields is not None and not (isinstance(fields, list) and all(isinstance(f, str) for f in fields)):
+            raise HTTPException(status_code=400, detail="fields must be a list of field names")
         
         print(f"📖 Getting parsed resume for user {user_id}")
         
         # Get parsed data from Supabase
-        parsed_data = await comprehensive_parser.get_parsed_resume_from_supabase(user_id)
+        parsed_data = await _get_parsed_resume(user_id)
         
-        if parsed_data:
-            return {
-                "success": True,
-                "data": parsed_data
-            }
-        else:
+        if not parsed_data:
             return {
                 "success": False,
                 "message": "No parsed resume found"
             }
         
+        if fields is not None:
+            parsed_data = {field: parsed_data[field] for field in fields if field in parsed_data}
+        etag = _parsed_resume_etag(parsed_data)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        
+        return JSONResponse({
+            "success": True,
+            "data": parsed_data
+        }, headers=headers)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Failed to get parsed resume: {str(e)}")
         raise HTTPException(
@@ -193,6 +485,51 @@ from agents.skill_matcher import skill_matcher
 # SKILL ANALYSIS ENDPOINTS
 # ============================================================================
 
+@app.post("/skills/extract")
+async def extract_skills(request: dict):
+    """
+    Zero-LLM skill extraction from resume or job description text (dictionary automaton)
+    """
+    text = request.get("text")
+    if not text:
+        raise HTTPException(status_code=400, detail="text is required")
+    
+    skills = skill_matcher.skill_extractor.extract(text)
+    return {
+        "success": True,
+        "skills": skills,
+        "method": "dictionary"
+    }
+
+@app.post("/analyze-job-posting")
+@require_credits("job_search")
+async def analyze_job_posting(request: dict):
+    """
+    Extract role/company/skills from a job posting URL or pasted text.
+    Cached by canonical URL and content hash; the LLM only fills fields local extraction can't.
+    URLs are only fetched from public hosts.
+    """
+    url = request.get("url")
+    manual_text = request.get("manual_text")
+    if not url and not manual_text:
+        raise HTTPException(status_code=400, detail="url or manual_text is required")
+    
+    try:
+        return await job_posting_analyzer.analyze(url=url, text=manual_text)
+    except JobPostingUnavailableError as e:
+        print(f"❌ Job posting unavailable: {str(e)}")
+        return {
+            "error": "scraping_blocked",
+            "message": "Unable to scrape this job posting. The site may be protected or the URL is invalid. Please paste the job description manually.",
+            "requiresManualInput": True
+        }
+    except Exception as e:
+        print(f"❌ Job posting analysis failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Job posting analysis failed: {str(e)}"
+        )
+
 @app.post("/skill-analysis/comprehensive")
 @require_credits("skill_analysis")
 async def comprehensive_skill_analysis(request: dict):
@@ -461,7 +798,7 @@ async def generate_cover_letter(request: dict):
             comprehensive_resume_data = resume_data
         elif user_id:
             print("📖 Getting comprehensive resume data from Supabase...")
-            comprehensive_resume_data = await comprehensive_parser.get_parsed_resume_from_supabase(user_id)
+            comprehensive_resume_data = await _get_parsed_resume(user_id)
             
             if not comprehensive_resume_data:
                 raise HTTPException(
@@ -630,20 +967,34 @@ async def deduct_credits(request: dict):
 
 @app.post("/credits/history")
 async def get_credit_history(request: dict):
-    """Get user's credit transaction history"""
+    """
+    Get user's credit transaction history, newest first, one page at a time.
+    Pass the returned next_cursor as "cursor" for the next page; "include_summary": true adds
+    credits spent per action type per day over the last "summary_days" (default 30, at most 365).
+    """
     try:
         user_id = request.get("user_id")
-        limit = request.get("limit", 50)
+        cursor = request.get("cursor")
+        include_summary = request.get("include_summary", False)
         
         if not user_id:
             raise HTTPException(status_code=400, detail="user_id is required")
+        try:
+            limit = int(request.get("limit", 50))
+            summary_days = int(request.get("summary_days", 30))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="limit and summary_days must be integers")
         
         print(f"📊 Getting credit history for user: {user_id}")
         
-        result = await credit_manager.get_credit_history(user_id, limit)
+        result = await credit_manager.get_credit_history(user_id, limit, cursor, include_summary, summary_days)
         
         return result
         
+    except HTTPException:
+        raise
+    except InvalidHistoryCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Failed to get credit history: {str(e)}")
         raise HTTPException(
@@ -830,6 +1181,9 @@ async def stripe_webhook(request: Request):
             
             print(f"💰 Payment succeeded for user {user_id}: {total_credits} credits")
             
+            # The purchase changes the balance outside the normal spend path, so drop any cached value
+            credit_manager.invalidate_user_credits(user_id)
+            
             # Add credits to user account
             result = await credit_manager.add_credits(
                 user_id=user_id,
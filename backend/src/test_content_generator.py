@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Quick test script for the template fallback of content generation (Groq is replaced by a stub, no API calls)
+"""
+
+import asyncio
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+import httpx
+from groq import APIConnectionError
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import agents.content_generator as content_module
+from agents.content_generator import ContentGeneratorAgent
+
+JOB = {"role": "Backend Engineer", "company": "Acme", "skills": ["Python", "PostgreSQL"]}
+RESUME = {"name": "Sam Lee", "skills": [{"name": "Python"}, {"name": "PostgreSQL"}, {"name": "Docker"}]}
+SKILL_MATCH = {"matched_skills": [{"job_skill": "Python", "resume_skill": "Python"}], "match_percentage": 50}
+
+def stub_groq(create):
+    """Groq client whose chat completions are served by create(**kwargs)"""
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+def groq_not_called(**kwargs):
+    raise AssertionError("Groq was called")
+
+def reply(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+async def test_content_generator():
+    print("🧪 Testing content generation fallback")
+    print("=" * 50)
+
+    # An open circuit falls back to the template without calling Groq
+    agent = ContentGeneratorAgent()
+    agent.groq_client = stub_groq(groq_not_called)
+    for _ in range(agent.llm_circuit.failure_threshold):
+        agent.llm_circuit.record_failure()
+    result = await agent.generate_content(JOB, RESUME, SKILL_MATCH, "linkedin_dm")
+    assert result["success"] and result["generation_method"] == "template", result
+    assert "Acme" in result["content"]
+    print("⚡ Open circuit served the template draft")
+
+    # An overrun deadline falls back too
+    agent = ContentGeneratorAgent()
+    agent.groq_client = stub_groq(lambda **kwargs: (time.sleep(0.3), reply("too late"))[1])
+    content_module.CONTENT_LLM_DEADLINE_SECONDS, deadline = 0.05, content_module.CONTENT_LLM_DEADLINE_SECONDS
+    try:
+        result = await agent.generate_content(JOB, RESUME, SKILL_MATCH, "cold_email")
+    finally:
+        content_module.CONTENT_LLM_DEADLINE_SECONDS = deadline
+    assert result["success"] and result["generation_method"] == "template", result
+    print("⏱️ Overrun deadline served the template draft")
+
+    # Any other error is a failure, not a silent template
+    agent = ContentGeneratorAgent()
+
+    def rejected(**kwargs):
+        raise RuntimeError("401 invalid API key")
+
+    agent.groq_client = stub_groq(rejected)
+    for _ in range(agent.llm_circuit.failure_threshold):
+        result = await agent.generate_content(JOB, RESUME, SKILL_MATCH, "linkedin_dm")
+        assert not result["success"] and "invalid API key" in result["error"], result
+    # A rejected request isn't an outage, so it doesn't open the circuit
+    assert agent.llm_circuit.state == "closed"
+    print("🚫 Groq error was reported instead of falling back")
+
+    # Connection errors are, and open it
+    agent = ContentGeneratorAgent()
+    calls = []
+
+    def unreachable(**kwargs):
+        calls.append(kwargs["timeout"])
+        raise APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+
+    agent.groq_client = stub_groq(unreachable)
+    for _ in range(agent.llm_circuit.failure_threshold):
+        await agent.generate_content(JOB, RESUME, SKILL_MATCH, "linkedin_dm")
+    assert agent.llm_circuit.state == "open" and all(0 < timeout <= content_module.CONTENT_LLM_DEADLINE_SECONDS for timeout in calls), calls
+    print("🔴 Connection errors opened the circuit")
+
+    # The LLM path personalizes its draft
+    agent = ContentGeneratorAgent()
+    agent.groq_client = stub_groq(lambda **kwargs: reply("personalized" if kwargs["temperature"] == 0.5 else "draft"))
+    result = await agent.generate_content(JOB, RESUME, SKILL_MATCH, "linkedin_dm")
+    assert result["success"] and result["generation_method"] == "llm" and result["content"] == "personalized", result
+    print("🤖 LLM draft was personalized")
+
+    print("✅ Content generation test passed!")
+
+if __name__ == "__main__":
+    asyncio.run(test_content_generator())
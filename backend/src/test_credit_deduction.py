@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Quick test script for atomic credit deduction (uses the local ledger stand-in and the SQLite store, no Supabase needed)
+"""
+
+import asyncio
+import gc
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Keep test transactions out of the real spool, which is sent to Supabase on the next start
+import tempfile
+from pathlib import Path
+os.environ["TRANSACTION_LOG_SPOOL_DIR"] = tempfile.mkdtemp()
+
+from fastapi import HTTPException
+from agents.simple_credit_manager import credit_manager, SimpleCreditManager, LocalCreditLedger, CREDIT_COSTS, InvalidHistoryCursorError
+from utils.sqlite_storage import SQLiteStorage
+from utils.storage import StorageError
+from utils.credit_decorator import require_credits
+from utils.credit_reservations import credit_reservations
+from utils.transaction_logger import TransactionLogger, SegmentRejectedError
+
+class StrictIdStorage(SQLiteStorage):
+    """Rejects a whole balance query containing a malformed id, like PostgREST does for a bad uuid"""
+
+    async def get_credit_balances(self, user_ids):
+        if "not-a-uuid" in user_ids:
+            raise StorageError("invalid input syntax for type uuid", status_code=400)
+        return await super().get_credit_balances(user_ids)
+
+class SlowLedger(LocalCreditLedger):
+    """Local ledger with Supabase-like latency"""
+
+    async def deduct(self, user_id, amount):
+        await asyncio.sleep(0.05)
+        return await super().deduct(user_id, amount)
+
+async def test_credit_deduction():
+    print("🧪 Testing atomic credit deduction")
+    print("=" * 50)
+
+    credit_manager.ledger = LocalCreditLedger({"user-1": 5})
+    cost = CREDIT_COSTS["cover_letter"]
+
+    # More concurrent requests than the balance covers: exactly 5 may succeed
+    results = await asyncio.gather(*[
+        credit_manager.process_credit_usage("user-1", "cover_letter") for _ in range(12)
+    ])
+    succeeded = [r for r in results if r["success"]]
+    print(f"💳 {len(succeeded)} of {len(results)} concurrent deductions succeeded")
+    assert len(succeeded) == 5 // cost, results
+    assert credit_manager.ledger.balances["user-1"] == 5 - len(succeeded) * cost
+    assert sorted(r["credits_after"] for r in succeeded) == list(range(0, 5, cost))
+
+    rejected = [r for r in results if not r["success"]]
+    assert all(r["error_message"].startswith("Insufficient credits") for r in rejected)
+
+    # Reservations: a failing endpoint is refunded, a known balance lets the endpoint start early
+    credit_manager.ledger = SlowLedger({"user-2": 3})
+
+    @require_credits("cover_letter")
+    async def failing_endpoint(request: dict):
+        raise ValueError("LLM unavailable")
+
+    @require_credits("cover_letter")
+    async def endpoint(request: dict):
+        return {"balance_while_running": credit_manager.ledger.balances["user-2"]}
+
+    try:
+        await failing_endpoint({"user_id": "user-2"})
+        raise AssertionError("Expected the endpoint error")
+    except ValueError:
+        pass
+    await credit_reservations.drain()  # the refund runs in the background, as on shutdown
+    assert credit_manager.ledger.balances["user-2"] == 3, credit_manager.ledger.balances
+    print("↩️ Failed endpoint was refunded")
+
+    result = await endpoint({"user_id": "user-2"})
+    # The balance is known after the refund, so the endpoint ran before the deduction landed
+    assert result["balance_while_running"] == 3 and result["credit_info"]["credits_remaining"] == 3 - cost, result
+
+    credit_manager.ledger.balances["user-2"] = 0
+    try:
+        await endpoint({"user_id": "user-2"})
+        raise AssertionError("Expected 402")
+    except HTTPException as e:
+        assert e.status_code == 402
+    print("🚫 Durable deduction rejected the optimistic reservation")
+
+    # An endpoint that already failed when the deduction comes back 402 doesn't leak its exception
+    unretrieved = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+    credit_manager.balance_cache.set("user-2", 5)
+    try:
+        await failing_endpoint({"user_id": "user-2"})
+        raise AssertionError("Expected 402")
+    except HTTPException as e:
+        assert e.status_code == 402
+    await credit_reservations.drain()
+    gc.collect()  # unretrieved task exceptions are reported when the task is collected
+    await asyncio.sleep(0)
+    assert not unretrieved, unretrieved
+    asyncio.get_running_loop().set_exception_handler(None)
+
+    # The same contract end to end against the embedded SQLite store
+    store = SQLiteStorage(os.path.join(tempfile.mkdtemp(), "storage.sqlite3"))
+    manager = SimpleCreditManager(store)
+    manager.transaction_log.spool_dir = Path(tempfile.mkdtemp())
+    await store.create_credit_account("user-3", 5)
+    results = await asyncio.gather(*[manager.process_credit_usage("user-3", "cover_letter") for _ in range(12)])
+    assert sum(r["success"] for r in results) == 5 // cost
+    assert (await store.get_credit_balances(["user-3"]))["user-3"] == 5 % cost
+
+    await manager.transaction_log.flush()
+    first = await manager.get_credit_history("user-3", 3)
+    second = await manager.get_credit_history("user-3", 3, first["next_cursor"])
+    pages = first["transactions"] + second["transactions"]
+    assert first["has_more"] and not second["has_more"] and len(pages) == 5 // cost
+    assert len({t["id"] for t in pages}) == len(pages)
+    try:
+        await manager.get_credit_history("user-3", 3, "not-a-cursor")
+        raise AssertionError("Expected InvalidHistoryCursorError")
+    except InvalidHistoryCursorError:
+        pass
+    summary = await manager.get_credit_history("user-3", 3, include_summary=True, summary_days=10 ** 9)
+    assert summary["success"] and summary["summary"] is not None, summary
+    await store.close()
+    print("🗄️ SQLite store deducted atomically and paged the history")
+
+    # One malformed id in a coalesced balance batch only fails its own lookup
+    store = StrictIdStorage(os.path.join(tempfile.mkdtemp(), "storage.sqlite3"))
+    manager = SimpleCreditManager(store)
+    await store.create_credit_account("user-4", 7)
+    good, bad = await asyncio.gather(
+        manager.balance_loader.load("user-4"), manager.balance_loader.load("not-a-uuid"), return_exceptions=True
+    )
+    assert good == 7 and isinstance(bad, Exception), (good, bad)
+    await store.close()
+    print("🧩 A rejected batch fell back to per-user lookups")
+
+    # A row upstream rejects is dead-lettered instead of blocking the rows logged after it
+    inserted = []
+
+    async def strict_writer(rows):
+        if any(row.get("credits_used") is None for row in rows):
+            raise SegmentRejectedError("null value in column credits_used")
+        inserted.extend(rows)
+        return True
+
+    spool = tempfile.mkdtemp()
+    log = TransactionLogger(strict_writer, spool)
+    for row in ({"credits_used": 1}, {"credits_used": None}, {"credits_used": 2}):
+        log.log(row)
+    assert await log.flush()
+    log.log({"credits_used": 3})
+    assert await log.flush() and [row["credits_used"] for row in inserted] == [1, 2, 3], inserted
+    assert len(os.listdir(os.path.join(spool, "dead_letter"))) == 1
+    await log.stop()
+    print("☠️ Rejected transaction row was dead-lettered")
+
+    print("✅ Credit deduction test passed!")
+
+if __name__ == "__main__":
+    asyncio.run(test_credit_deduction())
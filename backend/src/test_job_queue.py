@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Quick test script for the in-process background job queue (no broker needed)
+"""
+
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.job_queue import JobQueue, InMemoryJobBackend, QueueFullError, JOB_SUCCEEDED, JOB_FAILED
+
+async def fake_parse(payload, report):
+    """Stand-in for the resume parse handler"""
+    await asyncio.sleep(0.05)
+    report("extracted", characters=len(payload["raw_text"]))
+    if payload.get("fail"):
+        raise ValueError("LLM unavailable")
+    await asyncio.sleep(0.05)
+    report("parsed")
+    report("stored")
+    return {"success": True, "resume_id": payload["resume_id"]}
+
+async def test_job_queue():
+    print("🧪 Testing background job queue")
+    print("=" * 50)
+
+    queue = JobQueue(fake_parse, backend=InMemoryJobBackend(max_size=10), workers=2)
+    queue.start()
+    try:
+        ok_job = await queue.submit({"resume_id": "r1", "raw_text": "resume text"})
+        failing_job = await queue.submit({"resume_id": "r2", "raw_text": "resume text", "fail": True})
+
+        stages = [event["stage"] async for event in queue.events(ok_job.id)]
+        print(f"📡 Streamed stages: {stages}")
+        assert stages == ["queued", "running", "extracted", "parsed", "stored", JOB_SUCCEEDED], stages
+        assert queue.get(ok_job.id).result == {"success": True, "resume_id": "r1"}
+
+        # Subscribing after completion replays the full history
+        replayed = [event["stage"] async for event in queue.events(ok_job.id)]
+        assert replayed == stages, replayed
+
+        failed_stages = [event["stage"] async for event in queue.events(failing_job.id)]
+        failed = queue.get(failing_job.id)
+        print(f"📡 Failed job stages: {failed_stages} ({failed.error})")
+        assert failed.status == JOB_FAILED and failed.error == "LLM unavailable"
+
+        # A full queue rejects new jobs instead of growing without bound (no workers drain it here)
+        full_queue = JobQueue(fake_parse, backend=InMemoryJobBackend(max_size=1), workers=0)
+        await full_queue.submit({"resume_id": "r3", "raw_text": "x"})
+        try:
+            await full_queue.submit({"resume_id": "r4", "raw_text": "x"})
+            raise AssertionError("Expected QueueFullError")
+        except QueueFullError:
+            print("🚫 Full queue rejected the job")
+
+        print("✅ Job queue test passed!")
+    finally:
+        await queue.stop()
+
+if __name__ == "__main__":
+    asyncio.run(test_job_queue())
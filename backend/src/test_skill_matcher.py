@@ -14,6 +14,7 @@ load_dotenv()
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from agents.skill_matcher import skill_matcher
+from agents.comprehensive_resume_parser import ComprehensiveResumeParser
 
 async def test_skill_matching():
     """Test the skill matching with your actual resume skills"""
@@ -87,6 +88,27 @@ async def test_skill_matching():
             else:
                 print(f"  ❌ {job_skill} → No match found")
         
+        # Everyday words must not turn into skills
+        print("\n🔍 TESTING PROSE THAT ISN'T A SKILL:")
+        extractor = skill_matcher.skill_extractor
+        prose = "I'd like to express my interest in the backend team; each node of the graph"
+        assert extractor.extract(prose) == [], extractor.extract(prose)
+        assert extractor.extract("Built REST APIs with Express and Node.js") == ["REST API", "Express", "Node.js"]
+        check = extractor.cross_check(["Python"], "Python developer on an agile team using Spring and Express.js")
+        assert check["missed"] == ["Express"], check
+        print("  ✅ Prose left alone; only unambiguous mentions are added by the cross-check")
+        
+        # Version-suffixed and short forms still count as mentions
+        check = extractor.cross_check(["Java", "Python", "Node.js", "C++"], "Java8 and Python3.10, Node 18, C++17")
+        assert check["unsupported"] == [] and check["missed"] == [], check
+        assert extractor.extract("Java 17, Python3, NodeJS") == ["Java", "Python", "Node.js"]
+        # A listed skill the automaton can't find is only flagged; the parser keeps it
+        check = extractor.cross_check(["Kubernetes"], "Deployed services on GKE")
+        assert check["unsupported"] == ["Kubernetes"], check
+        parsed = ComprehensiveResumeParser()._cross_check_skills({"skills": ["Kubernetes", "Java"]}, "Java8 on GKE with Docker")
+        assert parsed["skills"] == ["Kubernetes", "Java", "Docker"], parsed
+        print("  ✅ Java8, Python3.10 and Node are recognized; unfound skills are flagged, not dropped")
+        
     except Exception as e:
         print(f"❌ Test failed: {e}")
         import traceback
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Quick test script for the write-behind resume queue (writers are stubs, spools live in a temp dir)
+"""
+
+import asyncio
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.write_behind import WriteBehindQueue, WriteRejectedError
+
+def spool_path():
+    return os.path.join(tempfile.mkdtemp(), "write_behind.sqlite3")
+
+async def test_write_behind():
+    print("🧪 Testing write-behind persistence")
+    print("=" * 50)
+
+    # A write upstream refuses for good is dead-lettered instead of retried forever
+    written = {}
+
+    async def writer(key, payload):
+        if key == "missing":
+            raise WriteRejectedError(f"No resume with id {key}")
+        written[key] = payload
+        return True
+
+    queue = WriteBehindQueue("resumes", writer, spool_path(), base_delay=0.01)
+    queue.submit("missing", {"name": "Ghost"})
+    queue.submit("r1", {"name": "Sam"})
+    await queue.flush_due()
+    assert written == {"r1": {"name": "Sam"}}, written
+    assert not queue.is_pending("missing") and queue.is_rejected("missing")
+    assert not queue.is_rejected("r1")
+    assert not await queue.wait_written("missing", 0.1) and await queue.wait_written("r1", 0.1)
+    print("☠️ Rejected write was dead-lettered")
+
+    # Transient failures back off, and give up after max_attempts
+    attempts = []
+
+    async def flaky(key, payload):
+        attempts.append(key)
+        return False
+
+    queue = WriteBehindQueue("resumes", flaky, spool_path(), base_delay=0.01, max_delay=0.01, max_attempts=3)
+    queue.start()
+    queue.submit("r2", {"name": "Lee"})
+    waited = await queue.wait_written("r2", 5)
+    assert not waited and len(attempts) == 3 and queue.is_rejected("r2"), attempts
+    await queue.stop()
+    print("🔁 Failing write gave up after max attempts")
+
+    # Two workers sharing a spool never send one key concurrently, and the newest write wins
+    upstream, in_flight, overlaps = {}, set(), []
+
+    async def slow_writer(key, payload):
+        if key in in_flight:
+            overlaps.append(key)
+        in_flight.add(key)
+        await asyncio.sleep(0.05)
+        upstream[key] = payload["version"]
+        in_flight.discard(key)
+        return True
+
+    path = spool_path()
+    workers = [WriteBehindQueue("resumes", slow_writer, path, base_delay=0.01) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for version in range(1, 6):
+        workers[version % 2].submit("r3", {"version": version})
+        await asyncio.sleep(0.02)
+    assert await workers[0].wait_written("r3", 5) and await workers[1].wait_written("r3", 5)
+    assert not overlaps and upstream["r3"] == 5, (overlaps, upstream)
+    for worker in workers:
+        await worker.stop()
+    print("🔒 Leased sends stayed in order across workers")
+
+    # A reader flushes only its own keys
+    sent = []
+
+    async def recording_writer(key, payload):
+        sent.append(key)
+        return True
+
+    queue = WriteBehindQueue("resumes", recording_writer, spool_path())
+    for key in ("mine", "theirs-1", "theirs-2"):
+        queue.submit(key, {"name": key})
+    await queue.flush_keys(["mine", "unknown"])
+    assert sent == ["mine"] and queue.pending_count() == 2, sent
+    print("🎯 Read path flushed only the caller's write")
+
+    print("✅ Write-behind test passed!")
+
+if __name__ == "__main__":
+    asyncio.run(test_write_behind())
@@ -0,0 +1,72 @@
+"""
+Batch Loader - coalesces lookups by key that arrive within a short window into
+one bulk load, and fans the results back out to every waiting caller
+"""
+
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+BATCH_LOADER_WINDOW_SECONDS = float(os.getenv("BATCH_LOADER_WINDOW_SECONDS", "0.005"))
+BATCH_LOADER_MAX_BATCH = int(os.getenv("BATCH_LOADER_MAX_BATCH", "100"))
+
+# load_many(keys) -> {key: value}; keys missing from the result load as None
+BulkLoad = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+# split_on(error) -> True when a failed batch may have been rejected because of one bad key
+SplitPredicate = Callable[[Exception], bool]
+
+
+class BatchLoader:
+    """
+    Concurrent load(key) calls share one load_many call per window (and per max_batch keys).
+    When a batch fails with an error split_on accepts, each key is loaded on its own so one
+    bad key only fails its own callers.
+    """
+
+    def __init__(self, load_many: BulkLoad, window: float = BATCH_LOADER_WINDOW_SECONDS,
+                 max_batch: int = BATCH_LOADER_MAX_BATCH, split_on: Optional[SplitPredicate] = None):
+        self.load_many = load_many
+        self.window = window
+        self.max_batch = max_batch
+        self.split_on = split_on
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Running batches, referenced so they aren't garbage collected mid-flight
+        self._running: Set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable) -> Any:
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._dispatch)
+        # Shielded so one cancelled caller doesn't cancel the result for the others
+        return await asyncio.shield(future)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]):
+        try:
+            results = await self.load_many(list(batch))
+        except Exception as e:
+            if len(batch) > 1 and self.split_on is not None and self.split_on(e):
+                await asyncio.gather(*(self._run({key: future}) for key, future in batch.items()))
+                return
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
@@ -0,0 +1,41 @@
+"""
+Circuit Breaker
+Stops calling a failing upstream (e.g. Groq) for a cool-down period
+"""
+
+import time
+
+
+class CircuitBreaker:
+    """Minimal closed/open/half-open circuit breaker for upstream calls"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        """Closed and half-open circuits let a request through, open ones don't"""
+        return self.state != "open"
+
+    def record_success(self):
+        if self._opened_at is not None:
+            print(f"🟢 Circuit '{self.name}' closed again")
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            print(f"🔴 Circuit '{self.name}' opened after {self._failures} failures")
@@ -6,11 +6,17 @@ Automatically handles credit deduction for API endpoints
 from functools import wraps
 from fastapi import HTTPException
 from agents.simple_credit_manager import credit_manager
+from utils.credit_reservations import credit_reservations
 import asyncio
 
+def _retrieve_outcome(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()
+
 def require_credits(action_type: str, credits_required: int = None):
     """
-    Decorator to automatically deduct credits before executing an endpoint
+    Decorator to charge credits for an endpoint: the endpoint starts as soon as credits are
+    reserved, the response waits for the deduction to be confirmed, and a failed endpoint is refunded
     
     Args:
         action_type: Type of action (e.g., 'job_search', 'cover_letter')
@@ -41,47 +47,54 @@ def require_credits(action_type: str, credits_required: int = None):
             if credits_required:
                 metadata['credits_override'] = credits_required
             
-            print(f"💳 Processing credit deduction for {action_type} action by user {user_id}")
-            
-            # Process credit deduction using simple credit manager
-            credit_result = await credit_manager.process_credit_usage(
-                user_id=user_id,
-                action_type=action_type,
-                metadata=metadata
-            )
+            print(f"💳 Reserving credits for {action_type} action by user {user_id}")
             
-            if not credit_result['success']:
-                print(f"❌ Credit deduction failed: {credit_result['error_message']}")
-                raise HTTPException(
-                    status_code=402,  # Payment Required
-                    detail=credit_result['error_message']
-                )
+            # Reserve credits; the durable deduction runs concurrently with the endpoint when the
+            # known balance covers it, and has already finished otherwise
+            reservation = await credit_reservations.reserve(user_id, action_type, metadata)
             
-            print(f"✅ Credits deducted successfully. New balance: {credit_result['credits_after']}")
-            
-            # Add credit info to request for the endpoint to use
-            request['_credit_info'] = credit_result
+            # Add (estimated until confirmed) credit info to request for the endpoint to use
+            request['_credit_info'] = {
+                'credits_used': reservation.amount,
+                'action_type': action_type
+            }
             
+            endpoint = asyncio.create_task(func(request))
             try:
-                # Execute the original function
-                result = await func(request)
+                credit_result = await reservation.confirmed()
+                if not credit_result['success']:
+                    print(f"❌ Credit deduction failed: {credit_result['error_message']}")
+                    raise HTTPException(
+                        status_code=402,  # Payment Required
+                        detail=credit_result['error_message']
+                    )
                 
-                # Add credit info to response
-                if isinstance(result, dict):
-                    result['credit_info'] = {
-                        'credits_used': credit_result['credits_used'],
-                        'credits_remaining': credit_result['credits_after'],
-                        'transaction_id': credit_result.get('transaction_id')
-                    }
+                print(f"✅ Credits deducted successfully. New balance: {credit_result['credits_after']}")
                 
-                return result
+                # Execute the original function (already running)
+                result = await endpoint
                 
-            except Exception as e:
-                # If the main function fails, we should consider refunding credits
-                # For now, we'll log it but not refund (to prevent abuse)
-                print(f"⚠️ Function failed after credit deduction: {str(e)}")
-                print(f"💰 Credits were deducted but function failed. Transaction ID: {credit_result.get('transaction_id')}")
+            except BaseException as e:
+                # Cancel the endpoint if payment failed, and refund if the endpoint failed
+                if not endpoint.done():
+                    endpoint.cancel()
+                # Its outcome isn't awaited on this path (e.g. it had already failed when the
+                # deduction came back 402), so retrieve it to keep asyncio from logging it
+                endpoint.add_done_callback(_retrieve_outcome)
+                reservation.release()
+                if not isinstance(e, HTTPException) or e.status_code != 402:
+                    print(f"⚠️ Function failed after credit reservation, refunding: {str(e)}")
                 raise
+            
+            # Add credit info to response
+            if isinstance(result, dict):
+                result['credit_info'] = {
+                    'credits_used': credit_result['credits_used'],
+                    'credits_remaining': credit_result['credits_after'],
+                    'transaction_id': credit_result.get('transaction_id')
+                }
+            
+            return result
         
         return wrapper
     return decorator
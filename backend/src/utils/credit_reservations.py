@@ -0,0 +1,94 @@
+"""
+Credit Reservations - reserve credits against the last known balance so a paid
+endpoint can start right away, while the durable deduction runs alongside it;
+the deduction is committed when the endpoint succeeds and refunded when it fails
+"""
+
+import os
+import asyncio
+from typing import Any, Dict, Optional, Set
+from agents.simple_credit_manager import SimpleCreditManager, CREDIT_COSTS, credit_manager
+
+# How long shutdown waits for in-flight refunds before the store is closed under them
+CREDIT_REFUND_DRAIN_SECONDS = float(os.getenv("CREDIT_REFUND_DRAIN_SECONDS", "5"))
+
+
+class CreditReservation:
+    """Credits held for one request; confirmation is the durable deduction running in the background"""
+
+    def __init__(self, owner: "CreditReservations", user_id: str, action_type: str, amount: int,
+                 confirmation: "asyncio.Future[Dict[str, Any]]", metadata: Optional[Dict] = None):
+        self.owner = owner
+        self.user_id = user_id
+        self.action_type = action_type
+        self.amount = amount
+        self.confirmation = confirmation
+        self.metadata = metadata
+
+    async def confirmed(self) -> Dict[str, Any]:
+        """Wait for the durable deduction and return its process_credit_usage result"""
+        return await asyncio.shield(self.confirmation)
+
+    def release(self):
+        """Undo the reservation in the background: refund once the deduction it was waiting on lands"""
+        self.owner._spawn(self._refund())
+
+    async def _refund(self):
+        try:
+            result = await self.confirmation
+        except Exception:
+            return
+        if result["success"]:
+            await self.owner.manager.refund_credit_usage(self.user_id, self.action_type, self.amount, self.metadata)
+
+
+class CreditReservations:
+    """
+    Tracks outstanding holds per user against the manager's cached balance. A reservation only skips
+    ahead of the durable deduction when the known balance clearly covers it; otherwise the caller
+    waits for the database to decide, so optimism never lets anyone spend credits they don't have.
+    """
+
+    def __init__(self, manager: SimpleCreditManager):
+        self.manager = manager
+        self._held: Dict[str, int] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def reserve(self, user_id: str, action_type: str, metadata: Optional[Dict] = None) -> CreditReservation:
+        amount = CREDIT_COSTS.get(action_type, 1)
+        balance = self.manager.balance_cache.get(user_id)
+        self._held[user_id] = self._held.get(user_id, 0) + amount
+        confirmation = asyncio.ensure_future(self.manager.process_credit_usage(user_id, action_type, metadata))
+        confirmation.add_done_callback(lambda task: self._release_hold(user_id, amount))
+        reservation = CreditReservation(self, user_id, action_type, amount, confirmation, metadata)
+
+        if balance is None or balance - self._held[user_id] < 0:
+            # Unknown or tight balance: let the durable deduction decide before anything runs
+            await reservation.confirmed()
+        return reservation
+
+    def _release_hold(self, user_id: str, amount: int):
+        # The deduction landed (or failed), and the manager wrote the outcome through to its cache
+        held = self._held.get(user_id, 0) - amount
+        if held > 0:
+            self._held[user_id] = held
+        else:
+            self._held.pop(user_id, None)
+
+    async def drain(self, timeout: float = CREDIT_REFUND_DRAIN_SECONDS):
+        """Wait for background refunds on shutdown, so the credits they give back aren't lost"""
+        if not self._background:
+            return
+        print(f"↩️ Waiting for {len(self._background)} credit refund(s) before shutdown")
+        _, pending = await asyncio.wait(set(self._background), timeout=timeout)
+        if pending:
+            print(f"⚠️ {len(pending)} credit refund(s) still running at shutdown")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+# Global instance
+credit_reservations = CreditReservations(credit_manager)
@@ -0,0 +1,29 @@
+"""
+Data Store - picks the storage backend from config:
+  supabase  Supabase only (default)
+  sqlite    embedded SQLite only - offline runs and network-free load tests
+  tiered    Supabase, with SQLite as a local L2 cache and outage fallback
+"""
+
+import os
+from utils.storage import StorageBackend, TieredStorage
+from utils.sqlite_storage import SQLiteStorage, STORAGE_CACHE_BUSY_TIMEOUT_MS
+from utils.supabase_client import supabase_client
+
+STORAGE_BACKENDS = ("supabase", "sqlite", "tiered")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> StorageBackend:
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "tiered":
+        return TieredStorage(supabase_client, SQLiteStorage(busy_timeout_ms=STORAGE_CACHE_BUSY_TIMEOUT_MS))
+    if backend != "supabase":
+        print(f"⚠️ Unknown STORAGE_BACKEND '{backend}' (expected one of {', '.join(STORAGE_BACKENDS)}) - using supabase")
+    return supabase_client
+
+
+# Global instance
+storage = create_storage()
+print(f"🗄️ Storage backend: {type(storage).__name__}")
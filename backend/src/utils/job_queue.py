@@ -0,0 +1,196 @@
+"""
+Job Queue - in-process background jobs with a bounded worker pool, progress
+events for polling / server-sent events, and a pluggable storage backend
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from utils.cache import TTLCache
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "100"))
+# Finished jobs stay queryable for this long
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+TERMINAL_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+# report(stage, **data) records a progress event; handlers return the job result
+ProgressReporter = Callable[..., None]
+JobHandler = Callable[[Dict[str, Any], ProgressReporter], Awaitable[Any]]
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+@dataclass
+class Job:
+    id: str
+    payload: Dict[str, Any]
+    status: str = JOB_QUEUED
+    stage: str = JOB_QUEUED
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public view of the job (the payload may hold a whole PDF, so it's left out)"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "events": self.events,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobBackend(ABC):
+    """Where jobs are queued and stored; swap in a broker-backed one without touching JobQueue"""
+
+    @abstractmethod
+    async def enqueue(self, job: Job):
+        """Store and queue a job, raising QueueFullError when at capacity"""
+
+    @abstractmethod
+    async def dequeue(self) -> Job:
+        """Wait for the next queued job"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    def save(self, job: Job):
+        ...
+
+
+class InMemoryJobBackend(JobBackend):
+    """Bounded asyncio queue plus an expiring job table - no external broker needed"""
+
+    def __init__(self, max_size: int = JOB_QUEUE_MAX_SIZE, retention: float = JOB_RETENTION_SECONDS):
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_size)
+        self._jobs = TTLCache(maxsize=max(1024, max_size * 10), ttl=retention)
+
+    async def enqueue(self, job: Job):
+        try:
+            self._queue.put_nowait(job.id)
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full, try again later")
+        self._jobs.set(job.id, job)
+
+    async def dequeue(self) -> Job:
+        while True:
+            job = self._jobs.get(await self._queue.get())
+            if job is not None:
+                return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def save(self, job: Job):
+        self._jobs.set(job.id, job)
+
+
+class JobQueue:
+    """Runs submitted jobs on a fixed number of worker tasks and publishes their progress"""
+
+    def __init__(self, handler: JobHandler, backend: Optional[JobBackend] = None, workers: int = JOB_WORKERS):
+        self.handler = handler
+        self.backend = backend or InMemoryJobBackend()
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: Dict[str, Any]) -> Job:
+        self.start()
+        job = Job(id=uuid.uuid4().hex, payload=payload)
+        await self.backend.enqueue(job)
+        self._publish(job, {"stage": JOB_QUEUED, "status": JOB_QUEUED, "at": job.created_at})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.backend.get(job_id)
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Replay a job's events so far, then follow it live until it finishes"""
+        job = self.backend.get(job_id)
+        if job is None:
+            return
+        subscriber: asyncio.Queue = asyncio.Queue()
+        history = list(job.events)
+        if job.status not in TERMINAL_STATUSES:
+            self._subscribers.setdefault(job_id, []).append(subscriber)
+        try:
+            for event in history:
+                yield event
+            if job.status in TERMINAL_STATUSES:
+                return
+            while True:
+                event = await subscriber.get()
+                yield event
+                if event["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def _publish(self, job: Job, event: Dict[str, Any]):
+        job.stage = event["stage"]
+        job.updated_at = event["at"]
+        job.events.append(event)
+        self.backend.save(job)
+        for subscriber in self._subscribers.get(job.id, []):
+            subscriber.put_nowait(event)
+
+    async def _worker(self):
+        while True:
+            job = await self.backend.dequeue()
+            job.status = JOB_RUNNING
+
+            def report(stage: str, **data):
+                self._publish(job, {"stage": stage, "status": job.status, "at": time.time(), **data})
+
+            report(JOB_RUNNING)
+            try:
+                job.result = await self.handler(job.payload, report)
+            except asyncio.CancelledError:
+                job.status, job.error = JOB_FAILED, "Worker shut down"
+                report(JOB_FAILED, error=job.error)
+                raise
+            except Exception as e:
+                print(f"❌ Job {job.id} failed: {str(e)}")
+                job.status, job.error = JOB_FAILED, str(e)
+                report(JOB_FAILED, error=job.error)
+            else:
+                job.status = JOB_SUCCEEDED
+                report(JOB_SUCCEEDED)
+            finally:
+                # The payload (possibly a whole PDF) is only needed while the job runs
+                job.payload = {}
@@ -0,0 +1,156 @@
+"""
+Resume Parse Cache - content-addressed, persistent cache of parsed resumes
+so re-uploads of the same resume skip the LLM entirely
+"""
+
+import os
+import json
+import asyncio
+import time
+import hashlib
+import sqlite3
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Optional
+from utils.cache import TTLCache
+from utils.pdf_extraction import PDFSource
+
+PARSE_CACHE_PATH = os.getenv(
+    "PARSE_CACHE_PATH",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "parse_cache.sqlite3")
+)
+PARSE_CACHE_MEMORY_ENTRIES = int(os.getenv("PARSE_CACHE_MEMORY_ENTRIES", "256"))
+# The SQLite cache keeps at most this many entries (least recently used go first), none older than the TTL
+PARSE_CACHE_MAX_ENTRIES = int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "20000"))
+PARSE_CACHE_TTL_SECONDS = float(os.getenv("PARSE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# Pruning runs on every Nth put rather than on each one
+PARSE_CACHE_PRUNE_EVERY = 50
+
+
+def normalize_resume_text(text: str) -> str:
+    """Normalize extracted text so insignificant differences hash identically"""
+    text = unicodedata.normalize("NFKC", text)
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class ParseCache:
+    """SQLite-backed parse cache with an in-memory LRU in front; both evict by size and age"""
+
+    def __init__(self, path: str = PARSE_CACHE_PATH, memory_entries: int = PARSE_CACHE_MEMORY_ENTRIES,
+                 max_entries: int = PARSE_CACHE_MAX_ENTRIES, ttl: float = PARSE_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = TTLCache(maxsize=memory_entries, ttl=ttl)
+        self._db = None
+        self._puts_until_prune = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                "key TEXT PRIMARY KEY, parsed_data TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(parse_cache)")}
+            if "accessed_at" not in columns:
+                # Caches written before eviction existed
+                self._db.execute("ALTER TABLE parse_cache ADD COLUMN accessed_at REAL")
+                self._db.execute("UPDATE parse_cache SET accessed_at = created_at")
+            self._db.execute("CREATE INDEX IF NOT EXISTS parse_cache_accessed_at ON parse_cache (accessed_at)")
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def text_key(text: str, parser_version: str) -> str:
+        digest = hashlib.sha256(normalize_resume_text(text).encode("utf-8")).hexdigest()
+        return f"text:{parser_version}:{digest}"
+
+    @staticmethod
+    def pdf_key(source: PDFSource, parser_version: str) -> str:
+        digest = hashlib.sha256()
+        if isinstance(source, (bytes, bytearray)):
+            digest.update(source)
+        else:
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        return f"pdf:{parser_version}:{digest.hexdigest()}"
+
+    @classmethod
+    async def pdf_key_async(cls, source: PDFSource, parser_version: str) -> str:
+        """pdf_key in a worker thread, so hashing a large PDF doesn't block the event loop"""
+        return await asyncio.to_thread(cls.pdf_key, source, parser_version)
+
+    @staticmethod
+    def section_key(section_hash: str, parser_version: str) -> str:
+        return f"section:{parser_version}:{section_hash}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        # Entries are kept as JSON so callers can't mutate the cached copy
+        cached = self._memory.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        try:
+            db = self._connect()
+            row = db.execute(
+                "SELECT parsed_data FROM parse_cache WHERE key = ? AND created_at >= ?", (key, time.time() - self.ttl)
+            ).fetchone()
+            if row is not None:
+                # Hits served from memory don't touch the row; losing one of those only costs a re-parse
+                db.execute("UPDATE parse_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Parse cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        self._memory.set(key, row[0])
+        return json.loads(row[0])
+
+    def put(self, key: str, parsed_data: Dict[str, Any]):
+        payload = json.dumps(parsed_data)
+        self._memory.set(key, payload)
+        try:
+            db = self._connect()
+            now = time.time()
+            db.execute(
+                "INSERT OR REPLACE INTO parse_cache (key, parsed_data, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Parse cache write failed: {e}")
+            return
+        self._puts_until_prune -= 1
+        if self._puts_until_prune <= 0:
+            self._puts_until_prune = PARSE_CACHE_PRUNE_EVERY
+            self.prune()
+
+    def prune(self):
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        try:
+            db = self._connect()
+            expired = db.execute("DELETE FROM parse_cache WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+            evicted = db.execute(
+                "DELETE FROM parse_cache WHERE key IN "
+                "(SELECT key FROM parse_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Parse cache pruning failed: {e}")
+            return
+        if expired or evicted:
+            print(f"🧹 Parse cache pruned {expired} expired and {evicted} least recently used entries")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+# Global instance
+parse_cache = ParseCache()
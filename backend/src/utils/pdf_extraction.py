@@ -0,0 +1,336 @@
+"""
+PDF Text Extraction - runs CPU-heavy PDF parsing in a bounded process pool
+so the event loop keeps serving other requests
+"""
+
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+import re
+import mmap
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple, Union
+import PyPDF2
+import pdfplumber
+
+PDFSource = Union[bytes, str]  # raw PDF bytes or the path of a spooled upload
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_JOB_TIMEOUT_SECONDS = float(os.getenv("PDF_JOB_TIMEOUT_SECONDS", "20"))
+PDF_WORKER_MEMORY_MB = int(os.getenv("PDF_WORKER_MEMORY_MB", "512"))  # 0 disables the limit
+# Documents are split into page ranges of at least this size across workers
+PDF_MIN_PAGES_PER_SHARD = int(os.getenv("PDF_MIN_PAGES_PER_SHARD", "3"))
+# Output scoring below this makes extraction escalate to the next engine
+PDF_QUALITY_THRESHOLD = float(os.getenv("PDF_QUALITY_THRESHOLD", "0.8"))
+
+ENGINE_PYPDF2 = "pypdf2"  # fast, fine for simple single-column text
+ENGINE_PDFPLUMBER = "pdfplumber"  # slow, layout-aware
+# Joined page texts are separated by a form feed so page boundaries survive extraction
+PAGE_SEPARATOR = "\f"
+
+# Probe thresholds for "complex layout"
+PDF_PROBE_SAMPLE_PAGES = 3
+PDF_COMPLEX_TEXT_OBJECTS_PER_PAGE = 400
+PDF_COMPLEX_FONT_COUNT = 12
+PDF_MIN_CHARS_PER_PAGE = 200
+
+READABLE_PUNCTUATION = set(".,;:!?'\"()[]{}-–—/&%$#@+*|•·_=<>~")
+WORD_STRIP_CHARS = ".,;:!?'\"()[]{}•·|*-–—"
+VALID_WORD_PATTERN = re.compile(
+    r"^(?:[^\W\d_](?:[^\W\d_]|['’\-]){0,24}"  # ordinary words (no 30-letter run-ons)
+    r"|\d[\d.,%+\-/]*"  # numbers, dates, percentages
+    r"|(?=.*[\d.+#/@])[\w.+#/@:\-]{1,40})$"  # technical tokens: C++, node.js, emails, URLs
+)
+
+
+class PDFExtractionError(Exception):
+    """Raised when no engine could extract a page range, so its text would be missing"""
+
+
+def _limit_worker_memory(memory_mb: int):
+    """Process pool initializer - cap how much address space a worker may grow by"""
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+        # Forked workers inherit the parent's mappings, so the cap is relative to the starting size
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        limit = current + memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError, AttributeError) as e:
+        # Not available on every platform (e.g. Windows, some macOS setups)
+        print(f"⚠️ Could not limit PDF worker memory: {e}")
+
+
+@contextmanager
+def open_pdf_source(source: PDFSource):
+    """Open raw PDF bytes as a stream, or memory-map a spooled upload file"""
+    if isinstance(source, (bytes, bytearray)):
+        yield BytesIO(source)
+        return
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+def probe_pdf(source: PDFSource, sample_pages: int = PDF_PROBE_SAMPLE_PAGES) -> Dict[str, Any]:
+    """Cheaply inspect a PDF (page tree, fonts, content streams of a few pages) and pick an engine"""
+    with open_pdf_source(source) as stream:
+        return _probe_reader(PyPDF2.PdfReader(stream), sample_pages)
+
+
+def _probe_reader(reader: PyPDF2.PdfReader, sample_pages: int) -> Dict[str, Any]:
+    page_count = len(reader.pages)
+    fonts = set()
+    reasons = []
+    text_objects = 0
+    sampled = 0
+
+    for page in reader.pages[:sample_pages]:
+        sampled += 1
+        resources = page.get("/Resources") or {}
+        for font in (resources.get("/Font") or {}).values():
+            font = font.get_object()
+            fonts.add(str(font.get("/BaseFont", "")))
+            if font.get("/Subtype") == "/Type3":
+                reasons.append("type3_font")
+            elif font.get("/Subtype") == "/Type0" and "/ToUnicode" not in font:
+                reasons.append("cid_font_without_tounicode")
+        contents = page.get_contents()
+        if contents is not None:
+            text_objects += contents.get_data().count(b"BT")
+
+    text_objects_per_page = text_objects / sampled if sampled else 0
+    if sampled and text_objects_per_page == 0:
+        reasons.append("no_text_objects")
+    if text_objects_per_page > PDF_COMPLEX_TEXT_OBJECTS_PER_PAGE:
+        # Many small text runs usually means columns, tables or positioned fragments
+        reasons.append("fragmented_layout")
+    if len(fonts) > PDF_COMPLEX_FONT_COUNT:
+        reasons.append("many_fonts")
+
+    return {
+        "page_count": page_count,
+        "font_count": len(fonts),
+        "text_objects_per_page": round(text_objects_per_page, 1),
+        "complex_reasons": sorted(set(reasons)),
+        "engine": ENGINE_PDFPLUMBER if reasons else ENGINE_PYPDF2
+    }
+
+
+def score_text_quality(pages: List[str]) -> float:
+    """Score extracted text from 0 to 1 by character ratio, word validity and text density"""
+    text = "".join(pages)
+    if not text.strip():
+        return 0.0
+
+    readable = sum(1 for ch in text if ch.isalnum() or ch.isspace() or ch in READABLE_PUNCTUATION)
+    char_ratio = readable / len(text)
+
+    # Bare punctuation (bullets, dashes) is neither valid nor invalid
+    words = [word for word in (token.strip(WORD_STRIP_CHARS) for token in text.split()) if word]
+    valid_words = sum(1 for word in words if VALID_WORD_PATTERN.match(word))
+    word_validity = valid_words / len(words) if words else 0.0
+
+    chars_per_page = len(text) / max(1, len(pages))
+    density = min(1.0, chars_per_page / PDF_MIN_CHARS_PER_PAGE)
+
+    return round(0.4 * char_ratio + 0.4 * word_validity + 0.2 * density, 3)
+
+
+def _release_page_caches(page):
+    """Drop pdfplumber's per-page layout caches, which otherwise grow to hundreds of MB on long PDFs"""
+    page.flush_cache()
+    get_textmap = getattr(page, "get_textmap", None)
+    if hasattr(get_textmap, "cache_clear"):
+        get_textmap.cache_clear()
+
+
+def _extract_with_pdfplumber(source: PDFSource, start: int, end: Optional[int]) -> List[str]:
+    with open_pdf_source(source) as stream, pdfplumber.open(stream) as pdf:
+        pages = []
+        for page in pdf.pages[start:end]:
+            pages.append(page.extract_text() or "")
+            _release_page_caches(page)
+        return pages
+
+
+def _extract_with_pypdf2(source: PDFSource, start: int, end: Optional[int]) -> List[str]:
+    with open_pdf_source(source) as stream:
+        pdf_reader = PyPDF2.PdfReader(stream)
+        return [page.extract_text() or "" for page in pdf_reader.pages[start:end]]
+
+
+EXTRACTORS = {
+    ENGINE_PYPDF2: _extract_with_pypdf2,
+    ENGINE_PDFPLUMBER: _extract_with_pdfplumber
+}
+
+
+def extract_page_range(source: PDFSource, start: int = 0, end: Optional[int] = None,
+                       engine: str = ENGINE_PYPDF2) -> List[str]:
+    """Extract the text of pages [start, end) with the given engine, escalating to the
+    other engine only if it fails or its output scores below PDF_QUALITY_THRESHOLD.
+    Raises PDFExtractionError when every engine fails."""
+    best_pages, best_score = None, 0.0
+    engines = [engine] + [other for other in EXTRACTORS if other != engine]
+
+    for current in engines:
+        try:
+            pages = EXTRACTORS[current](source, start, end)
+        except MemoryError:
+            raise
+        except Exception as e:
+            print(f"⚠️ {current} failed: {str(e)}")
+            continue
+        if best_pages is None:
+            best_pages = pages
+
+        score = score_text_quality(pages)
+        if score > best_score:
+            best_pages, best_score = pages, score
+        if score >= PDF_QUALITY_THRESHOLD:
+            break
+        print(f"⚠️ {current} output scored {score} (< {PDF_QUALITY_THRESHOLD}), escalating...")
+
+    if best_pages is None:
+        raise PDFExtractionError(f"No engine could extract pages {start + 1}-{end or 'end'}")
+    return best_pages
+
+
+def join_pages(pages: List[str]) -> str:
+    """Reassemble page texts in order, skipping empty pages; pages stay separated by a form feed"""
+    return PAGE_SEPARATOR.join(text for text in pages if text).strip()
+
+
+def _probe_engine(source: PDFSource) -> str:
+    try:
+        return probe_pdf(source)["engine"]
+    except Exception as e:
+        print(f"⚠️ PDF probe failed ({e}), using pdfplumber")
+        return ENGINE_PDFPLUMBER
+
+
+def extract_text_from_pdf_bytes(source: PDFSource, engine: Optional[str] = None) -> str:
+    """Extract text from PDF bytes in the current process, probing for an engine if none is given"""
+    text = join_pages(extract_page_range(source, engine=engine or _probe_engine(source)))
+    if text:
+        print(f"✅ Extracted {len(text)} characters from PDF")
+    else:
+        print("❌ All PDF extraction methods failed")
+    return text
+
+
+def plan_page_shards(page_count: int, workers: int, min_pages_per_shard: int = PDF_MIN_PAGES_PER_SHARD) -> List[Tuple[int, int]]:
+    """Split pages into contiguous [start, end) ranges, at most one per worker"""
+    if page_count <= 0:
+        return []
+    shard_size = max(min_pages_per_shard, -(-page_count // max(1, workers)))
+    return [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+
+class PDFExtractionPool:
+    """Bounded process pool for PDF extraction with per-job timeouts.
+
+    A job that overruns its timeout has its worker processes killed and the
+    pool is recreated; other jobs caught in the recycle are retried once.
+    """
+
+    def __init__(self, max_workers: int = PDF_WORKERS, timeout: float = PDF_JOB_TIMEOUT_SECONDS,
+                 memory_mb: int = PDF_WORKER_MEMORY_MB):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self._executor = None
+        self._slots = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_limit_worker_memory,
+                initargs=(self.memory_mb,)
+            )
+            print(f"🏭 Started PDF extraction pool with {self.max_workers} workers")
+        return self._executor
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        """Kill every worker of a pool that has a runaway job and drop the pool"""
+        if executor is self._executor:
+            self._executor = None
+        processes = getattr(executor, "_processes", None) or {}
+        for process in list(processes.values()):
+            if process.is_alive():
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        print("♻️ PDF extraction pool recycled")
+
+    async def run(self, fn, *args, retry_on_broken_pool: bool = True):
+        """Run fn(*args) in a worker process, bounded by the pool size and job timeout"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        # Only submit when a worker is free so the timeout measures run time, not queue time
+        async with self._slots:
+            executor = self._get_executor()
+            loop = asyncio.get_running_loop()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(executor, fn, *args), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                print(f"⏰ PDF job exceeded {self.timeout}s, killing workers")
+                self._recycle(executor)
+                raise
+            except BrokenProcessPool:
+                # A worker died (memory limit hit, or the pool was recycled under us)
+                self._recycle(executor)
+                if not retry_on_broken_pool:
+                    raise
+        return await self.run(fn, *args, retry_on_broken_pool=False)
+
+    async def extract_text(self, source: PDFSource, engine: Optional[str] = None) -> str:
+        """Extract text from PDF bytes off the event loop, sharding long documents by page range.
+        The engine is picked by probing the document unless one is forced."""
+        try:
+            probe = await self.run(probe_pdf, source)
+        except asyncio.TimeoutError:
+            raise
+        except Exception as e:
+            print(f"⚠️ PDF probe failed ({e}), extracting as a single pdfplumber job")
+            return await self.run(extract_text_from_pdf_bytes, source, engine or ENGINE_PDFPLUMBER)
+
+        page_count, engine = probe["page_count"], engine or probe["engine"]
+        print(f"🔎 PDF probe: {page_count} pages, engine={engine} {probe['complex_reasons'] or ''}")
+
+        shards = plan_page_shards(page_count, self.max_workers)
+        if len(shards) <= 1:
+            return await self.run(extract_text_from_pdf_bytes, source, engine)
+
+        print(f"📑 Extracting {page_count} pages in {len(shards)} parallel shards")
+        results = await asyncio.gather(
+            *(self.run(extract_page_range, source, start, end, engine) for start, end in shards),
+            return_exceptions=True
+        )
+        for i, ((start, end), result) in enumerate(zip(shards, results)):
+            if isinstance(result, BaseException):
+                # Retried once on its own, after the parallel round; if it fails again the whole
+                # extraction fails rather than returning text with those pages missing
+                print(f"⚠️ Shard for pages {start + 1}-{end} failed ({result!r}), retrying it alone")
+                results[i] = await self.run(extract_page_range, source, start, end, engine)
+        # gather preserves submission order, so pages come back in document order
+        text = join_pages([page for shard_pages in results for page in shard_pages])
+        if text:
+            print(f"✅ Extracted {len(text)} characters from {page_count} pages")
+        else:
+            print("❌ All PDF extraction methods failed")
+        return text
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+pdf_extraction_pool = PDFExtractionPool()
@@ -0,0 +1,97 @@
+"""
+Resume Draft - instant heuristic parse (contact fields, sections, dictionary
+skill extraction) returned while the LLM parse runs in the background
+"""
+
+import re
+from typing import Any, Dict
+from utils.resume_preprocessing import preprocess_resume_text
+from utils.resume_sections import BULLET_PATTERN, ResumeSection, segment_resume
+from utils.skill_extractor import SkillExtractor
+
+DRAFT_CONFIDENCE = 0.4
+
+NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z.'-]*(?: [A-Za-z][A-Za-z.'-]*){1,3}$")
+LOCATION_PATTERN = re.compile(r"\b[A-Z][A-Za-z .'-]+, ?(?:[A-Z]{2}|[A-Z][a-z]+(?: [A-Z][a-z]+)?)\b")
+DATE_RANGE_PATTERN = re.compile(
+    r"(?:[A-Z][a-z]{2,8}\.? )?\d{4}\s*(?:-|–|—|to)\s*(?:(?:[A-Z][a-z]{2,8}\.? )?\d{4}|present|current|now)",
+    re.IGNORECASE
+)
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+DEGREE_PATTERN = re.compile(
+    r"\b(?:bachelor|master|associate|doctor|ph\.?d|b\.?s\.?c?|m\.?s\.?c?|b\.?a|m\.?a|b\.?tech|m\.?tech|b\.?e|m\.?b\.?a)\b",
+    re.IGNORECASE
+)
+INSTITUTION_PATTERN = re.compile(r"\b(?:university|college|institute|school|academy)\b", re.IGNORECASE)
+
+
+def _split_bullets(section: ResumeSection):
+    header, bullets = [], []
+    for line in section.text.splitlines():
+        if BULLET_PATTERN.match(line):
+            bullets.append(BULLET_PATTERN.sub("", line).strip())
+        else:
+            header.append(line)
+    return header, bullets
+
+
+def _draft_experience(section: ResumeSection, skill_extractor: SkillExtractor) -> Dict[str, Any]:
+    header, bullets = _split_bullets(section)
+    header_text = " ".join(header)
+    duration = DATE_RANGE_PATTERN.search(header_text)
+    titles = [line for line in header if not DATE_RANGE_PATTERN.fullmatch(line.strip())]
+    return {
+        "job_title": DATE_RANGE_PATTERN.sub("", titles[0]).strip(" ,|-") if titles else "",
+        "company": DATE_RANGE_PATTERN.sub("", titles[1]).strip(" ,|-") if len(titles) > 1 else "",
+        "duration": duration.group(0) if duration else "",
+        "responsibilities": bullets,
+        "achievements": [],
+        "technologies": skill_extractor.extract(section.text),
+    }
+
+
+def _draft_project(section: ResumeSection, skill_extractor: SkillExtractor) -> Dict[str, Any]:
+    header, bullets = _split_bullets(section)
+    return {
+        "name": header[0] if header else (bullets[0] if bullets else ""),
+        "description": " ".join(header[1:]) or (bullets[0] if header and bullets else ""),
+        "technologies": skill_extractor.extract(section.text),
+        "achievements": bullets,
+    }
+
+
+def _draft_education(section: ResumeSection) -> Dict[str, Any]:
+    lines = section.text.splitlines()
+    degree = next((line for line in lines if DEGREE_PATTERN.search(line)), lines[0] if lines else "")
+    institution = next((line for line in lines if INSTITUTION_PATTERN.search(line) and line != degree), "")
+    years = YEAR_PATTERN.findall(section.text)
+    return {
+        "degree": degree,
+        "institution": institution,
+        "graduation_year": int(max(years)) if years else None,
+        "relevant_coursework": [],
+    }
+
+
+def build_resume_draft(raw_text: str, skill_extractor: SkillExtractor) -> Dict[str, Any]:
+    """Heuristic parse in the parsed_data structure, built without any LLM call"""
+    preprocessed = preprocess_resume_text(raw_text)
+    sections = segment_resume(preprocessed.text)
+
+    personal_lines = sections[0].text.splitlines() if sections and sections[0].kind == "personal" else []
+    name = next((line for line in personal_lines if NAME_PATTERN.match(line)), "")
+    locations = (LOCATION_PATTERN.search(line) for line in personal_lines)
+    location = next((match.group(0) for match in locations if match), "")
+
+    personal = {"name": name, "email": preprocessed.email, "phone": preprocessed.phone, "location": location}
+    if preprocessed.links:
+        personal["links"] = preprocessed.links
+
+    return {
+        "personal": personal,
+        "skills": skill_extractor.extract(preprocessed.text),
+        "experience": [_draft_experience(s, skill_extractor) for s in sections if s.kind == "experience"],
+        "projects": [_draft_project(s, skill_extractor) for s in sections if s.kind == "projects"],
+        "education": [_draft_education(s) for s in sections if s.kind == "education"],
+        "parsing_confidence": DRAFT_CONFIDENCE,
+    }
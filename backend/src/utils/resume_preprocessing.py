@@ -0,0 +1,134 @@
+"""
+Resume Preprocessing - deterministic cleanup that runs before the LLM parse:
+normalizes whitespace, strips repeated page headers/footers and pulls
+contact details out with regexes so the prompt only carries the rest
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+from utils.pdf_extraction import PAGE_SEPARATOR
+
+# Bump when preprocessing output changes so cached parses are invalidated
+PREPROCESSOR_VERSION = "1"
+
+# Header/footer candidates are looked for in this many lines at each page edge
+PAGE_EDGE_LINES = 3
+MAX_HEADER_FOOTER_LENGTH = 80
+
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+PHONE_PATTERN = re.compile(
+    r"(?<![\w+])(?:"
+    r"\+\d{1,3}[\s.-]?(?:\(\d{1,4}\)[\s.-]?)?\d{2,5}(?:[\s.-]?\d{2,5}){1,3}"  # international, needs a leading +
+    r"|(?:1[\s.-]?)?(?:\(\d{3}\)\s?|\d{3}[\s.-]?)\d{3}[\s.-]?\d{4}"          # North American
+    r")(?!\w)"
+)
+URL_PATTERN = re.compile(
+    r"\b(?:https?://|www\.)[^\s|,;<>()]+"
+    r"|\b(?:[a-z]{2,3}\.)?(?:linkedin\.com|github\.com|gitlab\.com|behance\.net|dribbble\.com|medium\.com)/[^\s|,;<>()]+",
+    re.IGNORECASE
+)
+PAGE_NUMBER_PATTERN = re.compile(r"^(?:page\s*)?\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?$", re.IGNORECASE)
+# Separators left dangling once contact details are cut out of a line like "a@b.com | 555-123-4567"
+DANGLING_SEPARATORS = re.compile(r"^[\s|•·,;/-]+|[\s|•·,;/-]+$")
+REPEATED_SEPARATORS = re.compile(r"(?:\s*[|•·;]\s*){2,}")
+
+
+@dataclass
+class PreprocessedResume:
+    text: str
+    email: str = ""
+    phone: str = ""
+    links: List[str] = field(default_factory=list)
+    removed_lines: int = 0
+
+
+def _header_footer_lines(pages: List[List[str]]) -> set:
+    """Short lines that recur at the top or bottom of at least half of the pages"""
+    if len(pages) < 2:
+        return set()
+    counts = Counter()
+    for lines in pages:
+        counts.update(set(lines[:PAGE_EDGE_LINES] + lines[-PAGE_EDGE_LINES:]))
+    threshold = max(2, (len(pages) + 1) // 2)
+    return {line for line, count in counts.items() if count >= threshold and len(line) <= MAX_HEADER_FOOTER_LENGTH}
+
+
+def _is_page_number(line: str) -> bool:
+    return bool(PAGE_NUMBER_PATTERN.match(line))
+
+
+def _dedupe(values: List[str]) -> List[str]:
+    seen, unique = set(), []
+    for value in values:
+        if value.lower() not in seen:
+            seen.add(value.lower())
+            unique.append(value)
+    return unique
+
+
+def preprocess_resume_text(raw_text: str) -> PreprocessedResume:
+    """Clean extracted resume text and split off the deterministic contact fields"""
+    text = unicodedata.normalize("NFKC", raw_text)
+    pages = [
+        [" ".join(line.split()) for line in page.splitlines() if line.strip()]
+        for page in text.split(PAGE_SEPARATOR)
+    ]
+    pages = [lines for lines in pages if lines]
+
+    # Keep the first occurrence of a repeated header (usually the candidate's name) and drop the rest
+    repeated = _header_footer_lines(pages)
+    seen_repeated = set()
+    kept, removed = [], 0
+    for lines in pages:
+        edge = set(range(PAGE_EDGE_LINES)) | set(range(len(lines) - PAGE_EDGE_LINES, len(lines)))
+        for line_index, line in enumerate(lines):
+            at_edge = line_index in edge
+            if at_edge and _is_page_number(line):
+                removed += 1
+                continue
+            if at_edge and line in repeated:
+                if line in seen_repeated:
+                    removed += 1
+                    continue
+                seen_repeated.add(line)
+            kept.append(line)
+
+    emails, links, phones, lines = [], [], [], []
+    for line in kept:
+        original = line
+        emails += EMAIL_PATTERN.findall(line)
+        line = EMAIL_PATTERN.sub(" ", line)
+        links += [link.rstrip(".") for link in URL_PATTERN.findall(line)]
+        line = URL_PATTERN.sub(" ", line)
+        phones += [phone.strip() for phone in PHONE_PATTERN.findall(line)]
+        line = PHONE_PATTERN.sub(" ", line)
+        if line != original:
+            line = " ".join(DANGLING_SEPARATORS.sub("", REPEATED_SEPARATORS.sub(" | ", line)).split())
+        if line:
+            lines.append(line)
+
+    return PreprocessedResume(
+        text="\n".join(lines),
+        email=emails[0] if emails else "",
+        phone=phones[0] if phones else "",
+        links=_dedupe(links),
+        removed_lines=removed,
+    )
+
+
+def merge_contact_fields(parsed_data: Dict[str, Any], preprocessed: PreprocessedResume) -> Dict[str, Any]:
+    """Overlay the regex-extracted contact fields on an LLM parse; regex matches win over model output"""
+    personal = parsed_data.get("personal")
+    if not isinstance(personal, dict):
+        personal = parsed_data["personal"] = {}
+    if preprocessed.email:
+        personal["email"] = preprocessed.email
+    if preprocessed.phone:
+        personal["phone"] = preprocessed.phone
+    if preprocessed.links:
+        existing = personal.get("links") if isinstance(personal.get("links"), list) else []
+        personal["links"] = _dedupe(existing + preprocessed.links)
+    return parsed_data
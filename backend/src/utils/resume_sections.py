@@ -0,0 +1,183 @@
+"""
+Resume Sections - splits resume text into hashed sections (personal header,
+each experience/project entry, education, skills, ...) and merges per-section
+parse results back into the parsed_data structure
+"""
+
+import re
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from utils.parse_cache import normalize_resume_text
+
+SECTION_HEADINGS = {
+    "experience": ["experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "relevant experience", "internships"],
+    "projects": ["projects", "personal projects", "academic projects", "selected projects", "key projects"],
+    "education": ["education", "academic background", "education and training", "academics"],
+    "skills": ["skills", "technical skills", "core competencies", "technologies", "tech stack",
+               "skills and technologies", "technical proficiencies", "tools and technologies"],
+    "summary": ["summary", "professional summary", "profile", "objective", "about me", "career objective"],
+    "other": ["certifications", "certificates", "awards", "achievements", "publications", "volunteer",
+              "volunteering", "leadership", "activities", "interests", "languages", "honors"],
+}
+HEADING_LOOKUP = {heading: kind for kind, headings in SECTION_HEADINGS.items() for heading in headings}
+
+# Sections of these kinds are split into one section per entry
+ENTRY_KINDS = ("experience", "projects")
+
+HEADING_CLEANUP = re.compile(r"[^a-z& ]+")
+BULLET_PATTERN = re.compile(r"^\s*(?:[•●▪◦‣∙·*\-–—]|\d+[.)])\s+")
+
+
+@dataclass
+class ResumeSection:
+    kind: str  # personal, experience, projects, education, skills, summary, other
+    title: str
+    text: str
+
+    @property
+    def hash(self) -> str:
+        normalized = normalize_resume_text(self.text)
+        return hashlib.sha256(f"{self.kind}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+def _heading_kind(line: str) -> Optional[str]:
+    stripped = line.strip().rstrip(":")
+    if not stripped or len(stripped.split()) > 5:
+        return None
+    key = " ".join(HEADING_CLEANUP.sub(" ", stripped.lower()).replace("&", "and").split())
+    return HEADING_LOOKUP.get(key)
+
+
+def _split_entries(lines: List[str]) -> List[List[str]]:
+    """A new entry starts at a non-bullet line that follows bullet lines"""
+    entries: List[List[str]] = []
+    seen_bullet = False
+    for line in lines:
+        is_bullet = bool(BULLET_PATTERN.match(line))
+        if not entries or (not is_bullet and seen_bullet):
+            entries.append([])
+            seen_bullet = False
+        entries[-1].append(line)
+        seen_bullet = seen_bullet or is_bullet
+    return entries
+
+
+def segment_resume(text: str) -> List[ResumeSection]:
+    """Split resume text into sections in document order"""
+    sections: List[ResumeSection] = []
+    kind, title, lines = "personal", "", []
+
+    def flush():
+        body = [line for line in lines if line.strip()]
+        if not body:
+            return
+        if kind in ENTRY_KINDS:
+            for entry in _split_entries(body):
+                sections.append(ResumeSection(kind, title, "\n".join(entry)))
+        else:
+            sections.append(ResumeSection(kind, title, "\n".join(body)))
+
+    for line in text.splitlines():
+        heading_kind = _heading_kind(line)
+        if heading_kind:
+            flush()
+            kind, title, lines = heading_kind, line.strip().rstrip(":"), []
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+def _contains(haystack: str, needle: Any) -> bool:
+    return isinstance(needle, str) and len(needle.strip()) > 1 and needle.strip().lower() in haystack
+
+
+def _entry_label(kind: str, item: Dict[str, Any]) -> List[Any]:
+    if kind == "experience":
+        return [item.get("company"), item.get("job_title")]
+    return [item.get("name")]
+
+
+def attribute_fragments(sections: List[ResumeSection], parsed_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Map a full parse back onto sections so later uploads can reuse unchanged ones.
+
+    Returns {section_hash: fragment}. Entries that can't be matched to exactly one
+    section are left out, so their sections are simply re-parsed next time.
+    """
+    fragments: Dict[str, Dict[str, Any]] = {}
+    lowered = [section.text.lower() for section in sections]
+    skills = [s for s in parsed_data.get("skills", []) if isinstance(s, str)]
+    unplaced_skills = list(skills)
+
+    def section_skills(index: int) -> List[str]:
+        found = [skill for skill in skills if _contains(lowered[index], skill)]
+        for skill in found:
+            if skill in unplaced_skills:
+                unplaced_skills.remove(skill)
+        return found
+
+    for kind in ENTRY_KINDS:
+        indexes = [i for i, section in enumerate(sections) if section.kind == kind]
+        matches: Dict[int, List[Dict[str, Any]]] = {i: [] for i in indexes}
+        for item in parsed_data.get(kind, []):
+            if not isinstance(item, dict):
+                continue
+            candidates = [i for i in indexes if any(_contains(lowered[i], label) for label in _entry_label(kind, item))]
+            if len(candidates) == 1:
+                matches[candidates[0]].append(item)
+        for i, items in matches.items():
+            if len(items) == 1:
+                fragments[sections[i].hash] = {kind: items, "skills": section_skills(i)}
+
+    skills_index = None
+    single_education = sum(1 for section in sections if section.kind == "education") == 1
+    for i, section in enumerate(sections):
+        if section.kind == "personal":
+            fragments[section.hash] = {"personal": parsed_data.get("personal", {}), "skills": section_skills(i)}
+        elif section.kind == "education" and single_education:
+            fragments[section.hash] = {"education": parsed_data.get("education", []), "skills": section_skills(i)}
+        elif section.kind in ("summary", "other"):
+            fragments[section.hash] = {"skills": section_skills(i)}
+        elif section.kind == "skills":
+            fragments[section.hash] = {"skills": section_skills(i)}
+            skills_index = skills_index if skills_index is not None else i
+
+    # Skills the LLM normalized (e.g. "JS" -> "JavaScript") live with the skills section
+    if unplaced_skills and skills_index is not None:
+        fragments[sections[skills_index].hash]["skills"].extend(unplaced_skills)
+    elif unplaced_skills:
+        return {}
+    return fragments
+
+
+def merge_fragments(fragments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge per-section fragments (in document order) into the parsed_data structure"""
+    merged: Dict[str, Any] = {
+        "personal": {"name": "", "email": "", "phone": "", "location": ""},
+        "skills": [],
+        "experience": [],
+        "projects": [],
+        "education": [],
+    }
+    seen_skills = set()
+    confidences = []
+
+    for fragment in fragments:
+        personal = fragment.get("personal")
+        if isinstance(personal, dict):
+            for key, value in personal.items():
+                if value and not merged["personal"].get(key):
+                    merged["personal"][key] = value
+        for skill in fragment.get("skills", []):
+            if isinstance(skill, str) and skill.lower() not in seen_skills:
+                seen_skills.add(skill.lower())
+                merged["skills"].append(skill)
+        for key in ("experience", "projects", "education"):
+            merged[key].extend(item for item in fragment.get(key, []) if isinstance(item, dict))
+        if isinstance(fragment.get("parsing_confidence"), (int, float)):
+            confidences.append(fragment["parsing_confidence"])
+
+    merged["parsing_confidence"] = round(min(confidences), 2) if confidences else 0.9
+    return merged
@@ -0,0 +1,243 @@
+"""
+Skill Extractor - compiles the skill taxonomy (canonical names plus aliases)
+into an Aho-Corasick automaton and finds skills in resume or job text in a
+single linear pass, without an LLM
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Aliases per canonical skill; canonical names also come from skill_ecosystems keys
+SKILL_ALIASES: Dict[str, List[str]] = {
+    "javascript": ["js", "es6", "ecmascript"],
+    "typescript": ["ts"],
+    "node.js": ["nodejs", "node js", "node"],
+    "react": ["react.js", "reactjs", "react js"],
+    "next.js": ["nextjs", "next js"],
+    "angular": ["angularjs", "angular.js"],
+    "vue": ["vue.js", "vuejs"],
+    "express": ["express.js", "expressjs"],
+    "python": ["python3"],
+    "django": [],
+    "flask": [],
+    "fastapi": [],
+    "pandas": [],
+    "numpy": [],
+    "tensorflow": [],
+    "pytorch": [],
+    "java": [],
+    "spring boot": ["springboot"],
+    "hibernate": [],
+    "sql": [],
+    "postgresql": ["postgres", "psql"],
+    "mysql": [],
+    "mongodb": ["mongo"],
+    "redis": [],
+    "graphql": [],
+    "aws": ["amazon web services"],
+    "azure": ["microsoft azure"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "docker": [],
+    "kubernetes": ["k8s"],
+    "jenkins": [],
+    "git": [],
+    "github": [],
+    "gitlab": [],
+    "ci/cd": ["cicd", "ci cd", "continuous integration"],
+    "html": ["html5"],
+    "css": ["css3"],
+    "tailwind css": ["tailwind", "tailwindcss"],
+    "rest api": ["rest apis", "restful api", "restful apis", "restful"],
+    "frontend development": ["front-end development"],
+    "backend development": ["back-end development"],
+    "full-stack": ["fullstack", "full stack development"],
+    "scrum": [],
+    "c++": ["cpp"],
+    "c#": ["csharp"],
+}
+
+SKILL_DISPLAY_NAMES: Dict[str, str] = {
+    "javascript": "JavaScript", "typescript": "TypeScript", "node.js": "Node.js", "react": "React",
+    "next.js": "Next.js", "angular": "Angular", "vue": "Vue", "express": "Express", "python": "Python",
+    "django": "Django", "flask": "Flask", "fastapi": "FastAPI", "pandas": "Pandas", "numpy": "NumPy",
+    "tensorflow": "TensorFlow", "pytorch": "PyTorch", "java": "Java", "spring boot": "Spring Boot",
+    "spring": "Spring", "hibernate": "Hibernate", "sql": "SQL", "postgresql": "PostgreSQL", "mysql": "MySQL",
+    "mongodb": "MongoDB", "redis": "Redis", "graphql": "GraphQL", "aws": "AWS", "azure": "Azure", "gcp": "GCP",
+    "cloud platforms": "Cloud Platforms", "docker": "Docker", "kubernetes": "Kubernetes", "jenkins": "Jenkins",
+    "git": "Git", "github": "GitHub", "gitlab": "GitLab", "ci/cd": "CI/CD", "html": "HTML", "css": "CSS",
+    "tailwind css": "Tailwind CSS", "rest api": "REST API", "api integration": "API Integration",
+    "frontend development": "Frontend Development", "backend development": "Backend Development",
+    "agile": "Agile", "scrum": "Scrum", "full-stack": "Full-Stack", "microservices": "Microservices",
+    "c++": "C++", "c#": "C#",
+}
+
+# "Spring 2023" is a semester, not the framework
+SEASON_TERMS = {"spring"}
+YEAR_FOLLOWS = re.compile(r"\s*'?\d{2}(?:\d{2})?\b")
+# Everyday words that only name a skill when capitalized ("Express", not "express interest")
+CAPITALIZED_ONLY_TERMS = {"express", "node"}
+# Terms that also read as ordinary prose; a match on one of these alone doesn't let the
+# cross-check add a skill the LLM didn't list
+AMBIGUOUS_TERMS = CAPITALIZED_ONLY_TERMS | {"spring", "agile", "ts"}
+# A version glued to a name ("Java8", "Python3.10", "C++17") still names the skill
+VERSION_SUFFIX = re.compile(r"v?\d+(?:\.\d+)*(?![\w+#])")
+
+
+def normalize_skill_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class SkillExtractor:
+    """Aho-Corasick automaton over skill names and aliases, matched on word boundaries"""
+
+    def __init__(self, taxonomy: Dict[str, Iterable[str]], display_names: Optional[Dict[str, str]] = None):
+        self.display_names = display_names or {}
+        self.canonical_names = set(taxonomy)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, str]]] = [[]]  # (term length, canonical skill)
+
+        for canonical, aliases in taxonomy.items():
+            terms = {normalize_skill_text(term) for term in [canonical, *aliases] if term.strip()}
+            # Hyphenated and spaced spellings are interchangeable ("full-stack" / "full stack")
+            terms |= {term.replace("-", " ") for term in terms}
+            for term in terms:
+                self._add_term(term, canonical)
+        self._build_failure_links()
+
+    @classmethod
+    def from_ecosystems(cls, skill_ecosystems: Dict[str, Any]) -> "SkillExtractor":
+        taxonomy: Dict[str, List[str]] = {name: [] for name in skill_ecosystems}
+        for canonical, aliases in SKILL_ALIASES.items():
+            taxonomy.setdefault(canonical, []).extend(aliases)
+        return cls(taxonomy, SKILL_DISPLAY_NAMES)
+
+    def _add_term(self, term: str, canonical: str):
+        state = 0
+        for char in term:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        if (len(term), canonical) not in self._output[state]:
+            self._output[state].append((len(term), canonical))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def _is_match(self, text: str, start: int, end: int, canonical: str, original: Optional[str]) -> bool:
+        if start > 0 and _is_word_char(text[start - 1]):
+            return False
+        # "c" must not match inside "c++", nor "java" inside "javascript"
+        if end < len(text) and (_is_word_char(text[end]) or text[end] in "+#") and not VERSION_SUFFIX.match(text, end):
+            return False
+        if canonical in SEASON_TERMS and YEAR_FOLLOWS.match(text, end):
+            return False
+        if text[start:end] in CAPITALIZED_ONLY_TERMS and not (original and original[start].isupper()):
+            return False
+        return True
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """Leftmost-longest, non-overlapping (start, end, canonical) matches in normalized text"""
+        spaced = " ".join(text.split())
+        text = spaced.lower()
+        # Case is needed for CAPITALIZED_ONLY_TERMS; the rare lower() that changes length loses it
+        original = spaced if len(spaced) == len(text) else None
+        candidates = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, canonical in self._output[state]:
+                start = index + 1 - length
+                if self._is_match(text, start, index + 1, canonical, original):
+                    candidates.append((start, index + 1, canonical))
+
+        candidates.sort(key=lambda match: (match[0], match[0] - match[1]))
+        matches, covered_until = [], 0
+        for match in candidates:
+            if match[0] >= covered_until:
+                matches.append(match)
+                covered_until = match[1]
+        return matches
+
+    def canonical_skills(self, text: str) -> List[str]:
+        """Canonical skill names in order of first appearance"""
+        seen, skills = set(), []
+        for _, _, canonical in self.find(text):
+            if canonical not in seen:
+                seen.add(canonical)
+                skills.append(canonical)
+        return skills
+
+    def display_name(self, canonical: str) -> str:
+        return self.display_names.get(canonical, canonical)
+
+    def extract(self, text: str) -> List[str]:
+        """Zero-LLM extraction: display names of all skills mentioned in the text"""
+        return [self.display_name(canonical) for canonical in self.canonical_skills(text)]
+
+    def canonicalize(self, skill: str) -> Optional[str]:
+        """Canonical name when the whole skill string is one known skill or alias"""
+        matches = self.find(skill)
+        if len(matches) == 1 and matches[0][0] == 0 and matches[0][1] == len(normalize_skill_text(skill)):
+            return matches[0][2]
+        return None
+
+    def covers(self, skill_list_text: str) -> Optional[List[str]]:
+        """If every item of a delimited skill list is a known skill, return them; otherwise None.
+
+        Used as a prompt pre-filter: a skills section the automaton fully understands needs no LLM call.
+        """
+        items = [item.strip() for item in re.split(r"[,|•·;\n]", skill_list_text)]
+        # Drop category labels such as "Languages:" or "Frameworks: React"
+        items = [item.split(":", 1)[-1].strip() for item in items]
+        items = [item for item in items if item]
+        canonicals = [self.canonicalize(item) for item in items]
+        if not items or any(canonical is None for canonical in canonicals):
+            return None
+        return [self.display_name(canonical) for canonical in dict.fromkeys(canonicals)]
+
+    def cross_check(self, llm_skills: List[str], text: str) -> Dict[str, List[str]]:
+        """Compare LLM-extracted skills with what the automaton finds in the source text.
+
+        confirmed: LLM skills found in the text; unsupported: known skills the LLM listed that the
+        automaton didn't find (possibly hallucinated, possibly written in a form it doesn't know, so
+        callers should flag rather than drop them); missed: skills in the text the LLM left out, only
+        when some mention of them is unambiguous. LLM skills outside the taxonomy can't be checked
+        and count as confirmed.
+        """
+        normalized = normalize_skill_text(text)
+        matches = self.find(text)
+        found = list(dict.fromkeys(canonical for _, _, canonical in matches))
+        found_set = set(found)
+        unambiguous = {canonical for start, end, canonical in matches if normalized[start:end] not in AMBIGUOUS_TERMS}
+        confirmed, unsupported, listed = [], [], set()
+        for skill in llm_skills:
+            if not isinstance(skill, str):
+                continue
+            canonical = self.canonicalize(skill)
+            listed.add(canonical or normalize_skill_text(skill))
+            if canonical is not None and canonical not in found_set:
+                unsupported.append(skill)
+            else:
+                confirmed.append(skill)
+        missed = [self.display_name(canonical) for canonical in found if canonical not in listed and canonical in unambiguous]
+        return {"confirmed": confirmed, "unsupported": unsupported, "missed": missed}
@@ -0,0 +1,293 @@
+"""
+SQLite Storage - embedded implementation of the storage interface (WAL mode), for
+running and load-testing the service offline, and as the local L2 cache tier
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.storage import StorageBackend, StorageError
+
+STORAGE_SQLITE_PATH = os.getenv(
+    "STORAGE_SQLITE_PATH",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "storage.sqlite3")
+)
+# Other workers sharing the file wait this long for a write lock instead of failing.
+# Statements run on the event loop, so the cache tier waits far less: a locked cache
+# is skipped rather than stalling every request in the worker
+STORAGE_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("STORAGE_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+STORAGE_CACHE_BUSY_TIMEOUT_MS = int(os.getenv("STORAGE_CACHE_BUSY_TIMEOUT_MS", "50"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resumes (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    filename TEXT,
+    file_path TEXT,
+    parsed_data TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resumes_user_parsed_idx
+    ON resumes (user_id, created_at DESC) WHERE parsed_data IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS user_credits (
+    user_id TEXT PRIMARY KEY,
+    credits INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS credit_transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    action_type TEXT NOT NULL,
+    credits_used INTEGER NOT NULL,
+    credits_before INTEGER,
+    credits_after INTEGER,
+    success INTEGER NOT NULL DEFAULT 1,
+    metadata TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS credit_transactions_user_created_idx
+    ON credit_transactions (user_id, created_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+RESUME_COLUMNS = ("user_id", "filename", "file_path", "parsed_data")
+TRANSACTION_COLUMNS = ("id", "user_id", "action_type", "credits_used", "credits_before", "credits_after",
+                       "success", "metadata", "created_at")
+# SQLite caps bound parameters per statement; bigger IN lists are split
+MAX_IN_PARAMS = 500
+
+
+def _timestamp(value: Optional[str] = None) -> str:
+    """Normalise an ISO timestamp to UTC with a fixed format, so text order is time order"""
+    moment = datetime.fromisoformat(value) if value else datetime.now(timezone.utc)
+    # Naive timestamps (datetime.now().isoformat() elsewhere in the app) are local time
+    return moment.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _chunks(items: List[Any], size: int = MAX_IN_PARAMS) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    One connection per process; statements are short and local, so they run inline like the
+    write-behind spool. WAL lets several workers share the file with concurrent readers.
+    """
+
+    def __init__(self, path: str = STORAGE_SQLITE_PATH, busy_timeout_ms: int = STORAGE_SQLITE_BUSY_TIMEOUT_MS):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                 timeout=self.busy_timeout_ms / 1000)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def _execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        try:
+            return self._connect().execute(sql, params)
+        except sqlite3.IntegrityError as e:
+            raise StorageError(f"SQLite constraint failed: {e}", 409)
+        except sqlite3.Error as e:
+            raise StorageError(f"SQLite operation failed: {e}")
+
+    async def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def ping(self) -> bool:
+        try:
+            self._execute("SELECT 1")
+            return True
+        except StorageError:
+            return False
+
+    # resumes
+
+    async def create_resume(self, user_id: str, parsed_data: Optional[Dict[str, Any]] = None,
+                            resume_id: Optional[str] = None, filename: Optional[str] = None,
+                            file_path: Optional[str] = None) -> str:
+        """Insert a resume row (the frontend does this against Supabase); used to seed offline runs"""
+        resume_id = resume_id or str(uuid.uuid4())
+        self._execute(
+            "INSERT INTO resumes (id, user_id, filename, file_path, parsed_data, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (resume_id, user_id, filename, file_path,
+             json.dumps(parsed_data) if parsed_data is not None else None, _timestamp())
+        )
+        return resume_id
+
+    async def update_resume(self, resume_id: str, fields: Dict[str, Any]) -> Optional[str]:
+        unknown = set(fields) - set(RESUME_COLUMNS)
+        if unknown:
+            raise StorageError(f"Unknown resume column(s): {', '.join(sorted(unknown))}", 400)
+        if not fields:
+            return None
+        values = [json.dumps(value) if name == "parsed_data" and value is not None else value
+                  for name, value in fields.items()]
+        # fetchall finalises the statement, which is what commits a RETURNING write
+        rows = self._execute(
+            f"UPDATE resumes SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ? RETURNING user_id",
+            (*values, resume_id)
+        ).fetchall()
+        return rows[0]["user_id"] if rows else None
+
+    async def get_latest_parsed_resume(self, user_id: str) -> Optional[Dict[str, Any]]:
+        row = self._execute(
+            "SELECT parsed_data FROM resumes WHERE user_id = ? AND parsed_data IS NOT NULL "
+            "ORDER BY created_at DESC LIMIT 1",
+            (user_id,)
+        ).fetchone()
+        return json.loads(row["parsed_data"]) if row else None
+
+    async def list_resume_ids(self, user_id: str) -> List[str]:
+        rows = self._execute("SELECT id FROM resumes WHERE user_id = ?", (user_id,)).fetchall()
+        return [row["id"] for row in rows]
+
+    # user_credits
+
+    async def get_credit_balances(self, user_ids: List[str]) -> Dict[str, int]:
+        balances = {}
+        for chunk in _chunks(list(user_ids)):
+            rows = self._execute(
+                f"SELECT user_id, credits FROM user_credits WHERE user_id IN ({', '.join('?' * len(chunk))})",
+                tuple(chunk)
+            ).fetchall()
+            balances.update((row["user_id"], row["credits"]) for row in rows)
+        return balances
+
+    async def create_credit_account(self, user_id: str, credits: int):
+        now = _timestamp()
+        self._execute(
+            "INSERT INTO user_credits (user_id, credits, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (user_id, credits, now, now)
+        )
+
+    async def set_credits_if(self, user_id: str, expected: int, credits: int) -> bool:
+        cursor = self._execute(
+            "UPDATE user_credits SET credits = ?, updated_at = ? WHERE user_id = ? AND credits = ?",
+            (credits, _timestamp(), user_id, expected)
+        )
+        return cursor.rowcount > 0
+
+    async def deduct_credits(self, user_id: str, amount: int) -> Optional[Dict[str, Any]]:
+        # Same contract as the deduct_credits SQL function: one conditional UPDATE, and a
+        # plain read only to report why it didn't apply
+        rows = self._execute(
+            "UPDATE user_credits SET credits = credits - ?, updated_at = ? "
+            "WHERE user_id = ? AND credits >= ? RETURNING credits",
+            (amount, _timestamp(), user_id, amount)
+        ).fetchall()
+        if rows:
+            credits_after = rows[0]["credits"]
+            return {"applied": True, "credits_before": credits_after + amount, "credits_after": credits_after}
+        row = self._execute("SELECT credits FROM user_credits WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        return {"applied": False, "credits_before": row["credits"], "credits_after": row["credits"]}
+
+    # credit_transactions
+
+    async def insert_transactions(self, rows: List[Dict[str, Any]]):
+        db = self._connect()
+        try:
+            with db:
+                db.execute("BEGIN")
+                db.executemany(
+                    "INSERT INTO credit_transactions (user_id, action_type, credits_used, credits_before, "
+                    "credits_after, success, metadata, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(row["user_id"], row["action_type"], row["credits_used"], row.get("credits_before"),
+                      row.get("credits_after"), int(row.get("success", True)), json.dumps(row.get("metadata") or {}),
+                      _timestamp(row.get("created_at"))) for row in rows]
+                )
+        except (sqlite3.Error, KeyError, ValueError) as e:
+            raise StorageError(f"SQLite transaction insert failed: {e}")
+
+    async def list_transactions(self, user_id: str, columns: str, limit: int,
+                                before: Optional[Tuple[str, Any]] = None) -> List[Dict[str, Any]]:
+        selected = [column.strip() for column in columns.split(",")]
+        unknown = set(selected) - set(TRANSACTION_COLUMNS)
+        if unknown:
+            raise StorageError(f"Unknown transaction column(s): {', '.join(sorted(unknown))}", 400)
+        sql = f"SELECT {', '.join(selected)} FROM credit_transactions WHERE user_id = ?"
+        params: Tuple = (user_id,)
+        if before:
+            created_at, row_id = before
+            sql += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += (created_at, created_at, row_id)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = self._execute(sql, params + (limit,)).fetchall()
+        transactions = []
+        for row in rows:
+            transaction = dict(row)
+            if "metadata" in transaction:
+                transaction["metadata"] = json.loads(transaction["metadata"] or "{}")
+            if "success" in transaction:
+                transaction["success"] = bool(transaction["success"])
+            transactions.append(transaction)
+        return transactions
+
+    async def credit_usage_summary(self, user_id: str, since: str) -> List[Dict[str, Any]]:
+        rows = self._execute(
+            "SELECT substr(created_at, 1, 10) AS day, action_type, SUM(credits_used) AS credits_used, "
+            "COUNT(*) AS transactions FROM credit_transactions WHERE user_id = ? AND created_at >= ? "
+            "GROUP BY 1, 2 ORDER BY 1 DESC, 2",
+            (user_id, _timestamp(since))
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # cache_entries (the L2 tier's entries, see TieredStorage)
+
+    def get_cached(self, namespace: str, keys: List[str], max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Cached values by key; entries older than max_age seconds are left out (any age when None)"""
+        oldest = time.time() - max_age if max_age is not None else 0.0
+        values = {}
+        for chunk in _chunks(list(keys)):
+            rows = self._execute(
+                f"SELECT key, value FROM cache_entries WHERE namespace = ? AND stored_at >= ? "
+                f"AND key IN ({', '.join('?' * len(chunk))})",
+                (namespace, oldest, *chunk)
+            ).fetchall()
+            values.update((row["key"], json.loads(row["value"])) for row in rows)
+        return values
+
+    def put_cached(self, namespace: str, values: Dict[str, Any]):
+        now = time.time()
+        try:
+            self._connect().executemany(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                [(namespace, key, json.dumps(value), now) for key, value in values.items()]
+            )
+        except sqlite3.Error as e:
+            raise StorageError(f"SQLite cache write failed: {e}")
+
+    def evict_cached(self, namespace: str, keys: List[str]):
+        for chunk in _chunks(list(keys)):
+            self._execute(
+                f"DELETE FROM cache_entries WHERE namespace = ? AND key IN ({', '.join('?' * len(chunk))})",
+                (namespace, *chunk)
+            )
@@ -0,0 +1,215 @@
+"""
+Storage - the persistence interface for resumes, credits and credit transactions,
+plus a tiered store that fronts a remote primary with a local L2 cache
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+# How long the L2 tier serves an entry before asking the primary again; past that it is
+# still used as a fallback while the primary is unreachable
+STORAGE_CACHE_RESUME_TTL_SECONDS = float(os.getenv("STORAGE_CACHE_RESUME_TTL_SECONDS", "300"))
+STORAGE_CACHE_BALANCE_TTL_SECONDS = float(os.getenv("STORAGE_CACHE_BALANCE_TTL_SECONDS", "30"))
+
+PARSED_RESUME_NAMESPACE = "parsed_resume"
+CREDIT_BALANCE_NAMESPACE = "credit_balance"
+
+# Client errors that say nothing about the rows being written, so spooled writes are retried
+TRANSIENT_STATUS_CODES = (401, 403, 408, 429)
+
+
+class StorageError(Exception):
+    """Raised when a store can't be reached or rejects an operation (status_code None means unreachable)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StorageBackend(ABC):
+    """Where resumes, credit balances and credit transactions live; every method raises StorageError on failure"""
+
+    # resumes
+
+    @abstractmethod
+    async def update_resume(self, resume_id: str, fields: Dict[str, Any]) -> Optional[str]:
+        """Update a resume row; returns its owner's user_id (None if no row matched)"""
+
+    @abstractmethod
+    async def get_latest_parsed_resume(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """parsed_data of the user's newest parsed resume"""
+
+    @abstractmethod
+    async def list_resume_ids(self, user_id: str) -> List[str]:
+        """Ids of all the user's resumes"""
+
+    # user_credits
+
+    @abstractmethod
+    async def get_credit_balances(self, user_ids: List[str]) -> Dict[str, int]:
+        """Balances for many users in one query; users without an account are left out"""
+
+    @abstractmethod
+    async def create_credit_account(self, user_id: str, credits: int):
+        ...
+
+    @abstractmethod
+    async def set_credits_if(self, user_id: str, expected: int, credits: int) -> bool:
+        """Compare-and-swap: set the balance only while it still equals expected"""
+
+    @abstractmethod
+    async def deduct_credits(self, user_id: str, amount: int) -> Optional[Dict[str, Any]]:
+        """Atomic deduction: {applied, credits_before, credits_after}, or None without an account"""
+
+    # credit_transactions
+
+    @abstractmethod
+    async def insert_transactions(self, rows: List[Dict[str, Any]]):
+        ...
+
+    @abstractmethod
+    async def list_transactions(self, user_id: str, columns: str, limit: int,
+                                before: Optional[Tuple[str, Any]] = None) -> List[Dict[str, Any]]:
+        """A page of transactions in (created_at desc, id desc) order, strictly after the before keyset"""
+
+    @abstractmethod
+    async def credit_usage_summary(self, user_id: str, since: str) -> List[Dict[str, Any]]:
+        """Credits used and transaction count per (day, action_type) since a timestamp"""
+
+    @abstractmethod
+    async def ping(self) -> bool:
+        ...
+
+    async def close(self):
+        pass
+
+
+def _unreachable(e: StorageError) -> bool:
+    return e.status_code is None
+
+
+class TieredStorage(StorageBackend):
+    """
+    Primary store fronted by a local SQLite L2 cache of parsed resumes and credit balances.
+    Writes go to the primary and then update or evict the cached entry; reads use a fresh
+    cached entry, and fall back to a stale one only while the primary is unreachable.
+    Transactions are append-only audit data and always go to the primary.
+    The cache is best-effort: once the primary has committed, a cache failure is only logged.
+    """
+
+    def __init__(self, primary: StorageBackend, cache, resume_ttl: float = STORAGE_CACHE_RESUME_TTL_SECONDS,
+                 balance_ttl: float = STORAGE_CACHE_BALANCE_TTL_SECONDS):
+        self.primary = primary
+        self.cache = cache  # SQLiteStorage
+        self.resume_ttl = resume_ttl
+        self.balance_ttl = balance_ttl
+
+    def _cache_get(self, namespace: str, keys: List[str], max_age: Optional[float] = None) -> Dict[str, Any]:
+        try:
+            return self.cache.get_cached(namespace, keys, max_age)
+        except (StorageError, OSError, ValueError) as e:
+            print(f"⚠️ L2 cache read failed ({namespace}): {str(e)}")
+            return {}
+
+    def _cache_evict(self, namespace: str, keys: List[str]):
+        try:
+            self.cache.evict_cached(namespace, keys)
+        except (StorageError, OSError, ValueError) as e:
+            # The entry may now be stale until its TTL runs out
+            print(f"⚠️ L2 cache eviction failed ({namespace}): {str(e)}")
+
+    def _cache_put(self, namespace: str, values: Dict[str, Any]):
+        try:
+            self.cache.put_cached(namespace, values)
+        except (StorageError, OSError, ValueError) as e:
+            print(f"⚠️ L2 cache write failed ({namespace}): {str(e)}")
+            self._cache_evict(namespace, list(values))
+
+    async def update_resume(self, resume_id: str, fields: Dict[str, Any]) -> Optional[str]:
+        user_id = await self.primary.update_resume(resume_id, fields)
+        if user_id:
+            # The updated resume isn't necessarily the user's newest one, so evict rather than overwrite
+            self._cache_evict(PARSED_RESUME_NAMESPACE, [user_id])
+        return user_id
+
+    async def get_latest_parsed_resume(self, user_id: str) -> Optional[Dict[str, Any]]:
+        cached = self._cache_get(PARSED_RESUME_NAMESPACE, [user_id], self.resume_ttl)
+        if user_id in cached:
+            return cached[user_id]
+        try:
+            parsed_data = await self.primary.get_latest_parsed_resume(user_id)
+        except StorageError as e:
+            stale = self._cache_get(PARSED_RESUME_NAMESPACE, [user_id]) if _unreachable(e) else {}
+            if user_id not in stale:
+                raise
+            print(f"⚠️ Primary store unreachable - serving cached parsed resume for user {user_id}")
+            return stale[user_id]
+        if parsed_data is not None:
+            self._cache_put(PARSED_RESUME_NAMESPACE, {user_id: parsed_data})
+        return parsed_data
+
+    async def list_resume_ids(self, user_id: str) -> List[str]:
+        return await self.primary.list_resume_ids(user_id)
+
+    async def get_credit_balances(self, user_ids: List[str]) -> Dict[str, int]:
+        balances = self._cache_get(CREDIT_BALANCE_NAMESPACE, user_ids, self.balance_ttl)
+        missing = [user_id for user_id in user_ids if user_id not in balances]
+        if not missing:
+            return balances
+        try:
+            fetched = await self.primary.get_credit_balances(missing)
+        except StorageError as e:
+            if not _unreachable(e):
+                raise
+            stale = self._cache_get(CREDIT_BALANCE_NAMESPACE, missing)
+            # A partial answer would make uncached users look like they have no account
+            if len(stale) < len(missing):
+                raise
+            print(f"⚠️ Primary store unreachable - serving {len(stale)} cached credit balance(s)")
+            fetched = stale
+        else:
+            self._cache_put(CREDIT_BALANCE_NAMESPACE, fetched)
+        return {**balances, **fetched}
+
+    async def create_credit_account(self, user_id: str, credits: int):
+        await self.primary.create_credit_account(user_id, credits)
+        self._cache_put(CREDIT_BALANCE_NAMESPACE, {user_id: credits})
+
+    async def set_credits_if(self, user_id: str, expected: int, credits: int) -> bool:
+        swapped = await self.primary.set_credits_if(user_id, expected, credits)
+        if swapped:
+            self._cache_put(CREDIT_BALANCE_NAMESPACE, {user_id: credits})
+        else:
+            # Our cached balance was the stale one - make the retry read the primary
+            self._cache_evict(CREDIT_BALANCE_NAMESPACE, [user_id])
+        return swapped
+
+    async def deduct_credits(self, user_id: str, amount: int) -> Optional[Dict[str, Any]]:
+        try:
+            row = await self.primary.deduct_credits(user_id, amount)
+        except StorageError:
+            self._cache_evict(CREDIT_BALANCE_NAMESPACE, [user_id])
+            raise
+        if row is None:
+            self._cache_evict(CREDIT_BALANCE_NAMESPACE, [user_id])
+        else:
+            self._cache_put(CREDIT_BALANCE_NAMESPACE, {user_id: row["credits_after"]})
+        return row
+
+    async def insert_transactions(self, rows: List[Dict[str, Any]]):
+        await self.primary.insert_transactions(rows)
+
+    async def list_transactions(self, user_id: str, columns: str, limit: int,
+                                before: Optional[Tuple[str, Any]] = None) -> List[Dict[str, Any]]:
+        return await self.primary.list_transactions(user_id, columns, limit, before)
+
+    async def credit_usage_summary(self, user_id: str, since: str) -> List[Dict[str, Any]]:
+        return await self.primary.credit_usage_summary(user_id, since)
+
+    async def ping(self) -> bool:
+        return await self.primary.ping()
+
+    async def close(self):
+        await self.primary.close()
+        await self.cache.close()
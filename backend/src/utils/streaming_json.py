@@ -0,0 +1,232 @@
+"""
+Streaming JSON - incremental, tolerant decoding of LLM JSON output. Chunks are
+scanned once as they arrive, top-level fields are emitted as soon as they close,
+and output cut off by the token limit is repaired to its last complete element
+"""
+
+import re
+import json
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Truncated output is cut back to the last value completed at this depth or above
+# (1 = whole top-level fields, 2 = whole items of a top-level list), so repaired
+# results never contain half-filled entries or half-written strings
+REPAIR_DEPTH = 2
+
+TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+
+# on_field(key, value) is called for each top-level field as soon as it closes
+FieldCallback = Callable[[str, Any], None]
+
+
+class TruncatedJSONError(ValueError):
+    """The output was cut off (usually by the token limit); value holds the repaired complete part"""
+
+    def __init__(self, message: str, value: Any):
+        super().__init__(message)
+        self.value = value
+
+
+def _loads(text: str) -> Any:
+    """json.loads that also accepts trailing commas, a common LLM slip"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(TRAILING_COMMA_PATTERN.sub(r"\1", text))
+
+
+class _Frame:
+    __slots__ = ("kind", "state", "key")
+
+    def __init__(self, kind: str):
+        self.kind = kind  # "{" or "["
+        self.state = "key" if kind == "{" else "value"
+        self.key: Optional[str] = None
+
+
+class IncrementalJSONParser:
+    """
+    Single-pass JSON scanner for an object fed chunk by chunk. Prose or markdown fences
+    before the first '{' (brackets included) and anything after the root closes are ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self.truncated = False
+        self._root = -1
+        self._end = -1
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._scalar_start: Optional[int] = None
+        self._field_start = 0
+        self._safe: Tuple[int, str] = (-1, "")
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk and return the top-level (key, value) fields it completed"""
+        if self.done or not chunk:
+            return []
+        completed: List[Tuple[str, Any]] = []
+        start = len(self.text)
+        self.text += chunk
+        text = self.text
+        for i in range(start, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(i, completed)
+                continue
+            if self._scalar_start is not None:
+                if ch not in ",}]" and not ch.isspace():
+                    continue
+                self._value_done(i, completed)
+                self._scalar_start = None
+            if ch.isspace():
+                continue
+            if self._root < 0:
+                if ch == "{":
+                    self._root = i
+                    self._open(ch, i)
+                continue
+            frame = self._stack[-1]
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = frame.kind == "{" and frame.state == "key"
+                if not self._string_is_key:
+                    self._value_begin(i)
+            elif ch in "{[":
+                self._value_begin(i)
+                self._open(ch, i)
+            elif ch in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    self.done = True
+                    self._end = i + 1
+                    break
+                self._value_done(i + 1, completed)
+            elif ch == ":":
+                frame.state = "value"
+            elif ch == ",":
+                frame.state = "key" if frame.kind == "{" else "value"
+            else:
+                self._value_begin(i)
+                self._scalar_start = i
+        return completed
+
+    def partial(self) -> Any:
+        """Best-effort value of everything received so far (None before anything usable arrives)"""
+        if self.done:
+            return self._complete_value()
+        end, closers = self._safe
+        if end < 0:
+            return None
+        return _loads(self.text[self._root:end] + closers)
+
+    def close(self) -> Any:
+        """Finish the stream: the complete value, or the repaired prefix if the output was cut off"""
+        if self.done:
+            return self._complete_value()
+        value = self.partial() if self._root >= 0 else None
+        if value is None:
+            raise json.JSONDecodeError("No JSON value found in LLM output", self.text, 0)
+        self.truncated = True
+        return value
+
+    def _complete_value(self) -> Any:
+        # Top-level fields were already decoded as they closed
+        return dict(self.fields)
+
+    def _closers(self) -> str:
+        return "".join("}" if frame.kind == "{" else "]" for frame in reversed(self._stack))
+
+    def _open(self, kind: str, i: int):
+        self._stack.append(_Frame(kind))
+        if len(self._stack) <= REPAIR_DEPTH:
+            self._safe = (i + 1, self._closers())
+
+    def _close_string(self, i: int, completed: List[Tuple[str, Any]]):
+        frame = self._stack[-1]
+        if self._string_is_key:
+            frame.key = json.loads(self.text[self._string_start:i + 1])
+            frame.state = "colon"
+        else:
+            self._value_done(i + 1, completed)
+
+    def _value_begin(self, i: int):
+        if len(self._stack) == 1:
+            self._field_start = i
+
+    def _value_done(self, end: int, completed: List[Tuple[str, Any]]):
+        frame = self._stack[-1]
+        frame.state = "comma"
+        if len(self._stack) <= REPAIR_DEPTH:
+            self._safe = (end, self._closers())
+        if len(self._stack) == 1 and frame.kind == "{" and frame.key is not None:
+            # An invalid field value makes the whole response invalid, as a full json.loads would
+            try:
+                value = _loads(self.text[self._field_start:end])
+            except json.JSONDecodeError as e:
+                raise json.JSONDecodeError(f"Invalid value for field '{frame.key}': {e.msg}", self.text, self._field_start)
+            self.fields[frame.key] = value
+            completed.append((frame.key, value))
+
+
+def parse_llm_json(text: str) -> Any:
+    """Decode a complete (possibly fenced, prefixed or truncated) LLM response"""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.close()
+
+
+async def stream_json_completion(client, on_field: Optional[FieldCallback] = None, allow_truncated: bool = False,
+                                 **create_kwargs) -> Any:
+    """
+    Run a streamed chat completion in a worker thread, decoding JSON as tokens arrive.
+    on_field runs on the event loop for each top-level field as it closes.
+    Output that was cut off raises TruncatedJSONError (carrying the repaired part)
+    unless allow_truncated, in which case the repaired part is returned.
+    """
+    loop = asyncio.get_running_loop()
+    parser = IncrementalJSONParser()
+    cancelled = threading.Event()
+
+    def consume() -> Any:
+        stream = client.chat.completions.create(stream=True, **create_kwargs)
+        try:
+            for chunk in stream:
+                if cancelled.is_set():
+                    break
+                if not chunk.choices:
+                    continue
+                for key, value in parser.feed(chunk.choices[0].delta.content or ""):
+                    if on_field is not None:
+                        loop.call_soon_threadsafe(on_field, key, value)
+                if parser.done:
+                    break
+        finally:
+            stream.close()
+        return parser.close()
+
+    try:
+        value = await asyncio.to_thread(consume)
+    except asyncio.CancelledError:
+        # The thread can't be interrupted, but it stops reading at the next chunk
+        cancelled.set()
+        raise
+    if parser.truncated:
+        print(f"⚠️ LLM output was truncated after {len(parser.text)} characters")
+        if not allow_truncated:
+            raise TruncatedJSONError("LLM output was truncated", value)
+    return value
@@ -0,0 +1,203 @@
+"""
+Supabase Client - the Supabase implementation of the storage interface: one pooled
+(HTTP/2 where available) PostgREST client with per-operation timeouts
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from dotenv import load_dotenv
+from utils.storage import StorageBackend, StorageError
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+# Server-side calls use the service key; the anon key is only a fallback for local setups
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_ANON_KEY")
+
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+SUPABASE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_CONNECT_TIMEOUT_SECONDS", "5"))
+SUPABASE_READ_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_READ_TIMEOUT_SECONDS", "5"))
+SUPABASE_WRITE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_WRITE_TIMEOUT_SECONDS", "10"))
+SUPABASE_HEALTH_TIMEOUT_SECONDS = 2.0
+
+# Debug logging
+print(f"🔧 SUPABASE_URL: {SUPABASE_URL}")
+print(f"🔧 SUPABASE_SERVICE_KEY exists: {bool(os.getenv('SUPABASE_SERVICE_KEY'))}")
+print(f"🔧 SUPABASE_ANON_KEY exists: {bool(os.getenv('SUPABASE_ANON_KEY'))}")
+
+if not SUPABASE_URL or not SUPABASE_KEY:
+    print("❌ Missing Supabase configuration!")
+    print(f"   SUPABASE_URL: {SUPABASE_URL}")
+
+
+class SupabaseError(StorageError):
+    """Raised when Supabase can't be reached or rejects a request"""
+
+
+def _quoted(value: Any) -> str:
+    """A PostgREST filter value in double quotes, so commas, dots and parentheses in it stay literal"""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx[http2])
+        return True
+    except ImportError:
+        print("⚠️ h2 not installed - Supabase client falls back to HTTP/1.1 (pip install 'httpx[http2]')")
+        return False
+
+
+class SupabaseClient(StorageBackend):
+    """Lazily opens its connection pool on first use; close() (called from the app lifespan) releases it"""
+
+    def __init__(self, url: Optional[str] = SUPABASE_URL, key: Optional[str] = SUPABASE_KEY,
+                 max_connections: int = SUPABASE_MAX_CONNECTIONS, max_keepalive: int = SUPABASE_MAX_KEEPALIVE,
+                 http2: bool = SUPABASE_HTTP2):
+        self.url = url
+        self.key = key
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.url}/rest/v1/",
+                headers={
+                    "apikey": self.key or "",
+                    "Authorization": f"Bearer {self.key}",
+                    "Content-Type": "application/json",
+                },
+                http2=self.http2 and _http2_available(),
+                timeout=httpx.Timeout(SUPABASE_READ_TIMEOUT_SECONDS, connect=SUPABASE_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None, json: Any = None,
+                      prefer: Optional[str] = None, timeout: float = SUPABASE_READ_TIMEOUT_SECONDS) -> httpx.Response:
+        """PostgREST request; raises SupabaseError on transport failures and HTTP errors"""
+        if not self.url:
+            raise SupabaseError("Supabase is not configured", 503)
+        headers = {"Prefer": prefer} if prefer else None
+        try:
+            response = await self._get_client().request(
+                method, path, params=params, json=json, headers=headers,
+                timeout=httpx.Timeout(timeout, connect=SUPABASE_CONNECT_TIMEOUT_SECONDS)
+            )
+        except httpx.TimeoutException as e:
+            print(f"⏰ Supabase {method} {path} timed out: {e}")
+            raise SupabaseError(f"Supabase request timed out: {e}")
+        except httpx.HTTPError as e:
+            print(f"🔌 Supabase {method} {path} failed: {e}")
+            raise SupabaseError(f"Supabase request failed: {e}")
+        if response.status_code >= 400:
+            print(f"❌ Supabase {method} {path} returned {response.status_code}: {response.text}")
+            raise SupabaseError(f"Supabase returned HTTP {response.status_code}", response.status_code)
+        return response
+
+    async def ping(self) -> bool:
+        try:
+            await self.request("GET", "", timeout=SUPABASE_HEALTH_TIMEOUT_SECONDS)
+            return True
+        except SupabaseError as e:
+            return e.status_code is not None and e.status_code < 500
+
+    # resumes
+
+    async def update_resume(self, resume_id: str, fields: Dict[str, Any]) -> Optional[str]:
+        """Update a resume row; returns its owner's user_id (None if no row matched)"""
+        response = await self.request("PATCH", "resumes", params={"id": f"eq.{resume_id}", "select": "user_id"},
+                                      json=fields, prefer="return=representation",
+                                      timeout=SUPABASE_WRITE_TIMEOUT_SECONDS)
+        rows = response.json()
+        return rows[0].get("user_id") if rows else None
+
+    async def get_latest_parsed_resume(self, user_id: str) -> Optional[Dict[str, Any]]:
+        response = await self.request("GET", "resumes", params={
+            "user_id": f"eq.{user_id}",
+            "select": "parsed_data",
+            "parsed_data": "not.is.null",
+            "order": "created_at.desc",
+            "limit": 1,
+        })
+        rows = response.json()
+        return rows[0].get("parsed_data") if rows else None
+
+    async def list_resume_ids(self, user_id: str) -> List[str]:
+        response = await self.request("GET", "resumes", params={"user_id": f"eq.{user_id}", "select": "id"})
+        return [row["id"] for row in response.json()]
+
+    # user_credits
+
+    async def get_credit_balances(self, user_ids: List[str]) -> Dict[str, int]:
+        """Balances for many users in one query; users without an account are left out"""
+        response = await self.request("GET", "user_credits", params={
+            "user_id": f"in.({','.join(_quoted(user_id) for user_id in user_ids)})",
+            "select": "user_id,credits",
+        })
+        return {row["user_id"]: row["credits"] for row in response.json()}
+
+    async def create_credit_account(self, user_id: str, credits: int):
+        now = datetime.now().isoformat()
+        await self.request("POST", "user_credits", json={
+            "user_id": user_id,
+            "credits": credits,
+            "created_at": now,
+            "updated_at": now,
+        }, prefer="return=minimal", timeout=SUPABASE_WRITE_TIMEOUT_SECONDS)
+
+    async def set_credits_if(self, user_id: str, expected: int, credits: int) -> bool:
+        """Compare-and-swap: set the balance only while it still equals expected"""
+        response = await self.request("PATCH", "user_credits", params={
+            "user_id": f"eq.{user_id}",
+            "credits": f"eq.{expected}",
+            "select": "credits",
+        }, json={"credits": credits, "updated_at": datetime.now().isoformat()},
+            prefer="return=representation", timeout=SUPABASE_WRITE_TIMEOUT_SECONDS)
+        return bool(response.json())
+
+    async def deduct_credits(self, user_id: str, amount: int) -> Optional[Dict[str, Any]]:
+        """deduct_credits RPC: {applied, credits_before, credits_after}, or None without an account"""
+        response = await self.request("POST", "rpc/deduct_credits", json={"p_user_id": user_id, "p_amount": amount},
+                                      timeout=SUPABASE_WRITE_TIMEOUT_SECONDS)
+        rows = response.json()
+        return rows[0] if rows else None
+
+    # credit_transactions
+
+    async def insert_transactions(self, rows: List[Dict[str, Any]]):
+        """Bulk insert (PostgREST accepts a JSON array)"""
+        await self.request("POST", "credit_transactions", json=rows, prefer="return=minimal",
+                           timeout=SUPABASE_WRITE_TIMEOUT_SECONDS)
+
+    async def list_transactions(self, user_id: str, columns: str, limit: int,
+                                before: Optional[Tuple[str, Any]] = None) -> List[Dict[str, Any]]:
+        """A page of transactions in (created_at desc, id desc) order, strictly after the before keyset"""
+        params = {"user_id": f"eq.{user_id}", "select": columns, "order": "created_at.desc,id.desc", "limit": limit}
+        if before:
+            created_at, row_id = before
+            created_at, row_id = _quoted(created_at), _quoted(row_id)
+            params["or"] = f"(created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{row_id}))"
+        response = await self.request("GET", "credit_transactions", params=params)
+        return response.json()
+
+    async def credit_usage_summary(self, user_id: str, since: str) -> List[Dict[str, Any]]:
+        response = await self.request("POST", "rpc/credit_usage_summary", json={"p_user_id": user_id, "p_since": since})
+        return response.json()
+
+
+# Global instance
+supabase_client = SupabaseClient()
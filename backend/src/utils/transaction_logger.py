@@ -0,0 +1,237 @@
+"""
+Transaction Logger - append-only audit rows are spooled to local JSONL files as
+they are logged and flushed upstream in bulk inserts by a background task, on
+a size or time threshold, with a final flush on shutdown
+"""
+
+import os
+import json
+import time
+import fcntl
+import uuid
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+TRANSACTION_LOG_SPOOL_DIR = os.getenv(
+    "TRANSACTION_LOG_SPOOL_DIR",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "transactions")
+)
+TRANSACTION_LOG_BATCH_SIZE = int(os.getenv("TRANSACTION_LOG_BATCH_SIZE", "50"))
+TRANSACTION_LOG_FLUSH_SECONDS = float(os.getenv("TRANSACTION_LOG_FLUSH_SECONDS", "2"))
+TRANSACTION_LOG_MAX_RETRY_SECONDS = 60.0
+# How long shutdown keeps flushing before leaving the rest in the spool for the next start
+TRANSACTION_LOG_SHUTDOWN_FLUSH_SECONDS = 5.0
+
+# writer(rows) -> True once the rows were inserted upstream, False to retry later;
+# raises SegmentRejectedError when upstream will never accept them
+BulkWriter = Callable[[List[Dict[str, Any]]], Awaitable[bool]]
+
+ACTIVE_SEGMENT = "active.jsonl"
+# Each process spools into its own worker-* directory, holding a lock on it while it runs
+WORKER_DIR_PREFIX = "worker-"
+LOCK_FILE = ".lock"
+DEAD_LETTER_DIR = "dead_letter"
+
+
+class SegmentRejectedError(Exception):
+    """Raised by a writer when upstream rejected the rows themselves, so retrying can't help"""
+
+
+class TransactionLogger:
+    """
+    Rows go to the active spool segment immediately (so a crash can't lose them); a flush seals
+    the segment and inserts each sealed segment in one request, deleting it once accepted.
+    Delivery is at-least-once: a crash between insert and delete resends that segment.
+    When upstream rejects a segment it is resent row by row, and the rejected rows go to
+    dead_letter/ so they can't block the rows logged after them.
+    Workers sharing spool_dir each write to their own locked directory; a directory whose
+    lock is free belongs to a dead process, and the next flush of a live one adopts it.
+    """
+
+    def __init__(self, writer: BulkWriter, spool_dir: str = TRANSACTION_LOG_SPOOL_DIR,
+                 batch_size: int = TRANSACTION_LOG_BATCH_SIZE, flush_interval: float = TRANSACTION_LOG_FLUSH_SECONDS):
+        self.writer = writer
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._dir: Optional[Path] = None
+        self._lock = None
+        self._file = None
+        self._unflushed = 0
+        self._failures = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background flusher; segments left by a previous process go out on the first flush"""
+        if self._task is None:
+            self._adopt_orphans()
+            if self._sealed_segments():
+                self._wakeup.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.wait_for(self.flush(), timeout=TRANSACTION_LOG_SHUTDOWN_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        left = self._sealed_segments()
+        if left:
+            print(f"💾 {len(left)} transaction log segment(s) left in the spool for the next start")
+        if self._dir is not None:
+            if not left:
+                (self._dir / LOCK_FILE).unlink(missing_ok=True)
+                try:
+                    self._dir.rmdir()
+                except OSError:
+                    pass
+            # Releasing the lock hands anything left over to the next process that flushes
+            self._lock.close()
+            self._dir = self._lock = None
+
+    def log(self, row: Dict[str, Any]):
+        """Spool a row; the flusher is woken early once a full batch is waiting"""
+        if self._file is None:
+            self._file = open(self._worker_dir() / ACTIVE_SEGMENT, "a", encoding="utf-8")
+        self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+        self._unflushed += 1
+        if self._unflushed >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Seal the active segment and insert every sealed one; False if the writer failed"""
+        self._seal()
+        self._adopt_orphans()
+        for segment in self._sealed_segments():
+            with open(segment, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            try:
+                ok = not rows or await self.writer(rows)
+            except SegmentRejectedError as e:
+                # Find the rejected rows so the rest of the segment still goes out
+                print(f"⚠️ Transaction log segment rejected ({str(e)}), resending row by row")
+                ok = await self._send_singly(segment, rows)
+            except Exception as e:
+                print(f"❌ Transaction log flush failed: {str(e)}")
+                ok = False
+            if not ok:
+                self._failures += 1
+                return False
+            segment.unlink()
+            print(f"📝 Logged {len(rows)} transaction(s)")
+        self._failures = 0
+        return True
+
+    async def _send_singly(self, segment: Path, rows: List[Dict[str, Any]]) -> bool:
+        """Insert rows one at a time, dead-lettering the rejected ones; on a transient failure the
+        unsent rows are written back to the segment for the next flush"""
+        for i, row in enumerate(rows):
+            try:
+                ok = await self.writer([row])
+            except SegmentRejectedError as e:
+                self._dead_letter(segment, row, str(e))
+                continue
+            except Exception as e:
+                print(f"❌ Transaction log flush failed: {str(e)}")
+                ok = False
+            if not ok:
+                rewritten = segment.with_suffix(".tmp")
+                with open(rewritten, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(unsent) + "\n" for unsent in rows[i:])
+                os.replace(rewritten, segment)
+                return False
+        return True
+
+    def _seal(self):
+        if self._file is None or self._unflushed == 0:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self._dir / ACTIVE_SEGMENT, self._dir / f"{time.time_ns()}.jsonl")
+        self._unflushed = 0
+
+    def _sealed_segments(self) -> List[Path]:
+        if self._dir is None:
+            return []
+        return sorted(p for p in self._dir.glob("*.jsonl") if p.name != ACTIVE_SEGMENT)
+
+    def _worker_dir(self) -> Path:
+        """This process's spool directory, created and locked on first use"""
+        if self._dir is None:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            # Locked under a name adopters ignore, then renamed, so no one can adopt it in between
+            name = f"{WORKER_DIR_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            claiming = self.spool_dir / f".{name}"
+            claiming.mkdir()
+            self._lock = open(claiming / LOCK_FILE, "w")
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.replace(claiming, self.spool_dir / name)
+            self._dir = self.spool_dir / name
+        return self._dir
+
+    def _adopt_orphans(self):
+        """Move segments of dead processes (and of the old shared layout) into our directory as sealed segments"""
+        if not self.spool_dir.exists():
+            return
+        for orphan in self.spool_dir.glob(f"{WORKER_DIR_PREFIX}*"):
+            if orphan == self._dir:
+                continue
+            try:
+                lock = open(orphan / LOCK_FILE, "a")
+            except FileNotFoundError:
+                continue  # removed by its owner or adopted by another worker meanwhile
+            with lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # its process is still running
+                self._adopt_segments(orphan)
+                (orphan / LOCK_FILE).unlink(missing_ok=True)
+                try:
+                    orphan.rmdir()
+                except OSError:
+                    pass
+        # Segments written directly into spool_dir before it was split per worker
+        self._adopt_segments(self.spool_dir)
+
+    def _adopt_segments(self, directory: Path):
+        adopted = 0
+        for segment in sorted(directory.glob("*.jsonl")):
+            # rename is atomic, so when two workers race for the same file exactly one gets it
+            try:
+                os.replace(segment, self._worker_dir() / f"{segment.stem}-{directory.name}.jsonl")
+                adopted += 1
+            except FileNotFoundError:
+                continue
+        if adopted:
+            print(f"📂 Adopted {adopted} transaction log segment(s) from {directory.name}")
+
+    def _dead_letter(self, segment: Path, row: Dict[str, Any], reason: str):
+        """Keep a row upstream won't accept in dead_letter/ for inspection instead of retrying it forever"""
+        dead_letter = self.spool_dir / DEAD_LETTER_DIR
+        dead_letter.mkdir(exist_ok=True)
+        with open(dead_letter / f"{self._dir.name}-{segment.name}", "a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
+        print(f"☠️ Transaction row rejected, kept in {DEAD_LETTER_DIR}/: {reason}")
+
+    async def _run(self):
+        while True:
+            # Back off while the upstream keeps failing; rows stay safe in the spool meanwhile
+            delay = min(TRANSACTION_LOG_MAX_RETRY_SECONDS, self.flush_interval * (2 ** self._failures))
+            # Not wait_for, which on Python 3.11 can swallow a cancellation racing the wakeup
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=delay)
+            finally:
+                waiter.cancel()
+            self._wakeup.clear()
+            await self.flush()
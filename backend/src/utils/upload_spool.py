@@ -0,0 +1,153 @@
+"""
+Streaming Upload Spool
+Streams a multipart file upload into a spooled temp file, enforcing the
+size cap while the body is still arriving
+"""
+
+import os
+import tempfile
+from io import BytesIO
+from typing import Dict, Optional, Union
+from fastapi import Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+RESUME_UPLOAD_MAX_BYTES = int(os.getenv("RESUME_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Uploads above this size roll over from memory to a temp file on disk
+RESUME_UPLOAD_SPOOL_MEMORY_BYTES = int(os.getenv("RESUME_UPLOAD_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+MAX_FORM_FIELD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload exceeds the size cap"""
+
+
+class InvalidUploadError(Exception):
+    """Raised for requests that are not a usable multipart upload"""
+
+
+class SpooledUpload:
+    """A file part held in memory while small and rolled over to a named temp file when large"""
+
+    def __init__(self, memory_limit: int = RESUME_UPLOAD_SPOOL_MEMORY_BYTES):
+        self.memory_limit = memory_limit
+        self.filename: Optional[str] = None
+        self.fields: Dict[str, str] = {}
+        self.size = 0
+        self.path: Optional[str] = None
+        self._buffer = BytesIO()
+        self._file = None
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self._file is None and self.size > self.memory_limit:
+            self._roll_over()
+        (self._file or self._buffer).write(data)
+
+    def _roll_over(self):
+        self._file = tempfile.NamedTemporaryFile(prefix="resume-upload-", suffix=".pdf", delete=False)
+        self.path = self._file.name
+        self._file.write(self._buffer.getvalue())
+        self._buffer = BytesIO()
+
+    def finish(self):
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """Bytes for in-memory uploads, a file path for rolled-over ones (workers mmap it)"""
+        return self.path if self.path else self._buffer.getvalue()
+
+    def head(self, length: int = 8) -> bytes:
+        if self.path:
+            with open(self.path, "rb") as f:
+                return f.read(length)
+        return self._buffer.getvalue()[:length]
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+        self.path = None
+        self._buffer = BytesIO()
+
+
+def spool_to_file(data: bytes, prefix: str = "resume-job-", suffix: str = "") -> str:
+    """Write data to a named temp file and return its path; the caller deletes it"""
+    with tempfile.NamedTemporaryFile(prefix=prefix, suffix=suffix, delete=False) as f:
+        f.write(data)
+    return f.name
+
+
+async def spool_multipart_upload(request: Request, file_field: str = "file",
+                                 max_bytes: int = RESUME_UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """Stream a multipart/form-data body, spooling the file part and collecting text fields"""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise InvalidUploadError("Expected a multipart/form-data request")
+
+    # Reject obviously oversized bodies before reading anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MAX_FORM_FIELD_BYTES:
+        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+    upload = SpooledUpload()
+    part = {"headers": {}, "field": b"", "value": b"", "name": None, "is_file": False, "data": BytesIO()}
+
+    def on_part_begin():
+        part.update(headers={}, field=b"", value=b"", name=None, is_file=False, data=BytesIO())
+
+    def on_header_field(data: bytes, start: int, end: int):
+        part["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"], part["value"] = b"", b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["name"] = disposition.get(b"name", b"").decode("utf-8", "replace")
+        part["is_file"] = part["name"] == file_field
+        if part["is_file"]:
+            filename = disposition.get(b"filename")
+            upload.filename = filename.decode("utf-8", "replace") if filename else None
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if part["is_file"]:
+            if upload.size + (end - start) > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+            upload.write(data[start:end])
+        else:
+            if part["data"].tell() + (end - start) > MAX_FORM_FIELD_BYTES:
+                raise InvalidUploadError(f"Form field '{part['name']}' is too large")
+            part["data"].write(data[start:end])
+
+    def on_part_end():
+        if not part["is_file"] and part["name"]:
+            upload.fields[part["name"]] = part["data"].getvalue().decode("utf-8", "replace")
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+        upload.finish()
+    except Exception:
+        upload.close()
+        raise
+
+    return upload
@@ -0,0 +1,344 @@
+"""
+Write-Behind Persistence - callers return as soon as a write is spooled to
+local SQLite; a background task pushes it upstream with retries and
+exponential backoff, so an outage delays writes instead of losing them.
+Every worker process shares the spool; a worker leases a row while sending it,
+so writes for one key go upstream one at a time and in order
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+WRITE_BEHIND_SPOOL_PATH = os.getenv(
+    "WRITE_BEHIND_SPOOL_PATH",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "write_behind.sqlite3")
+)
+WRITE_BEHIND_BASE_DELAY_SECONDS = float(os.getenv("WRITE_BEHIND_BASE_DELAY_SECONDS", "0.5"))
+WRITE_BEHIND_MAX_DELAY_SECONDS = float(os.getenv("WRITE_BEHIND_MAX_DELAY_SECONDS", "60"))
+# How long shutdown keeps flushing before leaving the rest in the spool for the next start
+WRITE_BEHIND_SHUTDOWN_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_SHUTDOWN_FLUSH_SECONDS", "5"))
+# After this many failed attempts a write is moved to dead_writes instead of retrying forever
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "12"))
+# A worker holds a row this long while sending it; a send is abandoned well before its lease runs out,
+# so an expired lease means the worker died and any worker may take the row over
+WRITE_BEHIND_LEASE_SECONDS = float(os.getenv("WRITE_BEHIND_LEASE_SECONDS", "60"))
+WRITE_BEHIND_BATCH_SIZE = 20
+# How often wait_written checks the spool for a write another worker sent
+WRITE_BEHIND_POLL_SECONDS = 0.5
+
+# writer(key, payload) -> True once the upstream write succeeded; raises WriteRejectedError
+# when upstream will never accept this write, so retrying is pointless
+Writer = Callable[[str, Dict[str, Any]], Awaitable[bool]]
+
+
+class WriteRejectedError(Exception):
+    """Upstream permanently rejected a write (bad request, no matching record); it is dead-lettered, not retried"""
+
+
+class WriteBehindQueue:
+    """Durable write-behind queue keyed by record; a newer write for a key replaces a pending one"""
+
+    def __init__(self, name: str, writer: Writer, path: str = WRITE_BEHIND_SPOOL_PATH,
+                 base_delay: float = WRITE_BEHIND_BASE_DELAY_SECONDS, max_delay: float = WRITE_BEHIND_MAX_DELAY_SECONDS,
+                 max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS, lease: float = WRITE_BEHIND_LEASE_SECONDS):
+        self.name = name
+        self.writer = writer
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.lease = lease
+        # Identifies this worker's leases in the shared spool
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._db = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # One flush at a time in this process, whether from the worker or a reader that needs its writes visible
+        self._flush_lock = asyncio.Lock()
+        # key -> [(seq, future)] resolved once a write at least that new lands upstream (True)
+        # or is dead-lettered (False), see wait_written
+        self._waiters: Dict[str, List[Tuple[int, asyncio.Future]]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            # Readers in one worker don't block another worker's writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pending_writes ("
+                "queue TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL, seq INTEGER NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, last_error TEXT, "
+                "claimed_by TEXT, claimed_until REAL NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (queue, key))"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(pending_writes)")}
+            if "claimed_until" not in columns:
+                # Spools written before leases existed
+                try:
+                    self._db.execute("ALTER TABLE pending_writes ADD COLUMN claimed_by TEXT")
+                    self._db.execute("ALTER TABLE pending_writes ADD COLUMN claimed_until REAL NOT NULL DEFAULT 0")
+                except sqlite3.OperationalError:
+                    pass  # another worker added them first
+            # Writes upstream rejected for good or that ran out of attempts, kept for inspection
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS dead_writes ("
+                "queue TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL, seq INTEGER NOT NULL, "
+                "attempts INTEGER NOT NULL, last_error TEXT, failed_at REAL NOT NULL, "
+                "PRIMARY KEY (queue, key, seq))"
+            )
+            self._db.commit()
+        return self._db
+
+    def start(self):
+        """Start the background writer; writes spooled by a previous process are retried on their
+        schedule, once the lease of a worker that died mid-send has run out"""
+        if self._task is None:
+            self._connect()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task after a bounded final flush; unsent writes stay spooled"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.wait_for(self._flush_locked(ignore_schedule=True), timeout=WRITE_BEHIND_SHUTDOWN_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        pending = self.pending_count()
+        if pending:
+            print(f"💾 {pending} {self.name} write(s) left in the spool for the next start")
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def submit(self, key: str, payload: Dict[str, Any]):
+        """Durably spool a write and wake the writer; returns without waiting for upstream"""
+        db = self._connect()
+        # Replacing a pending write keeps its lease: a send in flight for the key finishes before this one starts
+        db.execute(
+            "INSERT INTO pending_writes (queue, key, payload, seq, attempts, next_attempt_at) VALUES (?, ?, ?, ?, 0, ?) "
+            "ON CONFLICT (queue, key) DO UPDATE SET payload = excluded.payload, seq = excluded.seq, attempts = 0, "
+            "next_attempt_at = excluded.next_attempt_at, last_error = NULL",
+            (self.name, key, json.dumps(payload), time.time_ns(), time.time())
+        )
+        db.commit()
+        self._wakeup.set()
+
+    async def wait_written(self, key: str, timeout: float) -> bool:
+        """Wait up to timeout for the write pending for key (or a newer one) to land upstream;
+        False if it didn't in time or was dead-lettered"""
+        row = self._connect().execute(
+            "SELECT seq FROM pending_writes WHERE queue = ? AND key = ?", (self.name, key)
+        ).fetchone()
+        if row is None:
+            return not self.is_rejected(key)
+        seq = row[0]
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append((seq, future))
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                await asyncio.wait({future}, timeout=max(0.0, min(WRITE_BEHIND_POLL_SECONDS, deadline - time.monotonic())))
+                if future.done():
+                    return future.result()
+                # Another worker may have sent it, which resolves no waiter here
+                settled = self._settled_in_spool(key, seq)
+                if settled is not None:
+                    return settled
+                if time.monotonic() >= deadline:
+                    return False
+        finally:
+            waiters = [w for w in self._waiters.get(key, []) if w[1] is not future]
+            if waiters:
+                self._waiters[key] = waiters
+            else:
+                self._waiters.pop(key, None)
+
+    def is_pending(self, key: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM pending_writes WHERE queue = ? AND key = ?", (self.name, key)
+        ).fetchone()
+        return row is not None
+
+    def is_rejected(self, key: str) -> bool:
+        """Whether the latest write for key was dead-lettered (and no newer one is pending)"""
+        row = self._connect().execute(
+            "SELECT 1 FROM dead_writes WHERE queue = ? AND key = ?", (self.name, key)
+        ).fetchone()
+        return row is not None and not self.is_pending(key)
+
+    def pending_count(self) -> int:
+        row = self._connect().execute("SELECT COUNT(*) FROM pending_writes WHERE queue = ?", (self.name,)).fetchone()
+        return row[0]
+
+    async def flush_due(self):
+        """Send the writes that are due now (new ones, not ones backing off)"""
+        await self._flush_locked()
+
+    async def flush_keys(self, keys: List[str]):
+        """Send the due writes for just these keys, e.g. before a read of those records; unlike
+        flush_due it doesn't wait behind other keys' writes"""
+        if not keys:
+            return
+        rows = self._connect().execute(
+            f"SELECT key, payload, seq, attempts FROM pending_writes "
+            f"WHERE queue = ? AND key IN ({', '.join('?' * len(keys))}) AND next_attempt_at <= ?",
+            (self.name, *keys, time.time())
+        ).fetchall()
+        in_flight = []
+        for key, payload, seq, attempts in rows:
+            if not self._claim(key, seq):
+                in_flight.append(key)
+                continue
+            try:
+                await self._send(key, payload, seq, attempts)
+            finally:
+                self._release(key)
+        # A send already under way (here or in another worker) settles within its timeout
+        await asyncio.gather(*(self.wait_written(key, self.lease / 2) for key in in_flight))
+
+    async def _flush_locked(self, ignore_schedule: bool = False):
+        async with self._flush_lock:
+            await self._flush_due(ignore_schedule)
+
+    def _settled(self, key: str, seq: int, written: bool):
+        for waiter_seq, future in self._waiters.get(key, []):
+            if waiter_seq <= seq and not future.done():
+                future.set_result(written)
+
+    def _settled_in_spool(self, key: str, seq: int) -> Optional[bool]:
+        """None while the write at seq is pending, else whether it landed (False if dead-lettered)"""
+        db = self._connect()
+        row = db.execute("SELECT seq FROM pending_writes WHERE queue = ? AND key = ?", (self.name, key)).fetchone()
+        if row is not None and row[0] == seq:
+            return None
+        dead = db.execute(
+            "SELECT 1 FROM dead_writes WHERE queue = ? AND key = ? AND seq = ?", (self.name, key, seq)
+        ).fetchone()
+        return dead is None
+
+    def _dead_letter(self, key: str, payload: str, seq: int, attempts: int, error: str):
+        db = self._connect()
+        print(f"☠️ {self.name} write for {key} dead-lettered after {attempts} attempt(s): {error}")
+        db.execute(
+            "INSERT OR REPLACE INTO dead_writes (queue, key, payload, seq, attempts, last_error, failed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.name, key, payload, seq, attempts, error, time.time())
+        )
+        db.execute("DELETE FROM pending_writes WHERE queue = ? AND key = ? AND seq = ?", (self.name, key, seq))
+        self._settled(key, seq, False)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._flush_locked()
+            except Exception as e:
+                print(f"❌ {self.name} write-behind flush failed: {str(e)}")
+            # A row another worker is sending is next due when its lease runs out
+            row = self._connect().execute(
+                "SELECT MIN(MAX(next_attempt_at, claimed_until)) FROM pending_writes WHERE queue = ?", (self.name,)
+            ).fetchone()
+            timeout = self.max_delay if row[0] is None else max(0.0, row[0] - time.time())
+            self._wakeup.clear()
+            # Not wait_for: on Python 3.11 it can swallow a cancellation that races the
+            # wakeup, which would leave stop() waiting on this task forever
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=timeout)
+            finally:
+                waiter.cancel()
+
+    async def _flush_due(self, ignore_schedule: bool = False):
+        db = self._connect()
+        while True:
+            due_before = float("inf") if ignore_schedule else time.time()
+            rows = db.execute(
+                "SELECT key, payload, seq, attempts FROM pending_writes "
+                "WHERE queue = ? AND next_attempt_at <= ? AND claimed_until < ? ORDER BY next_attempt_at LIMIT ?",
+                (self.name, due_before, time.time(), WRITE_BEHIND_BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                return
+            failed = 0
+            for key, payload, seq, attempts in rows:
+                if not self._claim(key, seq):
+                    continue  # another worker is sending it, or a newer write replaced it (picked up next round)
+                try:
+                    failed += not await self._send(key, payload, seq, attempts)
+                finally:
+                    self._release(key)
+            if ignore_schedule and failed:
+                return
+
+    def _claim(self, key: str, seq: int) -> bool:
+        """Lease the row so no other worker sends this key until we're done (or our lease runs out)"""
+        db = self._connect()
+        now = time.time()
+        claimed = db.execute(
+            "UPDATE pending_writes SET claimed_by = ?, claimed_until = ? "
+            "WHERE queue = ? AND key = ? AND seq = ? AND claimed_until < ?",
+            (self.owner, now + self.lease, self.name, key, seq, now)
+        ).rowcount
+        db.commit()
+        return claimed == 1
+
+    def _release(self, key: str):
+        db = self._connect()
+        db.execute(
+            "UPDATE pending_writes SET claimed_by = NULL, claimed_until = 0 WHERE queue = ? AND key = ? AND claimed_by = ?",
+            (self.name, key, self.owner)
+        )
+        db.commit()
+
+    async def _send(self, key: str, payload: str, seq: int, attempts: int) -> bool:
+        """Send one claimed write and record the outcome; returns whether it landed or was settled for good"""
+        db = self._connect()
+        rejected = False
+        # Not wait_for, for the same reason as in _run; the timeout keeps the send inside its lease
+        send = asyncio.ensure_future(self.writer(key, json.loads(payload)))
+        try:
+            await asyncio.wait({send}, timeout=self.lease / 2)
+        finally:
+            if not send.done():
+                send.cancel()
+        try:
+            if not send.done():
+                raise TimeoutError(f"timed out after {self.lease / 2:.0f}s")
+            ok = send.result()
+            error = None if ok else "upstream rejected the write"
+        except WriteRejectedError as e:
+            ok, error, rejected = False, str(e), True
+        except Exception as e:
+            ok, error = False, str(e)
+        if ok:
+            # Only clear the row if no newer write for this key arrived meanwhile
+            db.execute("DELETE FROM pending_writes WHERE queue = ? AND key = ? AND seq = ?", (self.name, key, seq))
+            # A write that landed supersedes the key's earlier dead letters
+            db.execute("DELETE FROM dead_writes WHERE queue = ? AND key = ? AND seq < ?", (self.name, key, seq))
+            self._settled(key, seq, True)
+        elif rejected or attempts + 1 >= self.max_attempts:
+            self._dead_letter(key, payload, seq, attempts + 1, error)
+        else:
+            delay = self._backoff(attempts + 1)
+            print(f"⚠️ {self.name} write for {key} failed (attempt {attempts + 1}), retrying in {delay:.1f}s: {error}")
+            db.execute(
+                "UPDATE pending_writes SET attempts = ?, next_attempt_at = ?, last_error = ? "
+                "WHERE queue = ? AND key = ? AND seq = ?",
+                (attempts + 1, time.time() + delay, error, self.name, key, seq)
+            )
+            return False
+        return True
@@ -1,6 +1,5 @@
 import { NextResponse } from 'next/server';
 // import { CheerioWebBaseLoader } from 'langchain/document_loaders/web/cheerio';
-import Groq from 'groq-sdk';
 import { createClient } from '@supabase/supabase-js';
 
 interface JobData {
@@ -18,10 +17,6 @@ interface JobData {
   salary?: string;
 }
 
-const groq = new Groq({
-  apiKey: process.env.GROQ_API_KEY!,
-});
-
 export async function POST(request: Request) {
   try {
     const { url, manualText } = await request.json();
@@ -62,170 +57,43 @@ export async function POST(request: Request) {
       );
     }
 
-    // Deduct credits for job extraction
-    console.log('💳 Deducting credits for job extraction...');
-    try {
-      const creditResponse = await fetch(`${process.env.NEXT_PUBLIC_AI_SERVICE_URL}/credits/deduct`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
+    // Analysis (scraping, local extraction, LLM for the remainder) happens in the AI service,
+    // which charges the job_search credit and caches results by canonical URL and content hash
+    console.log('🤖 Requesting job posting analysis:', manualText ? `manual text (${manualText.length} chars)` : url);
+    const analysisResponse = await fetch(`${process.env.NEXT_PUBLIC_AI_SERVICE_URL}/analyze-job-posting`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ user_id: user.id, url, manual_text: manualText })
+    });
+
+    if (analysisResponse.status === 402) {
+      const creditError = await analysisResponse.json().catch(() => ({}));
+      return NextResponse.json(
+        {
+          error: 'insufficient_credits',
+          message: creditError.detail || 'Insufficient credits for job extraction',
+          requiresCredits: true
         },
-        body: JSON.stringify({
-          user_id: user.id,
-          action_type: 'job_search',
-          metadata: {
-            endpoint: 'extract-job',
-            url: url || 'manual_text',
-            content_length: manualText?.length || 0
-          }
-        })
-      });
-
-      if (!creditResponse.ok) {
-        let creditError;
-        try {
-          creditError = await creditResponse.json();
-        } catch (parseError) {
-          console.error('❌ Failed to parse credit response:', parseError);
-          creditError = { detail: 'Credit service unavailable' };
-        }
-        
-        return NextResponse.json(
-          { 
-            error: 'insufficient_credits',
-            message: creditError.detail || 'Insufficient credits for job extraction',
-            requiresCredits: true
-          },
-          { status: 402 }
-        );
-      }
-
-      const creditResult = await creditResponse.json();
-      console.log(`✅ Credits deducted: ${creditResult.credits_used}. Remaining: ${creditResult.credits_after}`);
-      
-    } catch (creditError) {
-      console.error('❌ Credit deduction failed:', creditError);
-      // Continue without credit deduction if service is unavailable
-      console.log('⚠️ Continuing without credit deduction due to service unavailability');
+        { status: 402 }
+      );
     }
 
-    let content: string;
-
-    if (manualText) {
-      console.log('📝 Using manual text input, length:', manualText.length);
-      content = manualText;
-    } else {
-      console.log('🌐 Attempting to scrape URL:', url);
-      try {
-        // Simple fetch-based scraping as fallback
-        const response = await fetch(url, {
-          headers: {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-          }
-        });
-        
-        if (!response.ok) {
-          throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
-        
-        const html = await response.text();
-        
-        // Basic HTML text extraction (remove tags)
-        content = html
-          .replace(/<script[^>]*>[\s\S]*?<\/script>/gi, '')
-          .replace(/<style[^>]*>[\s\S]*?<\/style>/gi, '')
-          .replace(/<[^>]*>/g, ' ')
-          .replace(/\s+/g, ' ')
-          .trim();
-          
-        if (!content || content.length < 100) {
-          throw new Error('Insufficient content extracted from URL');
-        }
-        
-        console.log('✅ Successfully scraped content, length:', content.length);
-        
-      } catch (scrapeError) {
-        console.error('❌ Web scraping failed:', scrapeError);
-        return NextResponse.json(
-          {
-            error: 'scraping_blocked',
-            message: 'Unable to scrape this job posting. The site may be protected or the URL is invalid. Please paste the job description manually.',
-            requiresManualInput: true,
-          },
-          { status: 200 }
-        );
-      }
+    if (!analysisResponse.ok) {
+      throw new Error(`Job analysis service returned HTTP ${analysisResponse.status}`);
     }
 
-   const prompt = `
-You are a comprehensive job posting analyzer with EXPERT-LEVEL technical skill detection capabilities. Your PRIMARY and MOST CRITICAL task is to identify ALL technical skills with 99%+ accuracy.
-
-Job posting content:
-${content}
-
-
-
-⚠️ STRICT RULES:
-- Extract ONLY technical skills that are EXPLICITLY WRITTEN in the job posting text.
-- DO NOT infer, guess, or assume implied skills. If it is not directly written, ignore it.
-- Technical skills include programming languages, frameworks, libraries, tools, databases, cloud platforms, DevOps technologies, data/AI frameworks, and mobile development technologies.
-- Do not include Generic skills such as Artificial Intelligence, Machine Learning, Data Science etc, focus on total skill words.
-- Exclude soft skills, responsibilities, or general tasks (e.g., communication, leadership, teamwork).
-- Exclude vague terms like "modern frameworks" or "latest technologies" unless a specific technology is named.
-
-
-Extract and return ONLY a JSON object with this structure:
-{
-  "role": "Job title/position name",
-  "company": "Company name",
-  "location": "Job location (city, state, remote, etc.)",
-  "description": "Generate a concise 2-3 sentence summary of what this role involves and its main purpose",
-  "responsibilities": "Generate a brief paragraph summarizing the key responsibilities and daily tasks",
-  "skills": ["COMPREHENSIVE list of ALL technical skills - mentioned AND implied"],
-  "qualifications": "Generate a concise paragraph summarizing the required qualifications and must-have requirements",
-  "preferredQualifications": "Generate a brief paragraph summarizing preferred qualifications and nice-to-have skills",
-  "education": "Education requirements (degree, field of study)",
-  "experience": "Years of experience required",
-  "benefits": "Generate a brief paragraph summarizing benefits, perks, and compensation details if mentioned",
-  "salary": "Salary range or compensation info if mentioned"
-}
+    const analysis = await analysisResponse.json();
 
-Instructions:
-- 🎯 SKILLS ARRAY IS YOUR TOP PRIORITY - Extract with 99%+ accuracy
-- Include both explicitly mentioned AND logically implied technical skills
-- Return ONLY the JSON object, no additional text.
-    `;
-    // 🔁 Replace Gemini with Groq call
-    console.log('🤖 Sending prompt to Groq...');
-    const groqResponse = await groq.chat.completions.create({
-      model: 'llama-3.1-8b-instant', // or llama3-8b-8192 if smaller is desired
-      messages: [
-        {
-          role: 'user',
-          content: prompt,
-        },
-      ],
-      temperature: 0.2,
-      max_tokens: 2048,
-    });
-
-    const responseText = groqResponse.choices[0].message.content?.trim() || '';
-    console.log('📥 Groq response:', responseText.slice(0, 200) + '...');
-
-    let jobData: JobData;
+    if (analysis.error) {
+      return NextResponse.json(analysis, { status: 200 });
+    }
 
-    try {
-      const jsonMatch = responseText.match(/\{[\s\S]*\}/);
-      if (!jsonMatch) {
-        throw new Error('Failed to extract JSON from Groq response');
-      }
-      jobData = JSON.parse(jsonMatch[0]);
+    const jobData: JobData = analysis;
 
-      if (!jobData.role || !Array.isArray(jobData.skills)) {
-        throw new Error('Invalid job data format');
-      }
-    } catch (error) {
-      console.error('❌ Error parsing job data:', error);
+    if (!jobData.role || !Array.isArray(jobData.skills)) {
+      console.error('❌ Invalid job data format:', analysis);
       return NextResponse.json(
         {
           error: 'scraping_blocked',
@@ -236,6 +104,8 @@ Instructions:
       );
     }
 
+    console.log(`✅ Job analyzed (${analysis.analysis_method}${analysis.cached ? ', cached' : ''}): ${jobData.skills.length} skills`);
+
     return NextResponse.json(jobData);
   } catch (error) {
     console.error('❌ Error extracting job data:', error);
@@ -25,10 +25,20 @@ export interface CreditTransaction {
   created_at: string
 }
 
+export interface CreditUsageSummary {
+  day: string
+  action_type: string
+  credits_used: number
+  transactions: number
+}
+
 export interface CreditHistory {
   success: boolean
   transactions: CreditTransaction[]
   total_count: number
+  has_more?: boolean
+  next_cursor?: string | null
+  summary?: CreditUsageSummary[] | null
   error_message?: string
 }
 
@@ -123,9 +133,14 @@ export async function deductCredits(
 }
 
 /**
- * Get user's credit transaction history
+ * Get user's credit transaction history, one page at a time (pass next_cursor to get the next page)
  */
-export async function getCreditHistory(userId: string, limit: number = 50): Promise<CreditHistory> {
+export async function getCreditHistory(
+  userId: string,
+  limit: number = 50,
+  cursor?: string | null,
+  includeSummary: boolean = false
+): Promise<CreditHistory> {
   try {
     const response = await fetch(`${AI_SERVICE_URL}/credits/history`, {
       method: 'POST',
@@ -134,7 +149,9 @@ export async function getCreditHistory(userId: string, limit: number = 50): Prom
       },
       body: JSON.stringify({
         user_id: userId,
-        limit: limit
+        limit: limit,
+        cursor: cursor || undefined,
+        include_summary: includeSummary
       })
     })
 